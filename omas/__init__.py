@@ -1 +1,30 @@
-from .omas_core import *
+import importlib
+from . import omas_core
+from .omas_core import __all__
+
+# omas backends listed in `__all__` are imported only when first accessed (see `omas_core.__getattr__`)
+for _item in __all__:
+    if _item not in omas_core._lazy_attributes:
+        globals()[_item] = getattr(omas_core, _item)
+
+
+def __getattr__(name):
+    """
+    Import omas backends and submodules only when first accessed (PEP 562)
+
+    :param name: attribute name
+
+    :return: attribute
+    """
+    if name in omas_core._lazy_attributes:
+        return omas_core.__getattr__(name)
+    try:
+        return importlib.import_module(f'.{name}', __name__)
+    except ModuleNotFoundError as _excp:
+        if _excp.name != f'{__name__}.{name}':
+            raise
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()).union(omas_core._lazy_attributes))
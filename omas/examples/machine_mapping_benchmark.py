@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Machine mappings benchmark
+==========================
+This example measures the time it takes to load data through the machine mappings,
+and the number of round trips to the MDS+ server that are needed to do so.
+
+The MDS+ server is replaced by a recording of the results of the TDI expressions,
+which are served back with a fixed latency for each round trip (`OMAS_MDS_REPLAY` and `OMAS_MDS_REPLAY_LATENCY`).
+Recordings of actual shots are made by setting `OMAS_MDS_RECORD` when loading data from the MDS+ server.
+
+Here a synthetic recording is generated for the equilibrium locations that are mapped directly to TDI expressions.
+"""
+
+import os
+import time
+import numpy
+import shutil
+import tempfile
+from pprint import pprint
+from omas import *
+from omas.omas_machine import machine_mappings, machine_mappings_index, machine_mds_requests, machine_to_omas
+
+latency = 0.01
+pulses = {'d3d': 168830, 'nstxu': 204202}
+
+# synthetic recording with the data for the one-dimensional locations that are mapped to TDI expressions
+tmpdir = tempfile.mkdtemp()
+recording = tmpdir + os.sep + 'recording.pkl'
+try:
+    locations = {}
+    for machine, pulse in pulses.items():
+        mappings = machine_mappings(machine, '')
+        locations[machine] = [
+            location
+            for location in machine_mappings_index(machine, '')['locations']['equilibrium']
+            if 'TDI' in mappings[location]
+            and not any(item in mappings[location] for item in ['VALUE', 'EVAL', 'ENVIRON', 'PYTHON', 'TRANSPOSE', 'COCOSIO_PYTHON', 'COCOSIO_TDI'])
+            and location.count(':') + len(mappings[location].get('COORDINATES', [])) == 1
+        ]
+        n = 11
+        records = {}
+        for request in machine_mds_requests(machine, pulse, locations[machine]):
+            if request[3].startswith('size('):
+                records[request] = n
+            else:
+                records[request] = numpy.linspace(1.0, 2.0, n)
+        mds_record(records, recording)
+
+    times = {}
+    with rcparams_environment(mds_replay=recording, mds_replay_latency=latency):
+        for machine, pulse in pulses.items():
+            times[machine] = {'locations': len(locations[machine])}
+
+            # one request for each location
+            mds_stats(reset=True)
+            t0 = time.time()
+            ods = ODS()
+            cache = {}
+            for location in locations[machine]:
+                if not location.endswith(':'):
+                    machine_to_omas(ods, machine, pulse, location, cache=cache)
+            times[machine]['serial'] = {'time': time.time() - t0, 'round_trips': mds_stats()['round_trips']}
+
+            # one request for each MDS+ tree
+            # the data is then already fetched, so threads (workers>1) would only add overhead to processing the mappings
+            mds_stats(reset=True)
+            t0 = time.time()
+            ods1 = load_omas_machine(machine, pulse, locations=locations[machine])
+            times[machine]['batched'] = {'time': time.time() - t0, 'round_trips': mds_stats()['round_trips']}
+            assert not different_ods(ods, ods1)
+finally:
+    shutil.rmtree(tmpdir)
+
+pprint(times)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copy of ODSs
+============
+This example compares the time it takes to copy ODSs with `ODS.copy()` (deep copy of the data)
+and with `ODS.copy(shallow_leaves=True)`, where the leaves of the copy are read-only views of the original data.
+
+Leaves that are shared with the original ODS can be replaced by assigning new data to the copy,
+but they cannot be modified in place.
+"""
+
+import time
+import numpy
+from pprint import pprint
+from omas import *
+
+ods = ODS()
+ods.sample_equilibrium()
+
+times = {}
+for n in [1, 10, 100]:
+    for k in range(len(ods['equilibrium.time_slice']), n):
+        ods.sample_equilibrium(time_index=k)
+        # high resolution 2D data
+        ods[f'equilibrium.time_slice.{k}.profiles_2d.0.psi'] = numpy.random.rand(129, 257)
+    times[n] = {}
+    for shallow_leaves in [False, True]:
+        t0 = time.time()
+        ods1 = ods.copy(shallow_leaves=shallow_leaves)
+        times[n]['shallow_leaves=%s' % shallow_leaves] = time.time() - t0
+pprint(times)
+
+# assigning data to the copy does not affect the original ODS
+ods1['equilibrium.time_slice.0.profiles_1d.psi'] = ods1['equilibrium.time_slice.0.profiles_1d.psi'] * 2.0
+assert not numpy.allclose(ods1['equilibrium.time_slice.0.profiles_1d.psi'], ods['equilibrium.time_slice.0.profiles_1d.psi'])
+
+# modifying in place the data that is shared with the original ODS raises an error
+try:
+    ods1['equilibrium.time_slice.1.profiles_1d.psi'][0] = 0.0
+except ValueError as _excp:
+    print(_excp)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+IMAS data dictionary cache
+==========================
+This example times the first access to the IMAS data dictionary in a new Python session.
+
+The first time that an IDS is accessed, OMAS parses its json structure file and generates
+the hierarchical representation of the data dictionary. OMAS caches these as binary bundles
+under `omas_rcparams['tmp_omas_dir']` (when enabled with OMAS_IMAS_STRUCTURES_CACHE=1) so that following Python sessions (eg. new worker processes)
+can skip the parsing of the json files.
+
+Here we time a `cold` start (without bundles, which are then generated) and a `warm` start (bundles are re-used).
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+from pprint import pprint
+from omas import *
+from omas.omas_setup import omas_install_dir
+
+script = '''
+import time
+t0 = time.time()
+from omas import *
+from omas.omas_utils import list_structures, imas_structure
+t1 = time.time()
+ods = ODS()
+ods['equilibrium.time_slice.0.profiles_1d.psi'] = [0.0, 1.0]
+t2 = time.time()
+for ids in list_structures(omas_rcparams['default_imas_version']):
+    imas_structure(omas_rcparams['default_imas_version'], ids)
+t3 = time.time()
+print(t1 - t0, t2 - t1, t3 - t2)
+'''
+
+# use a temporary directory for the bundles (the cache is opt-in, since bundles are unpickled)
+tmp_omas_dir = tempfile.mkdtemp()
+env = dict(os.environ)
+env['OMAS_TMP_DIR'] = tmp_omas_dir
+env['OMAS_IMAS_STRUCTURES_CACHE'] = '1'
+env['PYTHONPATH'] = os.pathsep.join([omas_install_dir] + sys.path)
+
+times = {}
+try:
+    for start in ['cold', 'warm']:
+        out = subprocess.check_output([sys.executable, '-c', script], env=env, stderr=subprocess.DEVNULL)
+        import_time, first_access, all_ids = map(float, out.decode('utf-8').strip().split('\n')[-1].split())
+        times[start] = {'import omas': import_time, 'first IDS access': first_access, 'all IDSs': all_ids}
+finally:
+    shutil.rmtree(tmp_omas_dir)
+
+pprint(times)
@@ -0,0 +1,241 @@
+'''save/load from OMAS binary format routines
+
+The file is made of:
+ * 8 bytes magic string
+ * 8 bytes (little endian unsigned integer) with the size of the Json index
+ * Json index of the leaves of the ODS with their location, dtype, shape, and offset of the data (or their value for non-numeric leaves)
+ * raw buffers of the numeric arrays, each aligned to 64 bytes
+
+Arrays are memory-mapped (copy-on-write) when loaded, so that only the pages of the data that is used are read from disk,
+and several processes can share the same file through the page cache
+
+-------
+'''
+
+from .omas_utils import *
+from .omas_core import ODS, ODC, dynamic_ODS
+
+_bin_magic = b'OMASBIN1'
+_bin_align = 64
+
+
+def _bin_aligned(offset):
+    """
+    :param offset: offset in bytes
+
+    :return: smallest multiple of _bin_align that is larger or equal to offset
+    """
+    return -(-offset // _bin_align) * _bin_align
+
+
+def save_omas_bin(ods, filename):
+    """
+    Save an ODS to OMAS binary format
+
+    :param ods: OMAS data set
+
+    :param filename: filename to save to
+    """
+    import struct
+
+    printd('Saving OMAS data to binary: %s' % filename, topic=['bin'])
+
+    leaves = []
+    buffers = []
+    offset = 0
+    for path in ods.paths(dynamic=False):
+        value = ods
+        for key in path:
+            value = value.getraw(key)
+        if isinstance(value, numpy.ndarray) and value.dtype.kind in 'biufc':
+            value = numpy.ascontiguousarray(value)
+            leaves.append([l2o(path), value.dtype.str, value.shape, offset])
+            buffers.append(value)
+            offset += _bin_aligned(value.nbytes)
+        else:
+            leaves.append([l2o(path), value])
+
+    index = {
+        'imas_version': ods.imas_version,
+        'omas_consistency_check': ods.consistency_stamp() if not ods.location else None,
+        'leaves': leaves,
+    }
+    index = json.dumps(index, default=lambda x: json_dumper(x, True)).encode('utf-8')
+
+    with open(filename, 'wb') as f:
+        f.write(_bin_magic)
+        f.write(struct.pack('<Q', len(index)))
+        f.write(index)
+        f.write(b'\0' * (_bin_aligned(f.tell()) - f.tell()))
+        for value in buffers:
+            f.write(value.data)
+            f.write(b'\0' * (_bin_aligned(value.nbytes) - value.nbytes))
+
+
+def _bin_index(filename):
+    """
+    Read the index of a file in OMAS binary format
+
+    :param filename: filename to read from
+
+    :return: tuple with index and offset of the data within the file
+    """
+    import struct
+
+    with open(filename, 'rb') as f:
+        if f.read(len(_bin_magic)) != _bin_magic:
+            raise IOError('%s is not in OMAS binary format' % filename)
+        size = struct.unpack('<Q', f.read(8))[0]
+        index = json.loads(f.read(size).decode('utf-8'), object_pairs_hook=json_loader)
+    return index, _bin_aligned(len(_bin_magic) + 8 + size)
+
+
+def _bin_leaf(leaf, buffer, start):
+    """
+    Return the value of a leaf listed in the index of a file in OMAS binary format
+
+    :param leaf: entry of the index
+
+    :param buffer: memory-mapped file
+
+    :param start: offset of the data within the file
+
+    :return: value (arrays are views of the memory-mapped file)
+    """
+    if len(leaf) == 2:
+        return leaf[1]
+    location, dtype, shape, offset = leaf
+    return numpy.ndarray(shape, dtype=dtype, buffer=buffer, offset=start + offset)
+
+
+def _bin_memmap(filename):
+    """
+    :param filename: filename to memory-map
+
+    :return: copy-on-write memory-map of the file (data that is modified in memory is not written back to the file)
+    """
+    return numpy.memmap(filename, dtype=numpy.uint8, mode='c')
+
+
+def load_omas_bin(filename, consistency_check=True, imas_version=omas_rcparams['default_imas_version'], cls=ODS):
+    """
+    Load ODS or ODC from OMAS binary format
+
+    :param filename: filename to load from
+
+    :param consistency_check: verify that data is consistent with IMAS schema
+
+    :param imas_version: imas version to use for consistency check
+
+    :param cls: class to use for loading the data
+
+    :return: OMAS data set
+    """
+    printd('Loading OMAS data from binary: %s' % filename, topic=['bin'])
+
+    index, start = _bin_index(filename)
+    buffer = _bin_memmap(filename)
+    ods = cls(imas_version=imas_version, consistency_check=False)
+
+    # structures are looked up once for all the leaves that they contain
+    nodes = {(): ods}
+
+    def node(path):
+        if path not in nodes:
+            parent = node(path[:-1])
+            if not parent._has_key(path[-1]):
+                parent.setraw(path[-1], parent.same_init_ods())
+            nodes[path] = parent.getraw(path[-1])
+        return nodes[path]
+
+    with rcparams_environment(dynamic_path_creation='dynamic_array_structures'):
+        for leaf in index['leaves']:
+            path = p2l(leaf[0])
+            node(tuple(path[:-1])).setraw(path[-1], _bin_leaf(leaf, buffer, start))
+    ods._set_consistency_check_trusted(consistency_check, index['omas_consistency_check'])
+    return ods
+
+
+class dynamic_omas_bin(dynamic_ODS):
+    """
+    Class that provides dynamic data loading from OMAS binary format
+    This class is not to be used by itself, but via the ODS.open() method.
+    """
+
+    def __init__(self, filename):
+        self.kw = {'filename': filename}
+        self.active = False
+        self.buffer = None
+        self.start = None
+        self.leaves = None
+        self.tree = None
+
+    def open(self):
+        printd('Dynamic open  %s' % self.kw, topic='dynamic')
+        index, self.start = _bin_index(self.kw['filename'])
+        self.buffer = _bin_memmap(self.kw['filename'])
+        self.leaves = {}
+        self.tree = {}
+        for leaf in index['leaves']:
+            self.leaves[leaf[0]] = leaf
+            if leaf[0].endswith('_error_upper'):
+                continue
+            h = self.tree
+            for k in p2l(leaf[0]):
+                h = h.setdefault(k, {})
+        self.active = True
+        return self
+
+    def close(self):
+        printd('Dynamic close %s' % self.kw, topic='dynamic')
+        # arrays that were returned keep a reference to the memory-map, which is released when they are no longer used
+        self.buffer = None
+        self.active = False
+        return self
+
+    def __getitem__(self, key):
+        if not self.active:
+            raise RuntimeError('Dynamic link broken: %s' % self.kw)
+        printd('Dynamic read  %s: %s' % (self.kw['filename'], key), topic='dynamic')
+        data = _bin_leaf(self.leaves[key], self.buffer, self.start)
+        if key + '_error_upper' in self.leaves:
+            error = _bin_leaf(self.leaves[key + '_error_upper'], self.buffer, self.start)
+            if isinstance(data, numpy.ndarray):
+                data = uarray(data, error)
+            else:
+                data = ufloat(data, error)
+        return data
+
+    def __contains__(self, key):
+        if not self.active:
+            raise RuntimeError('Dynamic link broken: %s' % self.kw)
+        return key in self.leaves
+
+    def keys(self, location):
+        if not self.active:
+            raise RuntimeError('Dynamic link broken: %s' % self.kw)
+        h = self.tree
+        for k in p2l(location):
+            if k not in h:
+                return []
+            h = h[k]
+        return sorted(h.keys(), key=lambda x: (isinstance(x, str), x))
+
+
+def through_omas_bin(ods, method=['function', 'class_method'][1]):
+    """
+    Test save and load OMAS binary format
+
+    :param ods: ods
+
+    :return: ods
+    """
+    filename = omas_testdir(__file__) + '/test.bin'
+    ods = copy.deepcopy(ods)  # make a copy to make sure save does not alter entering ODS
+    if method == 'function':
+        save_omas_bin(ods, filename)
+        ods1 = load_omas_bin(filename)
+    else:
+        ods.save(filename)
+        ods1 = ODS().load(filename)
+    return ods1
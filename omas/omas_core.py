@@ -5,6 +5,7 @@
 
 from .omas_utils import *
 from .omas_utils import __version__, _extra_structures
+import importlib
 
 # fmt: off
 __all__ = [
@@ -12,7 +13,9 @@ __all__ = [
     'CodeParameters', 'codeparams_xml_save', 'codeparams_xml_load',
     'ods_sample', 'different_ods', 'omas_structure',
     'save_omas_pkl', 'load_omas_pkl', 'through_omas_pkl',
+    'save_omas_bin', 'load_omas_bin', 'through_omas_bin',
     'save_omas_json', 'load_omas_json', 'through_omas_json',
+    'save_omas_ndjson', 'load_omas_ndjson', 'iter_omas_ndjson', 'through_omas_ndjson',
     'save_omas_mongo', 'load_omas_mongo', 'through_omas_mongo',
     'save_omas_hdc', 'load_omas_hdc', 'through_omas_hdc',
     'save_omas_nc', 'load_omas_nc', 'through_omas_nc',
@@ -23,7 +26,7 @@ __all__ = [
     'save_omas_imas', 'load_omas_imas', 'through_omas_imas', 'load_omas_iter_scenario', 'browse_imas',
     'save_omas_s3', 'load_omas_s3', 'through_omas_s3', 'list_omas_s3', 'del_omas_s3',
     'machine_expression_types', 'machines', 'machine_mappings', 'load_omas_machine',
-    'machine_mapping_function', 'test_machine_mapping_functions', 'mdstree', 'mdsvalue',
+    'machine_mapping_function', 'test_machine_mapping_functions', 'mdstree', 'mdsvalue', 'mdsbatch', 'mds_stats', 'mds_record', 'mds_recording',
     'omas_dir', 'imas_versions', 'latest_imas_version', 'omas_info', 'omas_info_node', 'get_actor_io_ids',
     'omas_rcparams', 'rcparams_environment', 'omas_testdir', '__version__',
     'latexit', 'OmasDynamicException'
@@ -71,16 +74,66 @@ def force_imas_type(value):
 
 
 _consistency_warnings = {}
+_time_array_index = {}
+# offset used to identify which index of an ODS location is used to index time arrays
+_time_array_marker = 10**9
 
+# counter of the changes to code parameters, which do not know what ODS they belong to (used to invalidate the catalogues of paths)
+_code_parameters_changes = 0
 
-def consistency_checker(location, value, info, consistency_check, imas_version):
+
+def _leaf_fingerprint(value):
+    """
+    :param value: leaf of an ODS
+
+    :return: hash of the data type, shape, and binary data of the leaf
+    """
+    import hashlib
+
+    hash = hashlib.sha1()
+    if isinstance(value, CodeParameters):
+        hash.update(b'CodeParameters')
+        for key in sorted(value.keys()):
+            hash.update(repr(key).encode('utf-8'))
+            hash.update(_leaf_fingerprint(value.getraw(key)))
+    elif isinstance(value, str):
+        hash.update(b'str' + value.encode('utf-8'))
+    else:
+        array = numpy.asarray(value)
+        if array.dtype.kind in 'biufc':
+            hash.update(('%s%s' % (array.dtype.str, array.shape)).encode('utf-8'))
+            hash.update(numpy.ascontiguousarray(array).data)
+        else:
+            hash.update(('%s%r' % (type(value).__name__, array.tolist())).encode('utf-8'))
+    return hash.digest()
+
+
+@lru_cache(maxsize=256)
+def _search_pattern(search_pattern):
+    """
+    :param search_pattern: regular expression ODS location string
+
+    :return: tuple with compiled regular expression and the literal string that all the matching locations start with
+    """
+    prefix = ''
+    if '|' not in search_pattern:
+        for char in search_pattern:
+            if char in '.^$*+?{}[]\\|()':
+                if char in '*?{':
+                    prefix = prefix[:-1]
+                break
+            prefix += char
+    return re.compile(search_pattern), prefix
+
+
+def consistency_checker(location, value, node, consistency_check, imas_version):
     """
     Print warnings or raise errors if object does not satisfy IMAS data dictionary
     Converts numeric data to INT/FLOAT depending on IMAS specifications
 
     :param value: value to check consistency of
 
-    :param info: output of omas_info_node
+    :param node: IMAS_node record of the location, as returned by imas_node
 
     :param consistency_check: True, False, 'warn'
 
@@ -90,31 +143,32 @@ def consistency_checker(location, value, info, consistency_check, imas_version):
     """
     # force type consistent with data dictionary
     txt = ''
-    if is_uncertain(value) or 'data_type' not in info:
+    data_type = node.data_type
+    if is_uncertain(value) or data_type is None:
         pass
     elif isinstance(value, numpy.ndarray):
-        if 'STRUCT_ARRAY' in info['data_type'] and not len(value):
+        if 'STRUCT_ARRAY' in data_type and not len(value):
             value = ODS()
             value.omas_data = []
-        elif 'FLT' in info['data_type']:
+        elif 'FLT' in data_type:
             value = value.astype(float)
-        elif 'INT' in info['data_type']:
+        elif 'INT' in data_type:
             value = value.astype(int)
-        elif 'STR' in info['data_type']:
+        elif 'STR' in data_type:
             value = value.astype(str)
     elif isinstance(value, (int, float, numpy.integer, numpy.floating)):
-        if 'FLT' in info['data_type']:
+        if 'FLT' in data_type:
             value = float(value)
-        elif 'INT' in info['data_type']:
+        elif 'INT' in data_type:
             value = int(value)
-        elif 'STR' in info['data_type']:
+        elif 'STR' in data_type:
             value = str(value)
     elif isinstance(value, bytes):
-        if 'STR' in info['data_type']:
+        if 'STR' in data_type:
             value = b2s(value)
 
     # structure type is respected check type
-    if 'data_type' in info and info['data_type'] in ['STRUCTURE', 'STRUCT_ARRAY'] and not isinstance(value, ODS):
+    if data_type in ['STRUCTURE', 'STRUCT_ARRAY'] and not isinstance(value, ODS):
         txt = f'{location} is of type {type(value)} but this should be an ODS'
     # check type
     elif not (
@@ -124,20 +178,16 @@ def consistency_checker(location, value, info, consistency_check, imas_version):
     ):
         txt = f'{location} is of type {type(value)} but supported types are: string, float, int, array'
     # check consistency for scalar entries
-    elif 'data_type' in info and '_0D' in info['data_type'] and isinstance(value, numpy.ndarray):
-        txt = f'{location} is of type {type(value)} must be a scalar of type {info["data_type"]}'
+    elif data_type is not None and '_0D' in data_type and isinstance(value, numpy.ndarray):
+        txt = f'{location} is of type {type(value)} must be a scalar of type {data_type}'
     # check consistency for number of dimensions
-    elif (
-        'coordinates' in info
-        and len(info['coordinates'])
-        and (not isinstance(value, numpy.ndarray) or len(value.shape) != len(info['coordinates']))
-    ):
-        txt = f'{location} shape {numpy.asarray(value).shape} is inconsistent with coordinates: {info["coordinates"]}'
+    elif node.ndim and (not isinstance(value, numpy.ndarray) or len(value.shape) != node.ndim):
+        txt = f'{location} shape {numpy.asarray(value).shape} is inconsistent with coordinates: {list(node.coordinates)}'
 
     if len(txt) and consistency_check is True:
         raise ValueError(txt)
-    elif 'lifecycle_status' in info and info['lifecycle_status'] in ['obsolescent']:
-        txt = f'{o2u(location)} is in {info["lifecycle_status"].upper()} state for IMAS {imas_version}'
+    elif node.lifecycle_status in ['obsolescent']:
+        txt = f'{o2u(location)} is in {node.lifecycle_status.upper()} state for IMAS {imas_version}'
         if consistency_check and imas_version not in _consistency_warnings or txt not in _consistency_warnings[imas_version]:
             _consistency_warnings.setdefault(imas_version, []).append(txt)
         else:
@@ -146,6 +196,10 @@ def consistency_checker(location, value, info, consistency_check, imas_version):
     return value, txt
 
 
+# formats handled by the save_omas_XXX/load_omas_XXX functions
+omas_storage_formats = ['pkl', 'bin', 'json', 'ndjson', 'mongo', 'hdc', 'nc', 'h5', 'ascii', 'ds', 'dx', 'imas', 's3', 'uda', 'machine']
+
+
 def _handle_extension(*args, **kw):
     if args[0] == 'ascii':
         ext = 'ascii'
@@ -163,7 +217,7 @@ def _handle_extension(*args, **kw):
     if ext == 'ids':
         ext = 'ascii'
     # understand machine names as `machine` extension
-    if ext in machines(None):
+    if ext not in omas_storage_formats and ext in __getattr__('machines')(None):
         args = tuple([ext] + list(args))
         ext = 'machine'
     return ext, args
@@ -195,6 +249,18 @@ class ODS(MutableMapping):
     OMAS Data Structure class
     """
 
+    # key of this ODS in its parent (cached to speed up ODS.location)
+    _key = None
+
+    # catalogue of the paths of this ODS (cached to speed up ODS.search_paths)
+    _catalogue = None
+
+    # counter of the changes to the structure of this ODS, kept by the top-level ODS (used to invalidate the catalogues of paths)
+    _structure_changes = 0
+
+    # hash of the data of this ODS (cached to speed up ODS.fingerprint)
+    _fingerprint = None
+
     def __init__(
         self,
         imas_version=omas_rcparams['default_imas_version'],
@@ -278,13 +344,23 @@ class ODS(MutableMapping):
         loc = p2l(subtree)
         if not loc:
             raise LookupError('Must specify a location in the ODS to get the time of')
-        utimes_ds = [i2o(k) for k in omas_times(self.imas_version) if k.startswith(loc[0] + '.')]
+        utimes_ds = omas_time_nodes(loc[0], self.imas_version)
 
         # get time nodes with actual numbers for indexes of arrays of structures and identify time index
-        times_ds = list(map(lambda item: u2o(item, l2o(subtree)), utimes_ds))
-        try:
-            time_array_index = int(re.sub('.*\.([0-9]+)\.time.*', r'\1', ' '.join(times_ds)))
-        except Exception:
+        # (which element of the subtree holds the time index only depends on its universal location)
+        if (self.imas_version, l2u(subtree)) not in _time_array_index:
+            markers = [_time_array_marker + k if isinstance(item, int) else item for k, item in enumerate(subtree)]
+            times_ds = list(map(lambda item: u2o(item, l2o(markers)), utimes_ds))
+            try:
+                _time_array_index[self.imas_version, l2u(subtree)] = (
+                    int(re.sub('.*\.([0-9]+)\.time.*', r'\1', ' '.join(times_ds))) - _time_array_marker
+                )
+            except Exception:
+                _time_array_index[self.imas_version, l2u(subtree)] = None
+        time_array_index = _time_array_index[self.imas_version, l2u(subtree)]
+        if time_array_index is not None and 0 <= time_array_index < len(subtree):
+            time_array_index = subtree[time_array_index]
+        else:
             time_array_index = None
 
         try:
@@ -292,7 +368,7 @@ class ODS(MutableMapping):
                 # traverse ODS upstream until time information is found
                 time = {}
                 for sub in [subtree[:k] for k in range(len(subtree), 0, -1)]:
-                    times_sub_ds = [k for k in utimes_ds if k.startswith(l2u(sub))]
+                    times_sub_ds = omas_time_nodes(l2u(sub), self.imas_version)
                     this_subtree = l2o(sub)
 
                     # get time data from ods
@@ -312,7 +388,8 @@ class ODS(MutableMapping):
                                 # squash the multidimensional time arrays if they are all the same
                                 if len(time.shape) > 1:
                                     time = numpy.reshape(time, (-1, time.shape[-1]))
-                                    if all(numpy.allclose(time[0], t) for t in time[1:]):
+                                    # exact comparison is much faster than allclose, and is the common case
+                                    if numpy.all(time[1:] == time[0]) or numpy.allclose(time[0], time[1:]):
                                         time = time[0]
                             times[item] = time
                         except ValueError as _excp:
@@ -387,58 +464,259 @@ class ODS(MutableMapping):
         # We should never end up here
         raise ValueError(f'Error handling time in OMAS for `{l2o(subtree)}`')
 
-    def slice_at_time(self, time=None, time_index=None):
+    def slice_at_time(self, time=None, time_index=None, in_place=True):
         """
-        method for selecting a time slice from an time-dependent ODS (NOTE: this method operates in place)
+        method for selecting a time slice from an time-dependent ODS
 
         :param time: time value to select
 
         :param time_index: time index to select (NOTE: time_index has precedence over time)
 
-        :return: modified ODS
+        :param in_place: operate in place, or return a new top-level ODS with the time slice of the data under the location
+                         of this ODS, whose arrays are read-only views of the data of this ODS
+
+        :return: modified ODS (or new top-level ODS if in_place=False)
+        """
+        ods = self._slice_at_time(time, time_index, self.ulocation, in_place)
+        if in_place:
+            return ods
+        return self._top_level(ods)
+
+    def _top_level(self, ods):
+        """
+        :param ods: new ODS with data derived from this ODS
+
+        :return: new top-level ODS with the data of `ods` at the location of this ODS
+        """
+        if not self.location:
+            return ods
+        top = ODS(imas_version=self.imas_version, consistency_check=self._consistency_check, cocos=self._cocos)
+        with rcparams_environment(dynamic_path_creation='dynamic_array_structures'):
+            top.setraw(p2l(self.location), ods)
+        return top
+
+    def _slice_at_time(self, time, time_index, ulocation, in_place):
         """
+        :param ulocation: universal ODS path of this ODS
+
+        :return: sliced ODS
+        """
+        # data is accessed raw, since it was validated when it was assigned
+        if self.active_dynamic:
+            get = self.__getitem__
+        else:
+            get = self.getraw
 
         # set time_index for parent and children
-        if 'time' in self and isinstance(self['time'], numpy.ndarray):
+        if 'time' in self and isinstance(get('time'), numpy.ndarray):
+            time_array = get('time')
             if time_index is None:
-                time_index = numpy.argmin(abs(self['time'] - time))
-                if (time - self['time'][time_index]) != 0.0:
-                    printe('%s sliced at %s instead of requested time %s' % (self.location, self['time'][time_index], time))
-                time = self['time'][time_index]
+                time_index = numpy.argmin(abs(time_array - time))
+                if (time - time_array[time_index]) != 0.0:
+                    printe('%s sliced at %s instead of requested time %s' % (self.location, time_array[time_index], time))
+                time = time_array[time_index]
             if time is None:
-                time = self['time'][time_index]
+                time = time_array[time_index]
+
+        def sliced(value):
+            if in_place or not isinstance(value, numpy.ndarray):
+                return numpy.atleast_1d(value[time_index])
+            value = value[time_index : time_index + 1] if len(value.shape) == 1 else value[time_index]
+            value.flags.writeable = False
+            return value
+
+        def shared(value):
+            if isinstance(value, ODS):
+                return value._copy({}, shallow_leaves=True)
+            elif isinstance(value, numpy.ndarray):
+                value = value.view()
+                value.flags.writeable = False
+                return value
+            elif isinstance(value, (dict, list)):
+                return copy.deepcopy(value)
+            return value
+
+        if in_place:
+            ods = self
+        else:
+            ods = self.same_init_ods()
 
         # loop over items
         for item in self.keys():
             # time (if present) is treated last
             if item == 'time':
                 continue
+            value = get(item)
+            uitem = (ulocation + '.' + (':' if isinstance(item, int) else item)).lstrip('.')
 
             # identify time-dependent data
-            info = omas_info_node(o2u(self.ulocation + '.' + str(item)))
-            if 'coordinates' in info and any(k.endswith('.time') for k in info['coordinates']):
+            if omas_time_base(uitem, self.imas_version) is not None:
 
                 # time-dependent arrays
-                if not isinstance(self.getraw(item), ODS):
-                    self[item] = numpy.atleast_1d(self[item][time_index])
+                if not isinstance(value, ODS):
+                    ods.setraw(item, sliced(value))
 
                 # time-depentend list of ODSs
-                elif isinstance(self[item].omas_data, list) and len(self[item]) and 'time' in self[item][0]:
+                elif isinstance(value.omas_data, list) and len(value) and 'time' in value[0]:
                     if time_index is None:
                         raise ValueError('`time` array is not set for `%s` ODS' % self.ulocation)
-                    tmp = self[item][time_index]
-                    self.getraw(item).clear()
-                    self.getraw(item)[0] = tmp
+                    if in_place:
+                        tmp = value[time_index]
+                        value.clear()
+                        value[0] = tmp
+                    else:
+                        tmp = value.getraw(time_index)._copy({}, shallow_leaves=True)
+                        ods.setraw(item, value.same_init_ods())
+                        ods.getraw(item).setraw(0, tmp)
+
+                elif not in_place:
+                    ods.setraw(item, shared(value))
 
             # go deeper inside ODSs that do not have time info
-            elif isinstance(self.getraw(item), ODS):
-                self.getraw(item).slice_at_time(time=time, time_index=time_index)
+            elif isinstance(value, ODS):
+                value = value._slice_at_time(time, time_index, uitem, in_place)
+                if not in_place:
+                    ods.setraw(item, value)
+
+            elif not in_place:
+                ods.setraw(item, shared(value))
 
         # treat time
         if 'time' in self:
-            self['time'] = numpy.atleast_1d(self['time'][time_index])
+            ods.setraw('time', sliced(get('time')))
 
-        return self
+        return ods
+
+    def resample_time(self, time, method='linear'):
+        """
+        Resample a time-dependent ODS onto a new time base
+
+        Time-dependent arrays and arrays of structures are identified from the IMAS schema.
+        The interpolation indices and weights are computed once for each time base, and are applied
+        to all the data that shares it. Arrays of structures are resampled by interpolating
+        the numeric leaves that have the same shape across all of their time slices
+        (other leaves are taken from the nearest time slice).
+        In IDSs with `ids_properties.homogeneous_time=1` the IDS `time` is used as the time base of the data
+        whose own time base is not set. Data whose time base cannot be found is not resampled (with a warning).
+
+        :param time: new time base
+
+        :param method: 'linear', 'nearest', or 'previous' (data is not extrapolated beyond the original time base)
+
+        :return: new top-level ODS with the resampled data under the location of this ODS
+        """
+        time = numpy.atleast_1d(numpy.asarray(time, dtype=float))
+        ods = self._resample_time(time, method, self.ulocation, {}, {})
+        return self._top_level(ods)
+
+    def _resample_time(self, time, method, ulocation, time_bases, weights):
+        """
+        :param ulocation: universal ODS path of this ODS
+
+        :param time_bases: dictionary with the time arrays of the parent ODSs indexed by their universal ODS path
+
+        :param weights: dictionary with the interpolation indices and weights indexed by id of the time arrays
+
+        :return: resampled ODS
+        """
+        if self.active_dynamic:
+            get = self.__getitem__
+        else:
+            get = self.getraw
+
+        def interpolation(time_array):
+            if id(time_array) not in weights:
+                weights[id(time_array)] = (time_array,) + omas_interp_weights(time, time_array, method)
+            return weights[id(time_array)][1:]
+
+        def interpolate(value, i0, i1, w):
+            if not numpy.any(w) or value.dtype.kind not in 'fc':
+                return value[i0]
+            w = w.reshape((-1,) + (1,) * (len(value.shape) - 1))
+            return value[i0] * (1.0 - w) + value[i1] * w
+
+        ods = self.same_init_ods()
+
+        # time arrays of this ODS
+        if 'time' in self and isinstance(get('time'), numpy.ndarray):
+            time_bases = dict(time_bases)
+            time_bases[(ulocation + '.time').lstrip('.')] = get('time')
+            ods.setraw('time', time.copy())
+        # in IDSs with homogeneous_time=1 the time base of all the time-dependent data is the IDS `time`
+        if ulocation and '.' not in ulocation and 'ids_properties.homogeneous_time' in self:
+            time_bases = dict(time_bases)
+            time_bases[ulocation + '.ids_properties.homogeneous_time'] = self['ids_properties.homogeneous_time']
+
+        for item in self.keys():
+            if item == 'time' and ods._has_key('time'):
+                continue
+            value = get(item)
+            uitem = (ulocation + '.' + (':' if isinstance(item, int) else item)).lstrip('.')
+            time_base = omas_time_base(uitem, self.imas_version)
+            time_array = time_bases.get(time_base, None)
+            if time_array is None and time_base is not None:
+                ids = uitem.split('.')[0]
+                if time_bases.get(ids + '.ids_properties.homogeneous_time', None) == 1:
+                    time_array = time_bases.get(ids + '.time', None)
+
+            # time-dependent arrays
+            if time_base is not None and isinstance(value, numpy.ndarray):
+                if time_array is None or not len(value.shape) or value.shape[0] != len(time_array):
+                    printe('WARNING: %s is not resampled since its time base `%s` is not set' % (uitem, time_base))
+                    ods.setraw(item, copy.deepcopy(value))
+                else:
+                    ods.setraw(item, interpolate(value, *interpolation(time_array)))
+
+            # time-dependent arrays of structures
+            elif time_base is not None and isinstance(value, ODS) and isinstance(value.omas_data, list) and len(value):
+                if time_array is None or len(time_array) != len(value):
+                    if not all('time' in value.getraw(k) for k in range(len(value))):
+                        raise ValueError('`time` array is not set for `%s` ODS' % uitem)
+                    time_array = numpy.array([value.getraw(k).getraw('time') for k in range(len(value))])
+                i0, i1, w = interpolation(time_array)
+                nearest = numpy.where(w > 0.5, i1, i0)
+                tmp = value.same_init_ods()
+                for k, index in enumerate(nearest):
+                    tmp.setraw(k, copy.deepcopy(value.getraw(index)))
+                    if 'time' in tmp.getraw(k):
+                        tmp.getraw(k).setraw('time', float(time[k]))
+                # numeric leaves are interpolated across all time slices at once
+                if numpy.any(w):
+                    for path in value.getraw(0).paths(dynamic=False):
+                        if path == ['time']:
+                            continue
+                        leaves = []
+                        for k in range(len(value)):
+                            leaf = value.getraw(k)
+                            for key in path:
+                                if not isinstance(leaf, ODS) or not leaf._has_key(key):
+                                    break
+                                leaf = leaf.getraw(key)
+                            else:
+                                leaves.append(leaf)
+                                continue
+                            break
+                        if len(leaves) != len(value) or len(set(numpy.shape(leaf) for leaf in leaves)) != 1:
+                            continue
+                        leaves = numpy.array(leaves)
+                        if leaves.dtype.kind not in 'fc':
+                            continue
+                        leaves = interpolate(leaves, i0, i1, w)
+                        for k in range(len(time)):
+                            leaf = tmp.getraw(k)
+                            for key in path[:-1]:
+                                leaf = leaf.getraw(key)
+                            leaf.setraw(path[-1], leaves[k] if len(leaves.shape) > 1 else leaves[k].item())
+                ods.setraw(item, tmp)
+
+            # go deeper inside ODSs that do not have time info
+            elif isinstance(value, ODS):
+                ods.setraw(item, value._resample_time(time, method, uitem, time_bases, weights))
+
+            else:
+                ods.setraw(item, copy.deepcopy(value))
+
+        return ods
 
     def time_index(self, time, key=''):
         """
@@ -484,17 +762,26 @@ class ODS(MutableMapping):
             return ''
         else:
             parent_location = parent.location
-            loc = None
+            # use the key cached when this ODS was attached to its parent
+            # and search for it only if it is stale (eg. after data was moved around)
+            loc = self._key
             if isinstance(parent.omas_data, list):
-                for k, value in enumerate(parent.omas_data):
-                    if value is self:
-                        loc = k
-                        break
+                if not isinstance(loc, int) or loc >= len(parent.omas_data) or parent.omas_data[loc] is not self:
+                    loc = None
+                    for k, value in enumerate(parent.omas_data):
+                        if value is self:
+                            loc = k
+                            break
             elif isinstance(parent.omas_data, dict):
-                for key in parent.omas_data:
-                    if parent.omas_data[key] is self:
-                        loc = key
-                        break
+                if not isinstance(loc, str) or parent.omas_data.get(loc, None) is not self:
+                    loc = None
+                    for key in parent.omas_data:
+                        if parent.omas_data[key] is self:
+                            loc = key
+                            break
+            else:
+                loc = None
+            self._key = loc
             if loc is None:
                 return ''
             if parent_location:
@@ -560,6 +847,23 @@ class ODS(MutableMapping):
 
         :param consistency_value: True/False/'warn'/'drop'/'strict' or a combination of those strings
         """
+        self._set_consistency_check(consistency_value)
+
+    def _set_consistency_check(self, consistency_value, location=None, structure=None, imas_version=None):
+        """
+        Recursive worker of the consistency_check setter
+
+        The location, data dictionary structure and imas_version of this ODS are handed down
+        by the parent, so that validation is a single pass that does not walk up the tree at every node
+
+        :param consistency_value: True/False/'warn'/'drop'/'strict' or a combination of those strings
+
+        :param location: location of this ODS (evaluated if None)
+
+        :param structure: data dictionary structure of this ODS (evaluated if None)
+
+        :param imas_version: imas version of this ODS (evaluated if None)
+        """
         if not consistency_value and not self._consistency_check:
             return
 
@@ -568,8 +872,21 @@ class ODS(MutableMapping):
             # set ._consistency_check for this ODS
             self._consistency_check = consistency_value
             # set .consistency_check
+            if location is None:
+                location = self.location
+                imas_version = self.imas_version
+                structure = None
+            if consistency_value:
+                ulocation = o2u(location)
+                if structure is not None:
+                    pass
+                elif location:
+                    structure = imas_node(imas_version, ulocation).structure
+                else:
+                    structure = imas_structure(imas_version, location)
             for item in list(self.keys(dynamic=0)):
-                if isinstance(self.getraw(item), ODS) and 'code.parameters' in self.getraw(item).location:
+                item_location = l2o([location, item])
+                if isinstance(self.getraw(item), ODS) and 'code.parameters' in item_location:
                     # consistency_check=True makes sure that code.parameters is of type CodeParameters
                     if consistency_value:
                         tmp = CodeParameters()
@@ -580,23 +897,21 @@ class ODS(MutableMapping):
                 else:
                     consistency_value_propagate = consistency_value
                     if consistency_value:
-                        location = self.location
-                        structure = imas_structure(self.imas_version, location)
                         if location.endswith('.ids_properties') and item == 'occurrence':
                             continue
                         else:
                             structure_key = item if not isinstance(item, int) else ':'
+                            item_ulocation = ulocation + '.' + structure_key if ulocation else structure_key
                             strict_fail = False
                             if (
                                 isinstance(consistency_value, str)
                                 and 'strict' in consistency_value
                                 and structure_key in structure
-                                and p2l(location + '.%s' % item)[0] in _extra_structures
-                                and o2i(o2u(location + '.%s' % item)) in _extra_structures[p2l(location + '.%s' % item)[0]]
+                                and imas_node(imas_version, item_ulocation, strict=False).is_extra
                             ):
                                 strict_fail = True
                             if not strict_fail and structure_key in structure:
-                                structure[structure_key]
+                                pass
                             else:
                                 options = list(structure.keys())
                                 if len(options) == 1 and options[0] == ':':
@@ -609,7 +924,7 @@ class ODS(MutableMapping):
                                         index = numpy.argsort(list(options.values())).astype(int)
                                         options = list(numpy.array(list(options.keys()))[index[-5:]][::-1]) + ['...']
                                     options = 'Did you mean: ' + ', '.join(options)
-                                txt = 'IMAS %s location: %s' % (self.imas_version, location + '.' + structure_key)
+                                txt = 'IMAS %s location: %s' % (imas_version, location + '.' + structure_key)
                                 if isinstance(consistency_value, str) and ('warn' in consistency_value or 'drop' in consistency_value):
                                     if 'warn' in consistency_value:
                                         if 'drop' in consistency_value:
@@ -624,9 +939,8 @@ class ODS(MutableMapping):
                                     continue
                         # check that value is consistent
                         if not isinstance(self.getraw(item), ODS):
-                            location = l2o([location] + [item])
-                            info = omas_info_node(o2u(location), imas_version=self.imas_version)
-                            value, txt = consistency_checker(location, self.getraw(item), info, consistency_value, self.imas_version)
+                            node = imas_node(imas_version, item_ulocation, strict=False)
+                            value, txt = consistency_checker(item_location, self.getraw(item), node, consistency_value, imas_version)
                             if not len(txt):
                                 pass
                             elif isinstance(consistency_value, str) and ('warn' in consistency_value or 'drop' in consistency_value):
@@ -642,7 +956,9 @@ class ODS(MutableMapping):
                                 self.setraw(item, value)
                     # propagate consistency check
                     if isinstance(self.getraw(item), ODS):
-                        self.getraw(item).consistency_check = consistency_value_propagate
+                        # NOTE: the structure of the top-level ODS does not list the IDSs structures
+                        item_structure = structure[structure_key] if consistency_value_propagate and location else None
+                        self.getraw(item)._set_consistency_check(consistency_value_propagate, item_location, item_structure, imas_version)
 
         except Exception as _excp:
             # restore existing consistency_check value in case of error
@@ -653,6 +969,61 @@ class ODS(MutableMapping):
                 self.consistency_check = old_consistency_check
             raise  # (LookupError('Consistency check failed: %s' % repr(_excp)))
 
+    def consistency_stamp(self):
+        """
+        Returns the IMAS version that all the data in this ODS has been validated against
+
+        Save methods record this stamp in the file so that, when the file is loaded back
+        for the same IMAS version, the data does not need to be validated again
+
+        :return: imas_version string, or None if some of the data was not validated with `consistency_check=True`
+        """
+        if self.consistency_check is not True:
+            return None
+        for item in self.keys(dynamic=0):
+            value = self.getraw(item)
+            if isinstance(value, ODS) and value.consistency_stamp() is None:
+                return None
+        return self.imas_version
+
+    def _set_consistency_check_trusted(self, consistency_value, stamp, location=None):
+        """
+        Set consistency_check of an ODS that has just been loaded from file
+
+        If the file carries a consistency stamp for the same IMAS version (see `consistency_stamp()`)
+        the data is only converted to the IMAS types and it is not validated again
+
+        :param consistency_value: True/False/'warn'/'drop'/'strict' or a combination of those strings
+
+        :param stamp: consistency stamp read from the file (None if the file has no stamp)
+
+        :param location: location of this ODS (evaluated if None)
+        """
+        if location is None:
+            if consistency_value is not True or stamp is None or stamp != self.imas_version:
+                self.consistency_check = consistency_value
+                return
+            printd('Trusting data validated against IMAS %s' % stamp, topic='consistency')
+            location = self.location
+        self._consistency_check = consistency_value
+        for item in list(self.keys(dynamic=0)):
+            value = self.getraw(item)
+            if isinstance(value, ODS):
+                item_location = l2o([location, item])
+                if 'code.parameters' in item_location:
+                    tmp = CodeParameters()
+                    tmp.update(value)
+                    self.setraw(item, tmp)
+                else:
+                    value._set_consistency_check_trusted(consistency_value, stamp, item_location)
+            else:
+                if isinstance(value, numpy.ndarray) and value.dtype.kind == 'S':
+                    value = value.astype(str)
+                else:
+                    value = force_imas_type(value)
+                if value is not self.getraw(item):
+                    self.setraw(item, value)
+
     @property
     def cocos(self):
         """
@@ -861,12 +1232,15 @@ class ODS(MutableMapping):
 
         # full path where we want to place the data
         location = l2o([self.location, key[0]])
+        ulocation = o2u(location)
 
         # perform consistency check with IMAS structure
+        node = None
         if self.consistency_check and '.code.parameters.' not in location:
             structure_key = key[0] if not isinstance(key[0], int) else ':'
             try:
-                structure = imas_structure(self.imas_version, location)
+                node = imas_node(self.imas_version, ulocation)
+                structure = node.structure
                 if isinstance(value, ODS):
                     if value.omas_data is None and not len(structure) and '.code.parameters' not in location:
                         raise ValueError('`%s` has no data' % location)
@@ -924,43 +1298,20 @@ class ODS(MutableMapping):
 
             # now that all checks are completed we can assign the structure information
             if self.consistency_check and '.code.parameters.' not in location:
-                ulocation = o2u(location)
-                blocation = re.sub(r'_error_(upper|lower)$', '', ulocation)
+                # get node information
+                if node is None:
+                    node = imas_node(self.imas_version, ulocation, strict=False)
 
                 # handle cocos transformations coming in
-                if (
-                    self.cocosio
-                    and self.cocosio != self.cocos
-                    and '.' in location
-                    and blocation in omas_physics.cocos_signals
-                    and not isinstance(value, ODS)
-                ):
-                    transform = omas_physics.cocos_signals[blocation]
-                    if isinstance(transform, list):
-                        norm = np.ones(len(transform))
-                        for itf, tf in enumerate(transform):
-                            norm[itf] = omas_physics.cocos_transform(self.cocosio, self.cocos)[tf]
-                    elif transform == '?':
-                        if isinstance(self.consistency_check, str) and 'warn' in self.consistency_check:
-                            printe('COCOS translation has not been setup: %s' % blocation)
-                            norm = 1.0
-                        else:
-                            raise ValueError('COCOS translation has not been setup: %s' % blocation)
-
-                    else:
-                        norm = omas_physics.cocos_transform(self.cocosio, self.cocos)[transform]
-                    norm = norm if blocation == ulocation else abs(norm)
-                    value = value * norm
-
-                # get node information
-                info = omas_info_node(ulocation, imas_version=self.imas_version)
+                if self.cocosio and self.cocosio != self.cocos and node.cocos_transform is not None and not isinstance(value, ODS):
+                    value = value * self._cocosio_norm(node, ulocation)
 
                 # handle units (Python pint package)
                 if str(value.__class__).startswith("<class 'pint."):
                     import pint
 
                     if (
-                        'units' in info
+                        node.units is not None
                         and isinstance(value, pint.Quantity)
                         or (
                             isinstance(value, numpy.ndarray)
@@ -968,16 +1319,16 @@ class ODS(MutableMapping):
                             and isinstance(numpy.atleast_1d(value).flat[0], pint.Quantity)
                         )
                     ):
-                        value = value.to(info['units']).magnitude
+                        value = value.to(node.units).magnitude
 
                 # coordinates interpolation
-                ods_coordinates = self.top
                 input_coordinates = self.coordsio
                 if input_coordinates:
+                    ods_coordinates = self.top
                     all_coordinates = []
                     coordinates = []
-                    if len(input_coordinates) and 'coordinates' in info:
-                        all_coordinates = list(map(lambda x: u2o(x, self.location), info['coordinates']))
+                    if len(input_coordinates) and node.ndim:
+                        all_coordinates = list(map(lambda x: u2o(x, self.location), node.coordinates))
                         coordinates = list(filter(lambda coord: not coord.startswith('1...'), all_coordinates))
                     if len(coordinates):
                         # add any missing coordinate that were input
@@ -1002,7 +1353,7 @@ class ODS(MutableMapping):
                             ):
 
                                 # for the time being omas interpolates only 1D quantities
-                                if len(info['coordinates']) > 1:
+                                if len(node.coordinates) > 1:
                                     raise Exception('coordio does not support multi-dimentional interpolation just yet')
 
                                 # if the (first) coordinate is in input_coordinates
@@ -1021,7 +1372,7 @@ class ODS(MutableMapping):
                         else:
                             printd('Adding `%s` without knowing coordinates `%s`' % (self.location, all_coordinates), topic='coordsio')
 
-                    elif not self.active_dynamic and ulocation in omas_coordinates(self.imas_version) and location in ods_coordinates:
+                    elif not self.active_dynamic and node.is_coordinate and location in ods_coordinates:
                         value = ods_coordinates.__getitem__(location, None)
 
             # lists are saved as numpy arrays, and 0D numpy arrays as scalars
@@ -1029,7 +1380,7 @@ class ODS(MutableMapping):
 
             # check that dimensions and data types are consistent with IMAS specifications
             if self.consistency_check and '.code.parameters.' not in location:
-                value, txt = consistency_checker(location, value, info, self.consistency_check, self.imas_version)
+                value, txt = consistency_checker(location, value, node, self.consistency_check, self.imas_version)
                 if not len(txt):
                     pass
                 elif isinstance(self.consistency_check, str) and ('warn' in self.consistency_check or 'drop' in self.consistency_check):
@@ -1043,11 +1394,11 @@ class ODS(MutableMapping):
 
         # check if the branch/node was dynamically created
         dynamically_created = False
-        if key[0] not in self.keys(dynamic=0) and len(key) > 1:
+        if not self._has_key(key[0]) and len(key) > 1:
             dynamically_created = True
 
         # assign values to this ODS
-        if key[0] not in self.keys(dynamic=0) or len(key) == 1:
+        if not self._has_key(key[0]) or len(key) == 1:
             self.setraw(key[0], value)
 
         # pass the value one level deeper
@@ -1067,6 +1418,123 @@ class ODS(MutableMapping):
             if False and value.consistency_check != self.consistency_check:
                 value.consistency_check = self.consistency_check
 
+    def _cocosio_norm(self, node, ulocation):
+        """
+        Normalization of the data coming in with cocosio != cocos
+
+        :param node: IMAS_node record of the location
+
+        :param ulocation: universal location (used for error messages)
+
+        :return: normalization (float or array for vector quantities)
+        """
+        transform = node.cocos_transform
+        if isinstance(transform, list):
+            norm = np.ones(len(transform))
+            for itf, tf in enumerate(transform):
+                norm[itf] = omas_physics.cocos_transform(self.cocosio, self.cocos)[tf]
+        elif transform == '?':
+            if isinstance(self.consistency_check, str) and 'warn' in self.consistency_check:
+                printe('COCOS translation has not been setup: %s' % ulocation)
+                norm = 1.0
+            else:
+                raise ValueError('COCOS translation has not been setup: %s' % ulocation)
+        else:
+            norm = omas_physics.cocos_transform(self.cocosio, self.cocos)[transform]
+        return abs(norm) if node.cocos_abs else norm
+
+    def set_many(self, location, value):
+        """
+        Assign data to a location across arrays of structures in one pass
+
+        The IMAS schema is looked up once for the location, and the arrays of structures are created as needed
+        (eg. `ods.set_many('magnetics.b_field_pol_probe.:.field.data', data)` with data of shape (nprobes, ntimes))
+
+        :param location: location relative to this ODS, with `:` for the arrays of structures to fill
+
+        :param value: array (or nested lists of arrays) whose leading dimensions index the arrays of structures
+
+        :return: current ODS object
+        """
+        path = p2l(location)
+        depth = path.count(':')
+
+        def unroll(value, depth, index=()):
+            if not depth:
+                yield index, value
+            else:
+                for k in range(len(value)):
+                    yield from unroll(value[k], depth - 1, index + (k,))
+
+        def is_quantity(value):
+            if str(value.__class__).startswith("<class 'pint."):
+                return True
+            return isinstance(value, numpy.ndarray) and value.dtype == object and value.size and is_quantity(value.flat[0])
+
+        # fall back on element by element assignment for settings that require it
+        # (or for values with units that are not given as a single quantity)
+        if (
+            not depth
+            or isinstance(self, ODC)
+            or self.active_dynamic
+            or self.coordsio
+            or '.code.parameters' in location
+            or (isinstance(self.consistency_check, str) and 'warn' in self.consistency_check)
+            or (not is_quantity(value) and any(is_quantity(item) for k, item in unroll(value, depth)))
+        ):
+            for k, item in unroll(value, depth):
+                self[u2n(location, k)] = item
+            return self
+
+        # single lookup of the IMAS schema
+        ulocation = o2u(l2o([self.location] + path))
+        node = None
+        norm = None
+        if self.consistency_check:
+            try:
+                node = imas_node(self.imas_version, ulocation)
+            except LookupError:
+                raise LookupError('Not a valid IMAS %s location: %s' % (self.imas_version, ulocation))
+            if node.data_type in ['STRUCTURE', 'STRUCT_ARRAY']:
+                raise ValueError('`%s` is of type %s but ODS.set_many() can only assign leaves' % (ulocation, node.data_type))
+            if self.cocosio and self.cocosio != self.cocos and node.cocos_transform is not None:
+                norm = self._cocosio_norm(node, ulocation)
+
+            # handle units (Python pint package) for the whole data at once
+            if is_quantity(value) and node.units is not None:
+                value = value.to(node.units).magnitude
+
+        def fill(ods, path, value):
+            key = path[0]
+            for k, item in unroll(value, 1) if key == ':' else [((key,), value)]:
+                k = k[0]
+                if ods.omas_data is None:
+                    ods.omas_data = [] if isinstance(k, int) else {}
+                elif isinstance(k, int) and not isinstance(ods.omas_data, list):
+                    raise TypeError('Cannot convert from dict to list once ODS has data')
+                elif isinstance(k, str) and not isinstance(ods.omas_data, dict):
+                    raise TypeError('Cannot convert from list to dict once ODS has data')
+
+                # branches
+                if len(path) > 1:
+                    if not ods._has_key(k):
+                        ods.setraw(k, ods.same_init_ods(cls=ODS))
+                    fill(ods.getraw(k), path[1:], item)
+                    continue
+
+                # leaves
+                if norm is not None:
+                    item = item * norm
+                item = force_imas_type(item)
+                if node is not None:
+                    item, txt = consistency_checker(l2o([ods.location, k]), item, node, self.consistency_check, self.imas_version)
+                    if len(txt) and isinstance(self.consistency_check, str) and 'drop' in self.consistency_check:
+                        continue
+                ods.setraw(k, item)
+
+        fill(self, path, value)
+        return self
+
     def getraw(self, key):
         """
         Method to access data stored in ODS with no processing of the key, and it is thus faster than the ODS.__getitem__(key)
@@ -1113,12 +1581,15 @@ class ODS(MutableMapping):
         # accept path as list of keys
         if isinstance(key, list):
             if len(key) > 1:
-                if key[0] not in self.keys(dynamic=0):
+                if not self._has_key(key[0]):
                     self.setraw(key[0], self.same_init_ods())
                 return self.getraw(key[0]).setraw(key[1:], value)
             else:
                 key = key[0]
 
+        if self._fingerprint is not None:
+            self._invalidate_fingerprint()
+
         # set .parent
         if isinstance(value, ODC):
             pass
@@ -1132,6 +1603,8 @@ class ODS(MutableMapping):
             if self.omas_data is None:
                 self.omas_data = {}
             # handle uncertainty
+            if is_uncertain(value) or key not in self.omas_data or isinstance(value, (ODS, CodeParameters)):
+                self._structure_changed()
             if is_uncertain(value):
                 # scalar
                 if isinstance(value, uncertainties.core.AffineScalarFunc):
@@ -1143,11 +1616,14 @@ class ODS(MutableMapping):
                     self.omas_data[key + '_error_upper'] = std_devs(value)
             else:
                 self.omas_data[key] = value
+                if isinstance(value, ODS) and not isinstance(value, ODC):
+                    value._key = key
 
         # arrays of structures
         else:
             if self.omas_data is None:
                 self.omas_data = []
+            self._structure_changed()
 
             # dynamic array structure creation
             if key > len(self.omas_data) and omas_rcparams['dynamic_path_creation'] == 'dynamic_array_structures':
@@ -1156,9 +1632,13 @@ class ODS(MutableMapping):
             # index exists
             if key < len(self.omas_data):
                 self.omas_data[key] = value
+                if isinstance(value, ODS) and not isinstance(value, ODC):
+                    value._key = key if key >= 0 else key + len(self.omas_data)
             # next index creation
             elif key == len(self.omas_data):
                 self.omas_data.append(value)
+                if isinstance(value, ODS) and not isinstance(value, ODC):
+                    value._key = key
             # missing index
             else:
                 if not len(self.omas_data):
@@ -1228,6 +1708,22 @@ class ODS(MutableMapping):
         # NOTE: OMAS will try to return numpy arrays if the sliced data can be stacked in a uniform array
         # otherwise a list will be returned (that's where we do `return data0` below)
         if isinstance(key[0], slice):
+            # arrays of structures that are backed by tensors are sliced directly
+            # unless some of the requested data was already pulled in memory (and possibly modified)
+            dynamic = self.active_dynamic
+            if (
+                hasattr(dynamic, 'tensor')
+                and all(isinstance(k, int) or (isinstance(k, str) and ':' not in k) for k in key[1:])
+                and not (isinstance(self.omas_data, list) and any(value._has_path(key[1:]) for value in self.omas_data))
+                and self.cocosio == self.cocos
+                and not self.coordsio
+                and not self.unitsio
+                and not self.uncertainio
+            ):
+                data = dynamic.tensor(p2l(self.location) + key)
+                if data is not None:
+                    return data
+
             data0 = []
             for k in self.keys(dynamic=1)[key[0]]:
                 try:
@@ -1294,7 +1790,7 @@ class ODS(MutableMapping):
             return data
 
         # dynamic path creation
-        elif key[0] not in self.keys(dynamic=0):
+        elif not self._has_key(key[0]):
             if omas_rcparams['dynamic_path_creation']:
                 if self.active_dynamic:
                     location = l2o([self.location, key[0]])
@@ -1334,38 +1830,37 @@ class ODS(MutableMapping):
 
                 location = l2o([self.location, key[0]])
                 ulocation = o2u(location)
-                blocation = re.sub(r'_error_(upper|lower)$', '', ulocation)
+
+                # get node information
+                node = imas_node(self.imas_version, ulocation, strict=False)
 
                 # handle cocos transformations going out
-                if self.cocosio and self.cocosio != self.cocos and '.' in location and blocation in omas_physics.cocos_signals:
-                    transform = omas_physics.cocos_signals[blocation]
+                if self.cocosio and self.cocosio != self.cocos and node.cocos_transform is not None:
+                    transform = node.cocos_transform
                     if isinstance(transform, list):
                         norm = numpy.ones(len(transform))
                         for itf, tf in enumerate(transform):
                             norm[itf] = omas_physics.cocos_transform(self.cocosio, self.cocos)[tf]
                     elif transform == '?':
                         if self.consistency_check == 'warn':
-                            printe('COCOS translation has not been setup: %s' % blocation)
+                            printe('COCOS translation has not been setup: %s' % ulocation)
                             norm = 1.0
                         else:
-                            raise ValueError('COCOS translation has not been setup: %s' % blocation)
+                            raise ValueError('COCOS translation has not been setup: %s' % ulocation)
 
                     else:
                         norm = omas_physics.cocos_transform(self.cocos, self.cocosio)[transform]
-                    norm = norm if blocation == ulocation else abs(norm)
+                    norm = abs(norm) if node.cocos_abs else norm
                     value = value * norm
 
-                # get node information
-                info = omas_info_node(ulocation, imas_version=self.imas_version)
-
                 # coordinates interpolation
-                ods_coordinates = self.top
                 output_coordinates = self.coordsio
                 if cocos_and_coords and output_coordinates:
+                    ods_coordinates = self.top
                     all_coordinates = []
                     coordinates = []
-                    if len(output_coordinates) and 'coordinates' in info:
-                        all_coordinates = list(map(lambda x: u2o(x, self.location), info['coordinates']))
+                    if len(output_coordinates) and node.ndim:
+                        all_coordinates = list(map(lambda x: u2o(x, self.location), node.coordinates))
                         coordinates = list(filter(lambda coord: not coord.startswith('1...'), all_coordinates))
                     if len(coordinates):
                         # if all coordinates information is present
@@ -1384,7 +1879,7 @@ class ODS(MutableMapping):
                             ):
 
                                 # for the time being omas interpolates only 1D quantities
-                                if len(info['coordinates']) > 1:
+                                if len(node.coordinates) > 1:
                                     raise Exception('coordio does not support multi-dimentional interpolation just yet')
 
                                 # if the (first) coordinate is in output_coordinates
@@ -1422,11 +1917,11 @@ class ODS(MutableMapping):
                                 topic='coordsio',
                             )
 
-                    elif ulocation in omas_coordinates(self.imas_version) and location in output_coordinates:
+                    elif node.is_coordinate and location in output_coordinates:
                         value = output_coordinates.__getitem__(location, False)
 
                 # handle units (Python pint package)
-                if 'units' in info and self.unitsio:
+                if node.units is not None and self.unitsio:
                     import pint
                     from .omas_setup import ureg
 
@@ -1434,7 +1929,7 @@ class ODS(MutableMapping):
                         import pint
 
                         ureg[0] = pint.UnitRegistry()
-                    value = value * getattr(ureg[0], info['units'])
+                    value = value * getattr(ureg[0], node.units)
 
             # return uncertain array if errors are filled
             if self.uncertainio and isinstance(key[0], str) and key[0] + '_error_upper' in self:
@@ -1451,11 +1946,18 @@ class ODS(MutableMapping):
     def __delitem__(self, key):
         # handle individual keys as well as full paths
         key = p2l(key)
+        self._structure_changed()
         if len(key) > 1:
             # if the user has entered path rather than a single key
             del self.getraw(key[0])[key[1:]]
         else:
-            return self.omas_data.__delitem__(key[0])
+            self.omas_data.__delitem__(key[0])
+            self._invalidate_fingerprint()
+            # elements of arrays of structures that followed the deleted one have shifted
+            if isinstance(self.omas_data, list):
+                for k, value in enumerate(self.omas_data):
+                    if isinstance(value, ODS):
+                        value._key = k
 
     def paths(self, return_empty_leaves=False, traverse_code_parameters=True, include_structures=False, dynamic=True, verbose=False, **kw):
         """
@@ -1564,7 +2066,7 @@ class ODS(MutableMapping):
 
         for c, k in enumerate(key):
             # h.omas_data is None when dict/list behaviour is not assigned
-            if h.omas_data is not None and k in h.keys(dynamic=0):
+            if h.omas_data is not None and h._has_key(k):
                 h = h.__getitem__(k, False)
                 continue  # continue to the next key
 
@@ -1630,6 +2132,36 @@ class ODS(MutableMapping):
             else:
                 return []
 
+    def _has_key(self, key):
+        """
+        Equivalent to `key in self.keys(dynamic=0)` without generating the list of keys
+
+        :param key: key
+
+        :return: whether key is in the ODS
+        """
+        if isinstance(self.omas_data, dict):
+            return key in self.omas_data
+        elif isinstance(self.omas_data, list):
+            return key in range(len(self.omas_data))
+        else:
+            return False
+
+    def _has_path(self, path):
+        """
+        Equivalent to `path in self` without dynamic loading
+
+        :param path: list of keys
+
+        :return: whether path is in the ODS
+        """
+        h = self
+        for k in path:
+            if not isinstance(h, ODS) or not h._has_key(k):
+                return False
+            h = h.getraw(k)
+        return True
+
     def values(self, dynamic=True):
         return [self[item] for item in self.keys(dynamic=dynamic)]
 
@@ -1706,16 +2238,30 @@ class ODS(MutableMapping):
         for item in omas_ods_attrs:
             self.__dict__.setdefault(item, None)
         if isinstance(self.omas_data, list):
-            for value in self.omas_data:
+            for k, value in enumerate(self.omas_data):
                 if isinstance(value, ODS):
                     value.parent = self
+                    value._key = k
         elif isinstance(self.omas_data, dict):
             for key in self.omas_data:
                 if isinstance(self.omas_data[key], ODS):
                     self.omas_data[key].parent = self
+                    self.omas_data[key]._key = key
         return self
 
     def __deepcopy__(self, memo):
+        return self._copy(memo, shallow_leaves=False)
+
+    def _copy(self, memo, shallow_leaves):
+        """
+        Copy of the ODS structure, with leaves that are either deep-copied or read-only views of the original data
+
+        :param memo: copy.deepcopy memo dictionary
+
+        :param shallow_leaves: leaves of the copy share the data of this ODS
+
+        :return: copy of current ODS object
+        """
         tmp = self.same_init_ods()
         memo[id(self)] = tmp
         if self.omas_data is None:
@@ -1723,30 +2269,118 @@ class ODS(MutableMapping):
         elif isinstance(self.omas_data, list):
             tmp.omas_data = []
             for k, value in enumerate(self.omas_data):
-                tmp.omas_data.append(value.__deepcopy__(memo=memo))
+                tmp.omas_data.append(value._copy(memo, shallow_leaves))
                 tmp.omas_data[k].parent = tmp
+                tmp.omas_data[k]._key = k
         else:
             tmp.omas_data = {}
-            for key in self.omas_data:
-                if isinstance(self.omas_data[key], ODS):
-                    tmp.omas_data[key] = self[key].__deepcopy__(memo=memo)
+            for key, value in self.omas_data.items():
+                if isinstance(value, ODS):
+                    tmp.omas_data[key] = value._copy(memo, shallow_leaves)
                     tmp.omas_data[key].parent = tmp
+                    tmp.omas_data[key]._key = key
+                elif not shallow_leaves or isinstance(value, (dict, list)):
+                    tmp.omas_data[key] = copy.deepcopy(value, memo=memo)
+                elif isinstance(value, numpy.ndarray):
+                    # read-only views: assigning new data to the copy replaces the view,
+                    # and modifying the copy in place raises an error rather than modifying the original ODS
+                    # (the original ODS is left writable, and the copy aliases its data)
+                    tmp.omas_data[key] = value.view()
+                    tmp.omas_data[key].flags.writeable = False
                 else:
-                    tmp.omas_data[key] = copy.deepcopy(self[key], memo=memo)
+                    tmp.omas_data[key] = value
         return tmp
 
-    def copy(self):
+    def copy(self, shallow_leaves=False):
         """
-        :return: copy.deepcopy of current ODS object
+        :param shallow_leaves: do not duplicate the data of the leaves (much faster and memory efficient).
+                               The arrays of the copy are read-only views of the arrays of this ODS, so new data
+                               can be assigned to the copy, but changes made in place to this ODS show in the copy
+
+        :return: copy of current ODS object
         """
+        if shallow_leaves:
+            return self._copy({}, shallow_leaves=True)
         return copy.deepcopy(self)
 
+    def fingerprint(self, path=None):
+        """
+        Hash of the data of the ODS, or of one of its locations
+
+        The hash of a leaf is computed from its data type, shape, and binary data,
+        and the hash of a structure from the keys and hashes of its children,
+        so that ODSs (or subtrees) with identical data have the same fingerprint.
+        The hashes of the structures are memoized, and are discarded when data is assigned to them
+        (or, for structures that contain code parameters, when any code parameter is changed).
+        NOTE: arrays that are modified in place (eg. `ods['equilibrium.time'][0] = 0.0`) must be assigned
+              again to the ODS for the change to be reflected in the fingerprint
+
+        :param path: ODS location (the whole ODS if None)
+
+        :return: hexadecimal hash string
+        """
+        value = self
+        if path is not None:
+            for key in p2l(path):
+                value = value.getraw(key)
+        if isinstance(value, ODS):
+            return value._fingerprint_digest().hex()
+        return _leaf_fingerprint(value).hex()
+
+    def _fingerprint_digest(self):
+        """
+        :return: hash of the data of this ODS (computed only if the data has changed since the last call)
+        """
+        # code parameters do not know what ODS they belong to, so the hashes of the structures
+        # that contain them are stamped with the counter of the changes to code parameters
+        if self._fingerprint is not None:
+            digest, stamp = self._fingerprint
+            if stamp is None or stamp == _code_parameters_changes:
+                return digest
+
+        import hashlib
+
+        hash = hashlib.sha1()
+        stamp = None
+        if isinstance(self.omas_data, list):
+            hash.update(b'list')
+            keys = range(len(self.omas_data))
+        elif isinstance(self.omas_data, dict):
+            hash.update(b'dict')
+            keys = sorted(self.omas_data.keys())
+        else:
+            keys = []
+        for key in keys:
+            value = self.omas_data[key]
+            hash.update(repr(key).encode('utf-8'))
+            if isinstance(value, ODS):
+                hash.update(value._fingerprint_digest())
+                if value._fingerprint[1] is not None:
+                    stamp = _code_parameters_changes
+            else:
+                hash.update(_leaf_fingerprint(value))
+                if isinstance(value, CodeParameters):
+                    stamp = _code_parameters_changes
+        self._fingerprint = (hash.digest(), stamp)
+        return self._fingerprint[0]
+
+    def _invalidate_fingerprint(self):
+        """
+        Discard the memoized hash of this ODS and of its parents
+        """
+        ods = self
+        while ods is not None and ods._fingerprint is not None:
+            ods._fingerprint = None
+            ods = ods.parent
+
     def clear(self):
         """
         remove data from a branch
 
         :return: current ODS object
         """
+        self._structure_changed()
+        self._invalidate_fingerprint()
         if isinstance(self.omas_data, dict):
             self.omas_data.clear()
         elif isinstance(self.omas_data, list):
@@ -1873,6 +2507,28 @@ class ODS(MutableMapping):
 
         return coords
 
+    def _paths_catalogue(self):
+        """
+        Catalogue of the ODS locations that have data, which is rebuilt only when the structure of the top-level ODS changes
+
+        :return: tuple with list of ODS locations (same order as full_paths) and sorted list of (location, index) tuples
+        """
+        if self.active_dynamic:
+            paths = list(map(l2o, self.full_paths()))
+            return paths, sorted(zip(paths, range(len(paths))))
+        top = self.top
+        stamp = (top._structure_changes, _code_parameters_changes, self.location)
+        if self._catalogue is None or self._catalogue[0]() is not top or self._catalogue[1] != stamp:
+            paths = list(map(l2o, self.full_paths()))
+            self._catalogue = (weakref.ref(top), stamp, paths, sorted(zip(paths, range(len(paths)))))
+        return self._catalogue[2:]
+
+    def _structure_changed(self):
+        """
+        Record a change to the structure of the data on the top-level ODS (used to invalidate the catalogues of paths)
+        """
+        self.top._structure_changes += 1
+
     def search_paths(self, search_pattern, n=None, regular_expression_startswith=''):
         """
         Find ODS locations that match a pattern
@@ -1897,11 +2553,16 @@ class ODS(MutableMapping):
             else:
                 search_pattern = search_pattern[len(regular_expression_startswith) :]
 
-        search = re.compile(search_pattern)
+        search, prefix = _search_pattern(search_pattern)
+        paths, index = self._paths_catalogue()
+        # only the locations that start with the literal prefix of the search pattern are matched
         matches = []
-        for path in map(l2o, self.full_paths()):
-            if re.match(search, path):
-                matches.append(path)
+        for path, k in itertools.islice(index, bisect.bisect_left(index, (prefix,)), None):
+            if not path.startswith(prefix):
+                break
+            if search.match(path):
+                matches.append(k)
+        matches = [paths[k] for k in sorted(matches)]
         if n is not None and len(matches) != n:
             raise ValueError(
                 'Found %d matches of `%s` instead of the %d requested\n%s' % (len(matches), search_pattern, n, '\n'.join(matches))
@@ -2088,7 +2749,7 @@ class ODS(MutableMapping):
         # figure out format used
         ext, args = _handle_extension(*args)
         # save
-        return eval('save_omas_' + ext)(self, *args, **kw)
+        return __getattr__('save_omas_' + ext)(self, *args, **kw)
 
     def load(self, *args, **kw):
         r"""
@@ -2119,7 +2780,7 @@ class ODS(MutableMapping):
             kw['consistency_check'] = consistency_check
 
         # load the data
-        results = eval('load_omas_' + ext)(*args, **kw)
+        results = __getattr__('load_omas_' + ext)(*args, **kw)
 
         # mongoDB may return more than one result, or none
         if ext in ['mongo']:
@@ -2131,6 +2792,8 @@ class ODS(MutableMapping):
                 results = list(results.values())[0]
 
         # update the data
+        self._structure_changed()
+        self._invalidate_fingerprint()
         self.omas_data = results.omas_data
         if isinstance(self.omas_data, list):
             for value in self.omas_data:
@@ -2183,8 +2846,8 @@ class ODS(MutableMapping):
         # figure out format used
         ext, args = _handle_extension(*args)
 
-        storage_options = ['nc', 'imas']
-        if ext in ['nc', 'imas', 'machine']:
+        storage_options = ['nc', 'h5', 'bin', 'ds', 'imas']
+        if ext in ['nc', 'h5', 'bin', 'ds', 'imas', 'machine']:
             # apply consistency checks
             if consistency_check != self.consistency_check:
                 self.consistency_check = consistency_check
@@ -2193,6 +2856,18 @@ class ODS(MutableMapping):
                 from omas.omas_nc import dynamic_omas_nc
 
                 self.dynamic = dynamic_omas_nc(*args, **kw)
+            elif ext == 'h5':
+                from omas.omas_h5 import dynamic_omas_h5
+
+                self.dynamic = dynamic_omas_h5(*args, **kw)
+            elif ext == 'bin':
+                from omas.omas_bin import dynamic_omas_bin
+
+                self.dynamic = dynamic_omas_bin(*args, **kw)
+            elif ext == 'ds':
+                from omas.omas_ds import dynamic_omas_ds
+
+                self.dynamic = dynamic_omas_ds(*args, **kw)
             elif ext == 'imas':
                 from omas.omas_imas import dynamic_omas_imas
 
@@ -2205,7 +2880,7 @@ class ODS(MutableMapping):
             self.dynamic.open()
             return self
         else:
-            options = storage_options + list(machines(None).keys())
+            options = storage_options + list(__getattr__('machines')(None).keys())
             options.pop(options.index('sample'))
             raise ValueError(ext + ' : dynamic loading not supported. Supported options are: ' + str(options))
 
@@ -2213,7 +2888,18 @@ class ODS(MutableMapping):
         if self.dynamic:
             self.dynamic.close()
 
-    def diff(self, ods, ignore_type=False, ignore_empty=False, ignore_keys=[], ignore_default_keys=True, rtol=1.0e-5, atol=1.0e-8):
+    def diff(
+        self,
+        ods,
+        ignore_type=False,
+        ignore_empty=False,
+        ignore_keys=[],
+        ignore_default_keys=True,
+        rtol=1.0e-5,
+        atol=1.0e-8,
+        max_differences=None,
+        workers=None,
+    ):
         """
         return differences between this ODS and the one passed
 
@@ -2232,6 +2918,10 @@ class ODS(MutableMapping):
 
         atol : The absolute tolerance parameter
 
+        :param max_differences: stop the comparison after this number of differences is found
+
+        :param workers: number of threads used to compare the IDSs concurrently
+
         :return: dictionary with differences
         """
         return different_ods(
@@ -2243,6 +2933,8 @@ class ODS(MutableMapping):
             ignore_default_keys=ignore_default_keys,
             rtol=rtol,
             atol=atol,
+            max_differences=max_differences,
+            workers=workers,
         )
 
     def diff_attrs(self, ods, attrs=omas_ods_attrs, verbose=False):
@@ -2393,6 +3085,8 @@ class ODS(MutableMapping):
 
         :return: ODX
         """
+        from .omas_ds import ods_2_odx
+
         return ods_2_odx(self, homogeneous=homogeneous)
 
     def info(self, location):
@@ -2464,6 +3158,9 @@ class ODC(ODS):
 
     @consistency_check.setter
     def consistency_check(self, consistency_value):
+        self._set_consistency_check(consistency_value)
+
+    def _set_consistency_check(self, consistency_value, location=None, structure=None, imas_version=None):
         for item in self.keys(dynamic=0):
             self[item].consistency_check = consistency_value
         self._consistency_check = consistency_value
@@ -2473,6 +3170,9 @@ class ODC(ODS):
             cls = ODS
         return ODS.same_init_ods(self, cls=cls)
 
+    def _has_key(self, key):
+        return key in self.keys(dynamic=0)
+
     def keys(self, dynamic=True):
         keys = list(self.omas_data.keys())
         if keys is None:
@@ -2494,7 +3194,7 @@ class ODC(ODS):
             if not ext:
                 ext = 'pkl'
 
-        if ext in ['pkl', 'nc', 'json', 'h5']:
+        if ext in ['pkl', 'bin', 'nc', 'json', 'ndjson', 'h5']:
             pass
         else:
             raise ValueError(f'Cannot save ODC to {ext} format')
@@ -2513,7 +3213,7 @@ class ODC(ODS):
 
         if ext == 'pkl':
             pass
-        elif ext in ['h5', 'nc', 'json']:
+        elif ext in ['bin', 'h5', 'nc', 'json', 'ndjson']:
             kw['cls'] = ODC
         else:
             raise ValueError(f'Cannot load ODC from {ext} format')
@@ -2670,6 +3370,9 @@ class CodeParameters(dict):
 
         :return: value
         """
+        global _code_parameters_changes
+
+        _code_parameters_changes += 1
         return dict.__setitem__(self, key, value)
 
     def update(self, value):
@@ -2836,6 +3539,28 @@ except ImportError as _excp:
     printe('OMAS plotting function are not available: ' + repr(_excp))
 
 
+# --------------------------------------------
+# parallel save and load of IDSs
+# --------------------------------------------
+def merge_ods_parts(ods, parts, consistency_check):
+    """
+    Merge the top-level data of ODSs that have been loaded separately (eg. one IDS per worker process)
+
+    :param ods: ODS to merge the data into
+
+    :param parts: list of `omas_data` dictionaries of top-level ODSs, whose consistency_check has already been set
+
+    :param consistency_check: consistency_check that was used for loading the parts
+
+    :return: ods
+    """
+    for part in parts:
+        for key, value in part.items():
+            ods.setraw(key, value)
+    ods._consistency_check = consistency_check
+    return ods
+
+
 # --------------------------------------------
 # save and load OMAS with Python pickle
 # --------------------------------------------
@@ -2877,10 +3602,12 @@ def load_omas_pkl(filename, consistency_check=None, imas_version=None):
         except UnicodeDecodeError:
             # to support ODSs created with Python2
             tmp = pickle.load(f, encoding="latin1")
+    # pickled ODSs carry their own consistency_check and imas_version and do not need to be validated again if those do not change
+    stamp = tmp.consistency_stamp()
     if imas_version is not None:
         tmp.imas_version = imas_version
     if consistency_check is not None:
-        tmp.consistency_check = consistency_check
+        tmp._set_consistency_check_trusted(consistency_check, stamp)
     return tmp
 
 
@@ -2900,20 +3627,75 @@ def through_omas_pkl(ods):
 
 
 # --------------------------------------------
-# import other omas tools and methods in this namespace
+# other omas tools and methods are imported in this namespace when first accessed
+# so that `import omas` does not pay for importing all of the backends and their dependencies
 # --------------------------------------------
-from .omas_imas import *
-from .omas_s3 import *
-from .omas_nc import *
-from .omas_json import *
-from .omas_hdc import *
-from .omas_uda import *
-from .omas_h5 import *
-from .omas_ds import *
-from .omas_ascii import *
-from .omas_mongo import *
-from .omas_symbols import *
-from .omas_machine import *
-from .utilities.machine_mapping_decorator import *
-from .utilities.omas_mds import *
+# fmt: off
+_lazy_modules = {
+    '.omas_imas': [
+        'IDS', 'imas_open', 'imas_set', 'imas_empty', 'imas_get', 'infer_fetch_paths', 'filled_paths_in_ids',
+        'reach_ids_location', 'reach_ds_location', 'keys_leading_to_a_filled_path',
+        'save_omas_imas', 'load_omas_imas', 'through_omas_imas', 'dynamic_omas_imas', 'browse_imas', 'load_omas_iter_scenario',
+    ],
+    '.omas_s3': ['remote_uri', 'save_omas_s3', 'load_omas_s3', 'through_omas_s3', 'list_omas_s3', 'del_omas_s3'],
+    '.omas_nc': ['get_ds_item', 'save_omas_nc', 'load_omas_nc', 'through_omas_nc', 'dynamic_omas_nc'],
+    '.omas_bin': ['save_omas_bin', 'load_omas_bin', 'through_omas_bin', 'dynamic_omas_bin'],
+    '.omas_json': [
+        'save_omas_json', 'load_omas_json', 'through_omas_json',
+        'save_omas_ndjson', 'load_omas_ndjson', 'iter_omas_ndjson', 'through_omas_ndjson',
+    ],
+    '.omas_hdc': ['HDC', 'save_omas_hdc', 'load_omas_hdc', 'through_omas_hdc'],
+    '.omas_uda': ['pyuda', 'load_omas_uda', 'filled_paths_in_uda', 'uda_get_shape', 'offset', 'uda_get'],
+    '.omas_h5': ['dict2hdf5', 'convertDataset', 'save_omas_h5', 'load_omas_h5', 'through_omas_h5'],
+    '.omas_ds': [
+        'ODX', 'save_omas_ds', 'load_omas_ds', 'through_omas_ds', 'dynamic_omas_ds',
+        'save_omas_dx', 'load_omas_dx', 'through_omas_dx', 'ods_2_odx', 'odx_2_ods',
+    ],
+    '.omas_ascii': ['identify_imas_type', 'imas_fmt', 'imas_eval', 'imas_ascii_key_sorter', 'save_omas_ascii', 'load_omas_ascii', 'through_omas_ascii'],
+    '.omas_mongo': ['get_mongo_credentials', 'save_omas_mongo', 'load_omas_mongo', 'through_omas_mongo'],
+    '.omas_symbols': ['latexit'],
+    '.omas_machine': [
+        'machine_expression_types', 'machines', 'machine_mappings', 'reload_machine_mappings', 'load_omas_machine',
+        'test_machine_mapping_functions',
+    ],
+    '.utilities.machine_mapping_decorator': ['machine_mapping_function'],
+    '.utilities.omas_mds': ['mdstree', 'mdsvalue', 'mdsbatch', 'mds_stats', 'mds_record', 'mds_recording'],
+}
+# fmt: on
+_lazy_attributes = {item: module for module, items in _lazy_modules.items() for item in items}
+
+
+def __getattr__(name):
+    """
+    Import omas backends only when one of their attributes is first accessed (PEP 562)
+
+    :param name: attribute name
+
+    :return: attribute
+    """
+    if name in globals():
+        return globals()[name]
+    elif name in _lazy_attributes:
+        module = importlib.import_module(_lazy_attributes[name], __package__)
+        for item in _lazy_modules[_lazy_attributes[name]]:
+            globals()[item] = getattr(module, item)
+        return globals()[name]
+    elif not name.startswith('_'):
+        # other names that the backends export (eg. `imas_nan`) are looked up in all of the backends,
+        # with the later ones taking precedence as when they were star-imported in this namespace
+        value, found = None, False
+        for module in _lazy_modules:
+            module = importlib.import_module(module, __package__)
+            if name in getattr(module, '__all__', [item for item in dir(module) if not item.startswith('_')]) and hasattr(module, name):
+                value, found = getattr(module, name), True
+        if found:
+            globals()[name] = value
+            return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()).union(_lazy_attributes))
+
+
 from . import omas_structure
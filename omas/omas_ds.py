@@ -4,8 +4,7 @@
 '''
 
 from .omas_utils import *
-from .omas_core import ODS, omas_environment
-import itertools
+from .omas_core import ODS, dynamic_ODS, omas_environment
 
 
 class ODX(MutableMapping):
@@ -68,14 +67,22 @@ class ODX(MutableMapping):
         self.omas_data = ods.omas_data
         return self
 
-    def to_ods(self, consistency_check=True):
+    def to_ods(self, consistency_check=True, dynamic=False):
         """
         Generate a ODS from current ODX
 
         :param consistency_check: use consistency_check flag in ODS
 
+        :param dynamic: return an ODS that is backed by the tensors of this ODX
+                        (data is pulled in the ODS only when first requested, and slices across arrays of structures are tensor views)
+
         :return: ODS
         """
+        if dynamic:
+            ods = ODS(consistency_check=consistency_check)
+            ods.dynamic = dynamic_omas_ds(odx=self)
+            ods.dynamic.open()
+            return ods
         return odx_2_ods(self, consistency_check=consistency_check)
 
 
@@ -87,6 +94,9 @@ def save_omas_ds(ods, filename):
 
     :param filename: filename or file descriptor to save to
     """
+    # tensor backed ODS whose data has not been pulled in memory
+    if isinstance(ods.active_dynamic, dynamic_omas_ds) and not ods.omas_data:
+        return ods.dynamic.odx.omas_data.to_netcdf(filename, format="NETCDF4")
     DS = ods.dataset()
     return DS.to_netcdf(filename, format="NETCDF4")
 
@@ -161,12 +171,7 @@ def odx_2_ods(odx, consistency_check=True):
                 ods[uitem] = value
                 continue
             # unroll
-            for kkk in itertools.product(*map(range, DS[uitem].shape[:depth])):
-                item = uitem.replace(':', '{}').format(*kkk)
-                tmp = value
-                for k in kkk:
-                    tmp = tmp[k]
-                ods[item] = tmp
+            ods.set_many(uitem, value)
     ods.consistency_check = consistency_check
     return ods
 
@@ -191,6 +196,88 @@ def load_omas_ds(filename, consistency_check=True):
     return ods
 
 
+class dynamic_omas_ds(dynamic_ODS):
+    """
+    Class that provides dynamic data loading from the tensors of an ODX (loaded from file or in memory)
+    Slices across arrays of structures (eg. `ods['equilibrium.time_slice.:.profiles_1d.psi']`) are returned as views of the tensors
+    This class is not to be used by itself, but via the ODS.open() or ODX.to_ods(dynamic=True) methods.
+    """
+
+    def __init__(self, filename=None, odx=None):
+        self.kw = {'filename': filename}
+        self.odx = odx
+        self.active = False
+        self._keys = {}
+
+    def open(self):
+        printd('Dynamic open  %s' % self.kw, topic='dynamic')
+        if self.kw['filename'] is not None:
+            self.odx = load_omas_dx(self.kw['filename'])
+        self._keys = {}
+        self.active = True
+        return self
+
+    def close(self):
+        printd('Dynamic close %s' % self.kw, topic='dynamic')
+        if self.kw['filename'] is not None:
+            self.odx = None
+        self.active = False
+        return self
+
+    def tensor(self, key):
+        """
+        Return data of the ODX at a location where arrays of structures can be indexed by integers and slices
+
+        :param key: location as list of strings, integers, and slices
+
+        :return: view of the tensor or None if location is not in the ODX
+        """
+        if not self.active:
+            raise RuntimeError('Dynamic link broken: %s' % self.kw)
+        lkey = [slice(None) if k == ':' else k for k in p2l(key)]
+        ukey = l2u([':' if isinstance(k, slice) else k for k in lkey])
+        for item in self.odx.ucache.get(ukey, []):
+            index = []
+            for k, uk in zip(lkey, p2l(item)):
+                if uk == ':':
+                    index.append(k)
+                elif uk != k:
+                    break
+            else:
+                data = self.odx.omas_data[item].values
+                try:
+                    data = data[tuple(index)]
+                except IndexError:
+                    return None
+                return data
+        return None
+
+    def __getitem__(self, key):
+        printd('Dynamic read  %s: %s' % (self.kw, key), topic='dynamic')
+        data = self.tensor(key)
+        if data is None:
+            raise KeyError(key)
+        return data
+
+    def __contains__(self, key):
+        return self.tensor(key) is not None
+
+    def keys(self, location):
+        if location not in self._keys:
+            lkey = p2l(location)
+            keys = []
+            for item in self.odx.omas_data.data_vars:
+                litem = p2l(item)
+                if len(litem) <= len(lkey) or any(uk != ':' and uk != k for k, uk in zip(lkey, litem)):
+                    continue
+                if litem[len(lkey)] == ':':
+                    keys.extend(range(self.odx.omas_data[item].shape[litem[: len(lkey)].count(':')]))
+                else:
+                    keys.append(litem[len(lkey)])
+            self._keys[location] = sorted(set(keys), key=lambda x: (isinstance(x, str), x))
+        return self._keys[location]
+
+
 def through_omas_ds(ods, method=['function', 'class_method'][1]):
     """
     Test save and load ODS via xarray file format
@@ -4,7 +4,7 @@
 '''
 
 from .omas_utils import *
-from .omas_core import ODS
+from .omas_core import ODS, ODC, dynamic_ODS, merge_ods_parts
 
 
 def dict2hdf5(filename, dictin, groupname='', recursive=True, lists_as_dicts=False, compression=None):
@@ -21,7 +21,7 @@ def dict2hdf5(filename, dictin, groupname='', recursive=True, lists_as_dicts=Fal
 
     :param lists_as_dicts: convert lists to dictionaries with integer strings
 
-    :param compression: gzip compression level
+    :param compression: None, 'gzip', 'lzf', 'blosc' (requires hdf5plugin) or gzip compression level (0-9)
     """
     import h5py
 
@@ -35,6 +35,9 @@ def dict2hdf5(filename, dictin, groupname='', recursive=True, lists_as_dicts=Fal
     if isinstance(dictin, ODS):
         dictin = dictin.omas_data
 
+    # compression keywords are evaluated once and then handed down the recursion
+    compression_kw = compression if isinstance(compression, dict) else _h5_compression(compression)
+
     if groupname:
         g = parent.create_group(groupname)
     else:
@@ -47,11 +50,11 @@ def dict2hdf5(filename, dictin, groupname='', recursive=True, lists_as_dicts=Fal
 
         if isinstance(item, dict):
             if recursive:
-                dict2hdf5(g, item, str(key), recursive=recursive, lists_as_dicts=lists_as_dicts, compression=compression)
+                dict2hdf5(g, item, str(key), recursive=recursive, lists_as_dicts=lists_as_dicts, compression=compression_kw)
 
         elif lists_as_dicts and isinstance(item, (list, tuple)) and not isinstance(item, numpy.ndarray):
             item = {'%d' % k: v for k, v in enumerate(item)}
-            dict2hdf5(g, item, key, recursive=recursive, lists_as_dicts=lists_as_dicts, compression=compression)
+            dict2hdf5(g, item, key, recursive=recursive, lists_as_dicts=lists_as_dicts, compression=compression_kw)
 
         else:
             if item is None:
@@ -61,7 +64,7 @@ def dict2hdf5(filename, dictin, groupname='', recursive=True, lists_as_dicts=Fal
                 tmp = tmp.astype('S')
             elif tmp.dtype.name.lower().startswith('o'):
                 if is_uncertain(tmp):
-                    g.create_dataset(key + '_error_upper', std_devs(tmp).shape, dtype=std_devs(tmp).dtype, compression=compression)[
+                    g.create_dataset(key + '_error_upper', std_devs(tmp).shape, dtype=std_devs(tmp).dtype, **compression_kw)[
                         ...
                     ] = std_devs(tmp)
                     tmp = nominal_values(tmp)
@@ -70,20 +73,241 @@ def dict2hdf5(filename, dictin, groupname='', recursive=True, lists_as_dicts=Fal
             if tmp.shape == ():
                 g.create_dataset(key, tmp.shape, dtype=tmp.dtype)[...] = tmp
             else:
-                g.create_dataset(key, tmp.shape, dtype=tmp.dtype, compression=compression)[...] = tmp
+                g.create_dataset(key, tmp.shape, dtype=tmp.dtype, **compression_kw)[...] = tmp
+
+    return g
+
+
+def _h5_compression(compression):
+    """
+    Keywords of h5py create_dataset that set the compression of the data
+
+    :param compression: None, 'gzip', 'lzf', 'blosc' (requires hdf5plugin) or gzip compression level (0-9)
 
+    :return: dictionary with keywords
+    """
+    if compression is None:
+        return {}
+    elif compression == 'blosc':
+        try:
+            import hdf5plugin
+        except ImportError:
+            printe('hdf5plugin is not installed: using gzip instead of blosc compression')
+            return {'compression': 'gzip'}
+        return dict(hdf5plugin.Blosc())
+    elif isinstance(compression, (int, numpy.integer)):
+        return {'compression': 'gzip', 'compression_opts': int(compression)}
+    return {'compression': compression}
+
+
+# size in bytes targeted for the chunks of the tensors
+_h5_chunk_bytes = 2**20
+
+
+def _h5_chunks(shape, naos, itemsize):
+    """
+    Chunk shape of a tensor, so that reading an element of its arrays of structures touches only few chunks
+
+    :param shape: shape of the tensor
+
+    :param naos: number of leading dimensions that are arrays of structures
+
+    :param itemsize: size in bytes of each element of the tensor
+
+    :return: tuple with chunk shape (None if the tensor is not chunked)
+    """
+    if not naos or not numpy.prod(shape):
+        return None
+    chunks = list(shape)
+    size = itemsize * int(numpy.prod(shape[naos:]))
+    for k in reversed(range(naos)):
+        chunks[k] = int(max(1, min(shape[k], _h5_chunk_bytes // size)))
+        size *= chunks[k]
+    return tuple(chunks)
+
+
+def _h5_leaves(data, path, leaves):
+    """
+    Recursive utility function that collects the raw leaves of an ODS
+
+    :param data: omas_data of an ODS (or a CodeParameters dictionary)
+
+    :param path: path of data
+
+    :param leaves: list where tuples with (path, value) are appended
+    """
+    for key, value in data.items() if isinstance(data, dict) else enumerate(data):
+        if isinstance(value, ODS):
+            if value.omas_data is not None:
+                _h5_leaves(value.omas_data, path + [key], leaves)
+        elif isinstance(value, dict):
+            _h5_leaves(value, path + [key], leaves)
+        else:
+            leaves.append((path + [key], value))
+
+
+def _h5_object_leaf(path, value):
+    """
+    Utility function that converts leaves that are arrays of objects to arrays that can be saved to hdf5
+
+    :param path: path of the leaf
+
+    :param value: array of objects
+
+    :return: list of tuples with (path, value), which is empty if the leaf cannot be saved
+    """
+    if is_uncertain(value):
+        return [(path, nominal_values(value)), (path[:-1] + [str(path[-1]) + '_error_upper'], std_devs(value))]
+    elif all(isinstance(item, str) for item in value.flat):
+        return [(path, value.astype('S'))]
+    try:
+        tmp = numpy.array(value.tolist())
+    except ValueError:
+        tmp = value
+    if tmp.dtype.kind in 'biufc':
+        return [(path, tmp)]
+    printe('WARNING: %s is not saved to hdf5 since it is an array of objects of different types or shapes' % l2o(path))
+    return []
+
+
+def tensors2hdf5(filename, ods, compression=None):
+    """
+    Save an ODS to hdf5 file, collecting the leaves of arrays of structures in chunked tensors
+
+    Leaves that are present in all the elements of arrays of structures with the same shape and type are saved
+    as a single dataset named after their universal location (eg. `equilibrium.time_slice.:.profiles_1d.psi`).
+    Other leaves are saved as datasets named after their location (eg. `equilibrium.time_slice.0.profiles_1d.psi`).
+    Leaves that are arrays of objects are saved as arrays of strings, numbers, or (for uncertain data) as nominal values
+    and `_error_upper`, and are skipped with a warning if their elements have different types or shapes.
+
+    :param filename: hdf5 file or group to save to
+
+    :param ods: OMAS data set
+
+    :param compression: None, 'gzip', 'lzf', 'blosc' (requires hdf5plugin) or gzip compression level (0-9)
+
+    :return: hdf5 group
+    """
+    import h5py
+
+    if isinstance(filename, str):
+        with h5py.File(filename, 'w') as g:
+            tensors2hdf5(g, ods, compression=compression)
+        return
+    g = filename
+
+    compression_kw = _h5_compression(compression)
+
+    # group leaves by universal location
+    leaves = []
+    _h5_leaves(ods.omas_data or {}, [], leaves)
+    groups = {}
+    for path, value in leaves:
+        if value is None:
+            value = '_None'
+        value = numpy.asarray(value)
+        if value.dtype.kind == 'U':
+            items = [(path, value.astype('S'))]
+        elif value.dtype.kind == 'O':
+            items = _h5_object_leaf(path, value)
+        else:
+            items = [(path, value)]
+        for path, value in items:
+            groups.setdefault(l2u(path), []).append((tuple(k for k in path if isinstance(k, int)), path, value))
+
+    for ukey, items in groups.items():
+        naos = len(items[0][0])
+        shape_aos = tuple(max(index[k] for index, path, value in items) + 1 for k in range(naos))
+        if (
+            naos
+            and len(items) == numpy.prod(shape_aos)
+            and all(value.shape == items[0][2].shape and value.dtype.kind == items[0][2].dtype.kind for index, path, value in items)
+        ):
+            items.sort(key=lambda item: item[0])
+            tensor = numpy.stack([value for index, path, value in items]).reshape(shape_aos + items[0][2].shape)
+            datasets = [(ukey, tensor)]
+        else:
+            datasets = [(l2o(path), value) for index, path, value in items]
+        for name, value in datasets:
+            if value.shape == ():
+                g.create_dataset(name, data=value)
+            else:
+                chunks = _h5_chunks(value.shape, name.count(':'), value.dtype.itemsize)
+                g.create_dataset(name, data=value, chunks=chunks, **compression_kw)
+    g.attrs['omas_layout'] = 'tensor'
     return g
 
 
-def save_omas_h5(ods, filename):
+def _save_ids_h5(shared, ids):
+    """
+    Save a single IDS to its own HDF5 file (run by the worker processes of save_omas_h5)
+    """
+    ods, tmpdir, compression = shared
+    filename = tmpdir + os.sep + ids + '.h5'
+    dict2hdf5(filename, {ids: ods.getraw(ids)}, lists_as_dicts=True, compression=compression)
+    return filename
+
+
+def save_omas_h5(ods, filename, workers=None, layout='tree', compression=None):
     """
     Save an ODS to HDF5
 
     :param ods: OMAS data set
 
     :param filename: filename or file descriptor to save to
+
+    :param workers: number of processes used to save the IDSs in parallel (only when saving to a filename with the `tree` layout)
+
+    :param layout: * 'tree': one group for each structure and one dataset for each leaf
+                   * 'tensor': leaves of arrays of structures are collected in chunked tensors (see `tensors2hdf5`)
+                     which allows reading individual elements of the arrays of structures via ODS.open()
+
+    :param compression: None, 'gzip', 'lzf', 'blosc' (requires hdf5plugin) or gzip compression level (0-9)
     """
-    return dict2hdf5(filename, ods, lists_as_dicts=True)
+    import shutil
+    import h5py
+
+    if layout not in ['tree', 'tensor']:
+        raise ValueError("HDF5 layout must be either 'tree' or 'tensor'")
+    elif layout == 'tensor' and isinstance(ods, ODC):
+        raise ValueError("HDF5 'tensor' layout is not supported for ODCs")
+
+    if isinstance(filename, str):
+        # each IDS is saved to a temporary file by a worker, and these are then copied into the output file
+        tmpdir = None
+        if workers and workers > 1 and layout == 'tree' and not ods.location and not isinstance(ods, ODC):
+            os.makedirs(omas_rcparams['tmp_omas_dir'], exist_ok=True)
+            tmpdir = tempfile.mkdtemp(dir=omas_rcparams['tmp_omas_dir'])
+        try:
+            if tmpdir is not None:
+                ids_filenames = omas_pool_map(_save_ids_h5, ods.keys(dynamic=0), workers, (ods, tmpdir, compression))
+            with h5py.File(filename, 'w') as g:
+                if tmpdir is None:
+                    return save_omas_h5(ods, g, layout=layout, compression=compression)
+                for ids, ids_filename in zip(ods.keys(dynamic=0), ids_filenames):
+                    with h5py.File(ids_filename, 'r') as data:
+                        data.copy(data[ids], g, name=ids)
+                _consistency_stamp_h5(ods, g)
+        finally:
+            if tmpdir is not None:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+        return
+
+    if layout == 'tensor':
+        g = tensors2hdf5(filename, ods, compression=compression)
+    else:
+        g = dict2hdf5(filename, ods, lists_as_dicts=True, compression=compression)
+    _consistency_stamp_h5(ods, g)
+    return g
+
+
+def _consistency_stamp_h5(ods, g):
+    """
+    Record that the data has been validated, so that it does not need to be validated again at load time
+    """
+    stamp = ods.consistency_stamp() if not ods.location else None
+    if stamp is not None:
+        g.attrs['omas_consistency_check'] = stamp
 
 
 def convertDataset(ods, data):
@@ -117,7 +341,52 @@ def convertDataset(ods, data):
             convertDataset(ods.setraw(oitem, ods.same_init_ods()), data[item])
 
 
-def load_omas_h5(filename, consistency_check=True, imas_version=omas_rcparams['default_imas_version'], cls=ODS):
+def convertTensors(ods, data, ids_list=None):
+    """
+    Utility function to map HDF5 file saved with the `tensor` layout to ODS
+
+    :param ods: input ODS to be populated
+
+    :param data: HDF5 file or group
+
+    :param ids_list: only load these IDSs (all if None)
+    """
+    with rcparams_environment(dynamic_path_creation='dynamic_array_structures'):
+        for item in data.keys():
+            path = p2l(item)
+            if ids_list is not None and path[0] not in ids_list:
+                continue
+            value = data[item][()]
+            if ':' not in path:
+                ods.setraw(path, value)
+                continue
+            # unroll the tensor
+            aos = [k for k, key in enumerate(path) if key == ':']
+            for index in numpy.ndindex(value.shape[: len(aos)]):
+                for k, i in zip(aos, index):
+                    path[k] = i
+                ods.setraw(path, value[index])
+
+
+def _load_ids_h5(shared, ids_list):
+    """
+    Load and check the consistency of some of the IDSs (run by the worker processes of load_omas_h5)
+    """
+    import h5py
+
+    filename, consistency_check, imas_version, cls, stamp = shared
+    ods = cls(imas_version=imas_version, consistency_check=False)
+    with h5py.File(filename, 'r') as data:
+        if data.attrs.get('omas_layout', 'tree') == 'tensor':
+            convertTensors(ods, data, ids_list)
+        else:
+            for ids in ids_list:
+                convertDataset(ods.setraw(ids, ods.same_init_ods()), data[ids])
+    ods._set_consistency_check_trusted(consistency_check, stamp)
+    return ods.omas_data
+
+
+def load_omas_h5(filename, consistency_check=True, imas_version=omas_rcparams['default_imas_version'], cls=ODS, workers=None):
     """
     Load ODS or ODC from HDF5
 
@@ -129,15 +398,180 @@ def load_omas_h5(filename, consistency_check=True, imas_version=omas_rcparams['d
 
     :param cls: class to use for loading the data
 
+    :param workers: number of processes used to load the IDSs in parallel (only when loading an ODS from a filename)
+
     :return: OMAS data set
     """
     import h5py
 
     ods = cls(imas_version=imas_version, consistency_check=False)
     with h5py.File(filename, 'r') as data:
-        convertDataset(ods, data)
-    ods.consistency_check = consistency_check
-    return ods
+        stamp = data.attrs.get('omas_consistency_check', None)
+        tensor_layout = data.attrs.get('omas_layout', 'tree') == 'tensor'
+        ids_list = list(dict.fromkeys(item.split('.')[0] for item in data.keys()))
+        if not workers or workers <= 1 or not isinstance(filename, str) or issubclass(cls, ODC):
+            if tensor_layout:
+                convertTensors(ods, data)
+            else:
+                convertDataset(ods, data)
+            ods._set_consistency_check_trusted(consistency_check, stamp)
+            return ods
+    # the HDF5 file is closed before the worker processes are started
+    shared = (filename, consistency_check, imas_version, cls, stamp)
+    parts = omas_pool_map(_load_ids_h5, omas_pool_chunks(ids_list, workers), workers, shared)
+    return merge_ods_parts(ods, parts, consistency_check)
+
+
+class dynamic_omas_h5(dynamic_ODS):
+    """
+    Class that provides dynamic data loading from HDF5 file
+
+    With files saved with the `tensor` layout only the chunks of the requested data are read,
+    and slices across arrays of structures (eg. `ods['equilibrium.time_slice.:.global_quantities.ip']`) are read directly from the tensors.
+    This class is not to be used by itself, but via the ODS.open() method.
+    """
+
+    def __init__(self, filename):
+        self.kw = {'filename': filename}
+        self.fid = None
+        self.active = False
+        self.ucache = None
+        self._keys = {}
+
+    def open(self):
+        printd('Dynamic open  %s' % self.kw, topic='dynamic')
+        import h5py
+
+        self.fid = h5py.File(self.kw['filename'], 'r')
+        self.ucache = None
+        if self.fid.attrs.get('omas_layout', 'tree') == 'tensor':
+            self.ucache = {}
+            for item in self.fid.keys():
+                if not item.endswith('_error_upper'):
+                    self.ucache.setdefault(o2u(item), []).append(item)
+        self._keys = {}
+        self.active = True
+        return self
+
+    def close(self):
+        printd('Dynamic close %s' % self.kw, topic='dynamic')
+        self.fid.close()
+        self.fid = None
+        self.active = False
+        return self
+
+    def _read(self, item, index=()):
+        """
+        Read (part of) a dataset
+
+        :param item: name of the dataset
+
+        :param index: tuple of integers and slices
+
+        :return: data
+        """
+        data = self.fid[item][index]
+        if item + '_error_upper' in self.fid:
+            if isinstance(data, numpy.ndarray):
+                data = uarray(data, self.fid[item + '_error_upper'][index])
+            else:
+                data = ufloat(data, self.fid[item + '_error_upper'][index])
+        elif isinstance(data, bytes):
+            data = b2s(data)
+        elif isinstance(data, numpy.ndarray) and data.dtype.kind == 'S':
+            data = data.astype(str)
+        return data
+
+    def _locate(self, key):
+        """
+        Find the dataset that stores the data at a location
+
+        :param key: location as list of strings, integers, and slices
+
+        :return: tuple with name of the dataset and index within the dataset, or None if location is not in the file
+        """
+        import h5py
+
+        if not self.active:
+            raise RuntimeError('Dynamic link broken: %s' % self.kw)
+        lkey = [slice(None) if k == ':' else k for k in p2l(key)]
+        if self.ucache is None:
+            if any(isinstance(k, slice) for k in lkey):
+                return None
+            item = '/'.join(map(str, lkey))
+            if item in self.fid and isinstance(self.fid[item], h5py.Dataset):
+                return item, ()
+            return None
+        ukey = l2u([':' if isinstance(k, slice) else k for k in lkey])
+        for item in self.ucache.get(ukey, []):
+            index = []
+            for k, uk in zip(lkey, p2l(item)):
+                if uk == ':':
+                    index.append(k)
+                elif uk != k:
+                    break
+            else:
+                shape = self.fid[item].shape
+                for dim, k in enumerate(index):
+                    if isinstance(k, int):
+                        if k < 0:
+                            k += shape[dim]
+                        if not 0 <= k < shape[dim]:
+                            return None
+                        index[dim] = k
+                return item, tuple(index)
+        return None
+
+    def tensor(self, key):
+        """
+        Return data at a location where arrays of structures can be indexed by integers and slices
+
+        :param key: location as list of strings, integers, and slices
+
+        :return: data or None if location is not in the file
+        """
+        where = self._locate(key)
+        if where is None:
+            return None
+        return self._read(*where)
+
+    def __getitem__(self, key):
+        printd('Dynamic read  %s: %s' % (self.kw, key), topic='dynamic')
+        data = self.tensor(key)
+        if data is None:
+            raise KeyError(key)
+        return data
+
+    def __contains__(self, key):
+        return self._locate(key) is not None
+
+    def keys(self, location):
+        import h5py
+
+        if not self.active:
+            raise RuntimeError('Dynamic link broken: %s' % self.kw)
+        if location not in self._keys:
+            lkey = p2l(location)
+            keys = []
+            if self.ucache is None:
+                item = '/'.join(map(str, lkey))
+                if not item:
+                    keys = list(self.fid.keys())
+                elif item in self.fid and not isinstance(self.fid[item], h5py.Dataset):
+                    keys = list(self.fid[item].keys())
+                keys = [convert_int(k) for k in keys if not k.endswith('_error_upper')]
+            else:
+                for items in self.ucache.values():
+                    for item in items:
+                        litem = p2l(item)
+                        if len(litem) <= len(lkey) or any(uk != ':' and uk != k for k, uk in zip(lkey, litem)):
+                            continue
+                        if litem[len(lkey)] == ':':
+                            keys.extend(range(self.fid[item].shape[litem[: len(lkey)].count(':')]))
+                        else:
+                            keys.append(litem[len(lkey)])
+            self._keys[location] = sorted(set(keys), key=lambda x: (isinstance(x, str), x))
+        return self._keys[location]
 
 
 def through_omas_h5(ods, method=['function', 'class_method'][1]):
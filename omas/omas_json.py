@@ -4,13 +4,21 @@
 '''
 
 from .omas_utils import *
-from .omas_core import ODS, ODC
+from .omas_core import ODS, ODC, merge_ods_parts
 
 
 # ---------------------------
 # save and load OMAS to Json
 # ---------------------------
-def save_omas_json(ods, filename, objects_encode=None, **kw):
+def _dump_ids_json(shared, ids):
+    """
+    Dump a single IDS to a Json string (run by the worker processes of save_omas_json)
+    """
+    ods, objects_encode, kw = shared
+    return json.dumps({ids: ods.getraw(ids)}, default=lambda x: json_dumper(x, objects_encode), **kw)
+
+
+def save_omas_json(ods, filename, objects_encode=None, workers=None, **kw):
     """
     Save an ODS to Json
 
@@ -20,9 +28,12 @@ def save_omas_json(ods, filename, objects_encode=None, **kw):
 
     :param objects_encode: how to handle non-standard JSON objects
         * True: encode numpy arrays, complex, and uncertain
+        * 'base64': like True, but numeric numpy arrays are encoded as base64 strings of their binary data
         * None: numpy arrays as lists, encode complex, and uncertain
         * False: numpy arrays as lists, fail on complex, and uncertain
 
+    :param workers: number of processes used to encode the IDSs in parallel
+
     :param kw: arguments passed to the json.dumps method
     """
 
@@ -32,17 +43,73 @@ def save_omas_json(ods, filename, objects_encode=None, **kw):
     kw.setdefault('separators', (',', ': '))
     kw.setdefault('sort_keys', True)
 
-    json_string = json.dumps(ods, default=lambda x: json_dumper(x, objects_encode), **kw)
-
     if isinstance(filename, str):
         with open(filename, 'w') as f:
-            f.write(json_string)
+            return save_omas_json(ods, f, objects_encode=objects_encode, workers=workers, **kw)
+    f = filename
+
+    if ods.location or not isinstance(ods.omas_data, dict) or not len(ods.omas_data) or isinstance(ods, ODC):
+        f.write(json.dumps(ods, default=lambda x: json_dumper(x, objects_encode), **kw))
+        return
+
+    # each IDS is encoded as a Json object with a single key, whose content is written to file as soon as it is available
+    ids_list = ods.keys(dynamic=0)
+    if kw['sort_keys']:
+        ids_list = sorted(ids_list)
+    shared = (ods, objects_encode, kw)
+    if workers and workers > 1:
+        parts = omas_pool_map(_dump_ids_json, ids_list, workers, shared)
+    else:
+        parts = (_dump_ids_json(shared, ids) for ids in ids_list)
+    if kw['indent'] is None:
+        f.write('{')
+        separator = kw['separators'][0]
     else:
-        f = filename
-        f.write(json_string)
+        f.write('{\n')
+        separator = kw['separators'][0] + '\n'
+    for k, part in enumerate(parts):
+        if k:
+            f.write(separator)
+        f.write(part[1:-1].strip('\n'))
+    f.write('}' if kw['indent'] is None else '\n}')
+
+
+def _json_object_pairs_hook(x, imas_version):
+    """
+    Convert Json objects to ODSs, or to ODCs if their keys are not valid for an ODS
+    """
+    clsODS = lambda: ODS(imas_version=imas_version, consistency_check=False)
+    clsODC = lambda: ODC(imas_version=imas_version, consistency_check=False)
+    try:
+        tmp = json_loader(x, clsODS, null_to=numpy.NaN)
+    except Exception:
+        tmp = json_loader(x, clsODC, null_to=numpy.NaN)
+    return tmp
+
+
+def _json_objects_to_ods(x, imas_version):
+    """
+    Convert already parsed Json objects to ODSs (equivalent to parsing with _json_object_pairs_hook)
+    """
+    if isinstance(x, dict):
+        return _json_object_pairs_hook([(key, _json_objects_to_ods(value, imas_version)) for key, value in x.items()], imas_version)
+    elif isinstance(x, list):
+        return [_json_objects_to_ods(value, imas_version) for value in x]
+    return x
+
+
+def _load_ids_json(shared, ids_list):
+    """
+    Load and check the consistency of some of the IDSs (run by the worker processes of load_omas_json)
+    """
+    data, consistency_check, imas_version, cls = shared
+    ods = _json_objects_to_ods({ids: data[ids] for ids in ids_list}, imas_version)
+    ods.__class__ = cls
+    ods.consistency_check = consistency_check
+    return ods.omas_data
 
 
-def load_omas_json(filename, consistency_check=True, imas_version=omas_rcparams['default_imas_version'], cls=ODS, **kw):
+def load_omas_json(filename, consistency_check=True, imas_version=omas_rcparams['default_imas_version'], cls=ODS, workers=None, **kw):
     """
     Load ODS or ODC from Json
 
@@ -54,6 +121,8 @@ def load_omas_json(filename, consistency_check=True, imas_version=omas_rcparams[
 
     :param cls: class to use for loading the data
 
+    :param workers: number of processes used to convert the IDSs to ODSs and check their consistency in parallel (only when loading an ODS)
+
     :param kw: arguments passed to the json.loads mehtod
 
     :return: OMAS data set
@@ -71,16 +140,15 @@ def load_omas_json(filename, consistency_check=True, imas_version=omas_rcparams[
     if not len(json_string.strip()):
         return ODS(imas_version=imas_version, consistency_check=consistency_check)
 
-    def base_class(x):
-        clsODS = lambda: ODS(imas_version=imas_version, consistency_check=False)
-        clsODC = lambda: ODC(imas_version=imas_version, consistency_check=False)
-        try:
-            tmp = json_loader(x, clsODS, null_to=numpy.NaN)
-        except Exception:
-            tmp = json_loader(x, clsODC, null_to=numpy.NaN)
-        return tmp
+    if workers and workers > 1 and not issubclass(cls, ODC):
+        # the Json string is parsed here, and the conversion to ODSs is done by the workers
+        data = json.loads(json_string, **kw)
+        if isinstance(data, dict) and not any(key.isdigit() for key in data):
+            shared = (data, consistency_check, imas_version, cls)
+            parts = omas_pool_map(_load_ids_json, omas_pool_chunks(data.keys(), workers), workers, shared)
+            return merge_ods_parts(cls(imas_version=imas_version, consistency_check=False), parts, consistency_check)
 
-    tmp = json.loads(json_string, object_pairs_hook=lambda x: base_class(x), **kw)
+    tmp = json.loads(json_string, object_pairs_hook=lambda x: _json_object_pairs_hook(x, imas_version), **kw)
 
     # convert to cls
     tmp.__class__ = cls
@@ -91,6 +159,107 @@ def load_omas_json(filename, consistency_check=True, imas_version=omas_rcparams[
     return tmp
 
 
+# ------------------------------------------
+# save and load OMAS to newline delimited Json
+# ------------------------------------------
+def save_omas_ndjson(ods, filename, objects_encode='base64'):
+    """
+    Save an ODS to newline delimited Json, with one leaf of the ODS per line
+
+    Each line is a Json object of the form `{"path": "equilibrium.time_slice.0.global_quantities.ip", "value": ...}`
+
+    :param ods: OMAS data set
+
+    :param filename: filename or file descriptor to save to
+
+    :param objects_encode: how to handle non-standard JSON objects (see json_dumper)
+    """
+
+    printd('Saving OMAS data to ndjson: %s' % filename, topic=['Json', 'json'])
+
+    if isinstance(filename, str):
+        with open(filename, 'w') as f:
+            return save_omas_ndjson(ods, f, objects_encode=objects_encode)
+    f = filename
+
+    for path in ods.paths(dynamic=False):
+        value = ods
+        for key in path:
+            value = value.getraw(key)
+        f.write(json.dumps({'path': l2o(path), 'value': value}, default=lambda x: json_dumper(x, objects_encode), separators=(',', ':')))
+        f.write('\n')
+
+
+def iter_omas_ndjson(filename, paths=None):
+    """
+    Incrementally parse the leaves of a newline delimited Json file
+
+    :param filename: filename or file descriptor to load from
+
+    :param paths: only return the leaves under these locations (`:` matches any index of arrays of structures)
+                  the value of the other leaves is not decoded
+
+    :return: generator of (location, value) tuples
+    """
+    if isinstance(filename, str):
+        with open(filename, 'r') as f:
+            yield from iter_omas_ndjson(f, paths=paths)
+        return
+
+    if paths is not None:
+        paths = [p2l(path) for path in paths]
+
+    decoder = json.JSONDecoder(object_pairs_hook=json_loader)
+    prefix = '{"path":'
+    for line in filename:
+        line = line.strip()
+        if not line:
+            continue
+        # the path is decoded first, so that the value can be skipped
+        if line.startswith(prefix):
+            location, index = decoder.raw_decode(line, len(prefix))
+        else:
+            location = json.loads(line)['path']
+        if paths is not None:
+            path = p2l(location)
+            for item in paths:
+                if len(path) >= len(item) and all(k == kk or (k == ':' and isinstance(kk, int)) for k, kk in zip(item, path)):
+                    break
+            else:
+                continue
+        value = decoder.decode(line)['value']
+        if isinstance(value, list):
+            value = numpy.array(value)
+        yield location, value
+
+
+def load_omas_ndjson(filename, consistency_check=True, imas_version=omas_rcparams['default_imas_version'], cls=ODS, paths=None):
+    """
+    Load ODS or ODC from newline delimited Json
+
+    :param filename: filename or file descriptor to load from
+
+    :param consistency_check: verify that data is consistent with IMAS schema
+
+    :param imas_version: imas version to use for consistency check
+
+    :param cls: class to use for loading the data
+
+    :param paths: only load the leaves under these locations (`:` matches any index of arrays of structures)
+
+    :return: OMAS data set
+    """
+
+    printd('Loading OMAS data from ndjson: %s' % filename, topic='json')
+
+    ods = cls(imas_version=imas_version, consistency_check=False)
+    with rcparams_environment(dynamic_path_creation='dynamic_array_structures'):
+        for location, value in iter_omas_ndjson(filename, paths=paths):
+            ods.setraw(p2l(location), value)
+    ods.consistency_check = consistency_check
+    return ods
+
+
 def through_omas_json(ods, method=['function', 'class_method'][1]):
     """
     Test save and load OMAS Json
@@ -108,3 +277,22 @@ def through_omas_json(ods, method=['function', 'class_method'][1]):
         ods.save(filename)
         ods1 = ODS().load(filename)
     return ods1
+
+
+def through_omas_ndjson(ods, method=['function', 'class_method'][1]):
+    """
+    Test save and load OMAS newline delimited Json
+
+    :param ods: ods
+
+    :return: ods
+    """
+    filename = omas_testdir(__file__) + '/test.ndjson'
+    ods = copy.deepcopy(ods)  # make a copy to make sure save does not alter entering ODS
+    if method == 'function':
+        save_omas_ndjson(ods, filename)
+        ods1 = load_omas_ndjson(filename)
+    else:
+        ods.save(filename)
+        ods1 = ODS().load(filename)
+    return ods1
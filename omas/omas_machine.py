@@ -2,14 +2,14 @@
 
 import subprocess
 import functools
+import threading
 import shutil
 from .omas_utils import *
+from .omas_utils import _private_directory
 from .omas_core import ODS, dynamic_ODS, omas_environment, omas_info_node, imas_json_dir, omas_rcparams
 from .omas_physics import cocos_signals
-from omas.machine_mappings import d3d, nstx, nstxu, east
-from omas.machine_mappings.d3d import __regression_arguments__
 from omas.utilities.machine_mapping_decorator import machine_mapping_function
-from omas.utilities.omas_mds import mdsvalue
+from omas.utilities.omas_mds import mdsvalue, mdsbatch
 try:
     from MDSplus.connection import MdsIpException
     from MDSplus.mdsExceptions import TreeNODATA, TreeNNF
@@ -78,7 +78,31 @@ def remove_nans(x):
     else:
         return x[~np.isnan(x)]
 
-def machine_to_omas(ods, machine, pulse, location, options={}, branch='', user_machine_mappings=None, cache=None):
+def _remove_nans_many(data, depth):
+    """
+    Filter the NaNs of array of structures data, with the NaNs of the whole array identified at once
+
+    :param data: array whose leading `depth` dimensions index the arrays of structures
+
+    :param depth: number of arrays of structures dimensions
+
+    :return: nested lists with the filtered data of each structure, to be assigned with `ODS.set_many()`
+    """
+    keep = ~numpy.isnan(data)
+    if data.ndim == depth:
+        if not numpy.all(keep):
+            raise ValueError("Behavior of Nan filter undefined for scalar nan values")
+        return data
+
+    def nest(index):
+        if len(index) == depth:
+            return data[index][keep[index]]
+        return [nest(index + (k,)) for k in range(data.shape[len(index)])]
+
+    return nest(())
+
+
+def machine_to_omas(ods, machine, pulse, location, options={}, branch='', user_machine_mappings=None, cache=None, workers=None):
     """
     Routine to convert machine data to ODS
 
@@ -98,6 +122,9 @@ def machine_to_omas(ods, machine, pulse, location, options={}, branch='', user_m
 
     :param cache: if cache is a dictionary, this will be used to establiish a cash
 
+    :param workers: number of threads used to resolve the locations concurrently when location ends with `.*`
+                    (the number of concurrent requests to each MDS+ server is limited by omas_rcparams['mds_server_concurrency'])
+
     :return: updated ODS and data before being assigned to the ODS
     """
 
@@ -127,19 +154,34 @@ def machine_to_omas(ods, machine, pulse, location, options={}, branch='', user_m
     failed_locations = {}
     if location.endswith(".*"):
         root = location.split(".*")[0]
-        for key in mappings:
-            if root in key:
-                try:
+        keys = machine_mappings_index(machine, branch, user_machine_mappings)['locations'].get(root, [])
+        # fetch all MDS+ data needed for these locations with one request for each tree
+        if cache is None:
+            cache = {}
+        machine_prefetch(machine, pulse, keys, options, branch, user_machine_mappings, cache)
+        if workers and workers > 1:
+            resolved = _resolve_concurrently(ods, machine, pulse, mappings, keys, idm, options_with_defaults, branch, cache, workers)
+        else:
+            resolved = ((key, None) for key in keys)
+        merged = set()
+        for key, part in resolved:
+            try:
+                if part is None:
                     resolve_mapped(ods, machine, pulse, mappings, key, idm, options_with_defaults, branch, cache=cache)
-                except (TreeNODATA, MdsIpException) as e:
-                    if hasattr(e, "eval2TDI"):
-                        failed_locations[key] = e.eval2TDI
-                    else:
-                        failed_locations[key] = e.TDI
-                except TreeNNF as e:
+                elif isinstance(part, Exception):
+                    raise part
+                elif isinstance(part, ODS) and id(part) not in merged:
+                    merged.add(id(part))
+                    _merge_resolved(ods, part)
+            except (TreeNODATA, MdsIpException) as e:
+                if hasattr(e, "eval2TDI"):
+                    failed_locations[key] = e.eval2TDI
+                else:
                     failed_locations[key] = e.TDI
-                    if key != 'equilibrium.time_slice.:.constraints.j_tor.:.measured':
-                        raise e
+            except TreeNNF as e:
+                failed_locations[key] = e.TDI
+                if key != 'equilibrium.time_slice.:.constraints.j_tor.:.measured':
+                    raise e
         if len(failed_locations) > 0:
             import yaml
             print("Failed to load the following keys: ")
@@ -150,6 +192,340 @@ def machine_to_omas(ods, machine, pulse, location, options={}, branch='', user_m
     else:
         return resolve_mapped(ods, machine, pulse,  mappings, location, idm, options_with_defaults, branch, cache=cache)
 
+def _resolve_concurrently(ods, machine, pulse, mappings, locations, idm, options_with_defaults, branch, cache, workers):
+    """
+    Resolve mapping locations with a pool of threads, each location in a separate ODS
+
+    Locations that define the size of arrays of structures are resolved before the others,
+    and locations that are mapped by the same python function are resolved by the same thread, so that the function is called only once
+
+    :param ods: ODS that will be populated (used as template for the ODSs of the locations)
+
+    :param locations: list of ODS locations to be resolved
+
+    :param workers: number of threads
+
+    :return: list of (location, ODS with the data of the location, or size of the array of structures, or Exception) in the order of locations
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def group_key(location):
+        if 'PYTHON' in mappings[location]:
+            try:
+                return mappings[location]['PYTHON'].format(**options_with_defaults)
+            except Exception:
+                pass
+        return location
+
+    def resolve(group):
+        results = []
+        for location in group:
+            part = ODS(imas_version=ods.imas_version, consistency_check=ods.consistency_check, cocos=ods.cocos)
+            options = dict(options_with_defaults)
+            options.setdefault('location', location)
+            try:
+                results.append((location, resolve_mapped(part, machine, pulse, mappings, location, idm, options, branch, cache=cache)[0]))
+            except Exception as _excp:
+                results.append((location, _excp))
+        return results
+
+    results = {}
+    # locations like `...x_point.1.r` are resolved in ODSs that do not have the preceding structures
+    with ThreadPoolExecutor(max_workers=workers) as executor, rcparams_environment(dynamic_path_creation='dynamic_array_structures'):
+        for phase in [[location for location in locations if location.endswith(':')], [location for location in locations if not location.endswith(':')]]:
+            groups = {}
+            for location in phase:
+                groups.setdefault(group_key(location), []).append(location)
+            for group_results in executor.map(resolve, groups.values()):
+                results.update(group_results)
+    return [(location, results[location]) for location in locations]
+
+
+def _merge_resolved(ods, part):
+    """
+    Copy the data of an ODS populated by `_resolve_concurrently` into the ODS
+
+    :param ods: ODS to be populated
+
+    :param part: ODS with the data of some locations
+    """
+    with rcparams_environment(dynamic_path_creation='dynamic_array_structures'):
+        for path in part.paths(dynamic=False):
+            value = part
+            for key in path:
+                value = value.getraw(key)
+            ods.setraw(path, value)
+
+
+# ===================
+# persistent cache
+# ===================
+_machine_mappings_hashes = {}
+
+
+def machine_mappings_hash(machine, branch=''):
+    """
+    Hash of the content of the mapping files (.json and .py) of a machine
+
+    :param machine: machine name
+
+    :param branch: GitHub branch from which the mapping information is loaded
+
+    :return: hexadecimal hash string
+    """
+    import hashlib
+
+    directory = os.path.dirname(machines(machine, branch))
+    filenames = sorted(glob.glob(directory + os.sep + '*.json') + glob.glob(directory + os.sep + '*.py'))
+    stamp = []
+    for filename in filenames:
+        stat = os.stat(filename)
+        stamp.append((filename, stat.st_mtime_ns, stat.st_size))
+    if directory not in _machine_mappings_hashes or _machine_mappings_hashes[directory][0] != stamp:
+        hash = hashlib.sha1()
+        for filename in filenames:
+            with open(filename, 'rb') as f:
+                hash.update(f.read())
+        _machine_mappings_hashes[directory] = (stamp, hash.hexdigest())
+    return _machine_mappings_hashes[directory][1]
+
+
+def _machine_cache_filename(key):
+    """
+    :param key: tuple identifying the data
+
+    :return: filename in the persistent cache
+    """
+    import hashlib
+
+    return os.sep.join([omas_rcparams['tmp_omas_dir'], 'machine_cache', hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + '.pkl'])
+
+
+def _machine_cache_directory(create=False):
+    """
+    :param create: create the directory (only accessible by the current user) if it does not exist
+
+    :return: directory of the persistent cache of machine data, or None if it is not a private directory of the current user
+    """
+    directory = os.sep.join([omas_rcparams['tmp_omas_dir'], 'machine_cache'])
+    if create and not os.path.exists(directory):
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    # cached data is unpickled, so it is only trusted if nobody else can write to the cache directory
+    if not _private_directory(directory):
+        printd(f'Machine cache `{directory}` is ignored since it is not a private directory of the current user', topic='machine')
+        return None
+    return directory
+
+
+# estimated size of the persistent cache directories, so that they are only scanned when they may be over budget
+_machine_cache_bytes = {}
+_machine_cache_lock = threading.Lock()
+
+
+def machine_cache_get(key):
+    """
+    Get data from the persistent cache of machine data (enabled by omas_rcparams['machine_cache'])
+
+    :param key: tuple identifying the data
+
+    :return: tuple with (True, data) if data is in the cache, else (False, None)
+    """
+    if not omas_rcparams['machine_cache']:
+        return False, None
+    if _machine_cache_directory() is None:
+        return False, None
+    filename = _machine_cache_filename(key)
+    try:
+        with open(filename, 'rb') as f:
+            data = pickle.load(f)
+    except Exception:
+        return False, None
+    # the modification time of the files is used to discard the least recently used data
+    try:
+        os.utime(filename)
+    except OSError:
+        pass
+    printd(f'Machine cache hit {key}', topic='machine')
+    return True, data
+
+
+def _machine_cache_evict(directory):
+    """
+    Discard the least recently used data until the cache is within omas_rcparams['machine_cache_bytes']
+
+    :param directory: directory of the persistent cache of machine data
+
+    :return: size of the cache after eviction
+    """
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.pkl'):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    nbytes = sum(entry[1] for entry in entries)
+    for mtime, size, path in sorted(entries):
+        if nbytes <= omas_rcparams['machine_cache_bytes']:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        nbytes -= size
+    return nbytes
+
+
+def machine_cache_set(key, data):
+    """
+    Store data in the persistent cache of machine data (enabled by omas_rcparams['machine_cache'])
+    The least recently used data is discarded once the cache exceeds omas_rcparams['machine_cache_bytes']
+
+    :param key: tuple identifying the data
+
+    :param data: data to store
+    """
+    if not omas_rcparams['machine_cache']:
+        return
+    directory = _machine_cache_directory(create=True)
+    if directory is None:
+        return
+    filename = _machine_cache_filename(key)
+    try:
+        previous = os.path.getsize(filename)
+    except OSError:
+        previous = 0
+    # write to a temporary file first, so that other threads and processes never read partial files
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(data, f, protocol=omas_rcparams['pickle_protocol'])
+        size = os.path.getsize(tmp)
+        os.replace(tmp, filename)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    # the directory is scanned once per session, and then only when the running total goes over budget
+    # (other processes writing to the same cache are accounted for at that point)
+    with _machine_cache_lock:
+        if directory not in _machine_cache_bytes:
+            _machine_cache_bytes[directory] = _machine_cache_evict(directory)
+            return
+        _machine_cache_bytes[directory] += size - previous
+        if _machine_cache_bytes[directory] > omas_rcparams['machine_cache_bytes']:
+            _machine_cache_bytes[directory] = _machine_cache_evict(directory)
+
+
+def machine_mds_requests(machine, pulse, locations, options={}, branch='', user_machine_mappings=None):
+    """
+    Collect the MDS+ TDI expressions that are needed to resolve a set of mapping locations
+
+    :param machine: machine name
+
+    :param pulse: pulse number
+
+    :param locations: list of ODS locations to be resolved
+
+    :param options: dictionary with options to use when loading the data
+
+    :param branch: load machine mappings and mapping functions from a specific GitHub branch
+
+    :param user_machine_mappings: allow specification of external mappings
+
+    :return: list of unique (machine, treename, pulse, TDI) tuples
+    """
+    pulse = int(pulse)
+    mappings = machine_mappings(machine, branch, user_machine_mappings)
+    requests = {}
+    for location in locations:
+        mapped = mappings.get(location, None)
+        if not isinstance(mapped, dict):
+            continue
+        options_with_defaults = copy.copy(mappings['__options__'])
+        options_with_defaults.update(options)
+        options_with_defaults.update({'machine': machine, 'pulse': pulse, 'location': location})
+        for item in ['COCOSIO_TDI', 'TDI']:
+            # same precedence as in resolve_mapped
+            if item not in mapped or (item == 'TDI' and any(expr in mapped for expr in ['VALUE', 'EVAL', 'ENVIRON', 'PYTHON'])):
+                continue
+            if item == 'COCOSIO_TDI' and any(expr in mapped for expr in ['COCOSIO', 'COCOSIO_PYTHON']):
+                continue
+            try:
+                TDI = mapped[item].format(**options_with_defaults)
+                treename = mapped['treename'].format(**options_with_defaults) if 'treename' in mapped else None
+            except (KeyError, IndexError, ValueError):
+                continue
+            requests[machine, treename, pulse, TDI] = None
+    return list(requests)
+
+
+def machine_prefetch(machine, pulse, locations, options={}, branch='', user_machine_mappings=None, cache=None):
+    """
+    Fetch the MDS+ data needed to resolve a set of mapping locations with a single request for each MDS+ tree
+    Data that fails to be fetched is not cached, so that errors are raised when the individual locations are resolved
+
+    :param machine: machine name
+
+    :param pulse: pulse number
+
+    :param locations: list of ODS locations to be resolved
+
+    :param options: dictionary with options to use when loading the data
+
+    :param branch: load machine mappings and mapping functions from a specific GitHub branch
+
+    :param user_machine_mappings: allow specification of external mappings
+
+    :param cache: dictionary where the data is stored (as used by `machine_to_omas`)
+
+    :return: cache
+    """
+    if cache is None:
+        cache = {}
+    requests = []
+    for request in machine_mds_requests(machine, pulse, locations, options, branch, user_machine_mappings):
+        key = ('TDI',) + request
+        if key in cache:
+            continue
+        found, data = machine_cache_get(key)
+        if found:
+            cache[key] = data
+        else:
+            requests.append(request)
+    if len(requests) > 1:
+        for request, data in mdsbatch(requests).items():
+            if data is not None and not isinstance(data, Exception):
+                cache[('TDI',) + request] = data
+                machine_cache_set(('TDI',) + request, data)
+    return cache
+
+
+def _mds_raw(machine, treename, pulse, TDI, cache=None):
+    """
+    Fetch data from MDS+ unless it was already fetched by `machine_prefetch`
+
+    :return: result of TDI expression
+    """
+    key = ('TDI', machine, treename, pulse, TDI)
+    if isinstance(cache, dict) and key in cache:
+        data = cache[key]
+    else:
+        found, data = machine_cache_get(key)
+        if not found:
+            data = mdsvalue(machine, treename, pulse, TDI).raw()
+            if data is not None:
+                machine_cache_set(key, data)
+        if isinstance(cache, dict) and data is not None:
+            cache[key] = data
+    # locations that share the same TDI expression do not share the same data
+    if isinstance(data, numpy.ndarray):
+        data = data.copy()
+    return data
+
+
 def resolve_mapped(ods, machine, pulse,  mappings, location, idm, options_with_defaults, branch, cache=None):
     """
     Routine to resolve a mapping
@@ -188,14 +564,13 @@ def resolve_mapped(ods, machine, pulse,  mappings, location, idm, options_with_d
             namespace = {}
             namespace.update(_namespace_mappings[idm])
             namespace['__file__'] = machines(machine, branch)[:-5] + '.py'
-            tmp = compile(call, machines(machine, branch)[:-5] + '.py', 'eval')
-            cocosio = eval(tmp, namespace)
+            cocosio = eval(_compiled(call, namespace['__file__']), namespace)
             if isinstance(cache, dict):
                 cache[call] = cocosio
     elif 'COCOSIO_TDI' in mapped:
         TDI = mapped['COCOSIO_TDI'].format(**options_with_defaults)
         treename = mapped['treename'].format(**options_with_defaults) if 'treename' in mapped else None
-        cocosio = int(mdsvalue(machine, treename, pulse, TDI).raw())
+        cocosio = int(_mds_raw(machine, treename, pulse, TDI, cache))
 
     # CONSTANT VALUE
     if 'VALUE' in mapped:
@@ -203,7 +578,7 @@ def resolve_mapped(ods, machine, pulse,  mappings, location, idm, options_with_d
 
     # EVAL
     elif 'EVAL' in mapped:
-        data0 = data = eval(mapped['EVAL'].format(**options_with_defaults), _namespace_mappings[idm])
+        data0 = data = eval(_compiled(mapped['EVAL'].format(**options_with_defaults)), _namespace_mappings[idm])
 
     # ENVIRONMENTAL VARIABLE
     elif 'ENVIRON' in mapped:
@@ -224,15 +599,29 @@ def resolve_mapped(ods, machine, pulse,  mappings, location, idm, options_with_d
         if cache and call in cache:
             ods = cache[call]
         else:
-            namespace = {}
-            namespace.update(_namespace_mappings[idm])
-            namespace['ods'] = ODS()
-            namespace['__file__'] = machines(machine, branch)[:-5] + '.py'
-            printd(f"Calling `{call}` in {os.path.basename(namespace['__file__'])}", topic='machine')
-            # Add the callback for mapping updates
-            # By supplyinh the function to the decorator we avoid a ringinclusion
-            call_w_update_mapping = call[:-1] + ", update_callback=update_mapping)"
-            exec( machine + "." + call_w_update_mapping)
+            key = ('PYTHON', machine, pulse, call, branch, machine_mappings_hash(machine, branch))
+            found, data = machine_cache_get(key)
+            if found:
+                _merge_resolved(ods, data)
+            else:
+                namespace = {}
+                namespace.update(_namespace_mappings[idm])
+                namespace['ods'] = ODS()
+                namespace['__file__'] = machines(machine, branch)[:-5] + '.py'
+                printd(f"Calling `{call}` in {os.path.basename(namespace['__file__'])}", topic='machine')
+                # Add the callback for mapping updates
+                # By supplyinh the function to the decorator we avoid a ringinclusion
+                call_w_update_mapping = call[:-1] + ", update_callback=update_mapping)"
+                if omas_rcparams['machine_cache']:
+                    # the data set by the function is collected in a separate ODS so that it can be stored in the persistent cache
+                    target = ods
+                    ods = ODS(imas_version=target.imas_version, consistency_check=target.consistency_check, cocos=target.cocos)
+                    exec(_compiled(machine + "." + call_w_update_mapping, mode='exec'))
+                    machine_cache_set(key, ods)
+                    _merge_resolved(target, ods)
+                    ods = target
+                else:
+                    exec(_compiled(machine + "." + call_w_update_mapping, mode='exec'))
             if isinstance(cache, dict):
                 cache[call] = ods
         if location.endswith(':'):
@@ -248,7 +637,7 @@ def resolve_mapped(ods, machine, pulse,  mappings, location, idm, options_with_d
         try:
             TDI = mapped['TDI'].format(**options_with_defaults)
             treename = mapped['treename'].format(**options_with_defaults) if 'treename' in mapped else None
-            data0 = data = mdsvalue(machine, treename, pulse, TDI).raw()
+            data0 = data = _mds_raw(machine, treename, pulse, TDI, cache)
             if data is None:
                 raise ValueError('data is None')
         except Exception as e:
@@ -294,17 +683,67 @@ def resolve_mapped(ods, machine, pulse,  mappings, location, idm, options_with_d
                 if data.size == 1:
                     data = data.item()
                 ods[location] = nanfilter(data)
+            elif mapped.get('NANFILTER', False):
+                ods.set_many(location, _remove_nans_many(data, location.count(':')))
             else:
-                for k in itertools.product(*list(map(range, data.shape[: location.count(':')]))):
-                    ods[u2n(location, k)] = nanfilter(data[k])
+                ods.set_many(location, data)
 
     return ods, {'raw_data': data0, 'processed_data': data, 'cocosio': cocosio, 'branch': mappings['__branch__']}
 
 
 _machine_mappings = {}
+_machine_mappings_index = {}
 _namespace_mappings = {}
 _user_machine_mappings = {}
 _python_tdi_namespace = {}
+_eval2TDI = {}
+_compiled_expressions = {}
+
+
+def _machine_mappings_key(machine, branch, user_machine_mappings=None):
+    """
+    :return: key under which the processed mappings are cached (the user mappings are hashed, so that alternating between
+             different user mappings does not require processing the mappings again)
+    """
+    import hashlib
+
+    umaps = [_user_machine_mappings, user_machine_mappings or {}]
+    if not any(umaps):
+        return (machine, branch)
+    return (machine, branch, hashlib.sha1(repr(umaps).encode('utf-8')).hexdigest())
+
+
+def _eval_TDI(expression, branch):
+    """
+    Evaluate `eval2TDI` expression (memoized, since the python_tdi functions only build strings)
+
+    :param expression: eval2TDI expression
+
+    :param branch: branch of the python_tdi functions
+
+    :return: TDI expression
+    """
+    if (expression, branch) not in _eval2TDI:
+        _eval2TDI[expression, branch] = eval(expression.replace('\\', '\\\\'), python_tdi_namespace(branch))
+    return _eval2TDI[expression, branch]
+
+
+def _compiled(expression, filename='<string>', mode='eval'):
+    """
+    Compile EVAL, PYTHON, and COCOSIO_PYTHON expressions (memoized)
+
+    :param expression: formatted expression
+
+    :param filename: filename reported in tracebacks
+
+    :param mode: `eval` or `exec`
+
+    :return: code object
+    """
+    key = (expression, filename, mode)
+    if key not in _compiled_expressions:
+        _compiled_expressions[key] = compile(expression, filename, mode)
+    return _compiled_expressions[key]
 
 
 def machine_mappings(machine, branch, user_machine_mappings=None, return_raw_mappings=False, raise_errors=False):
@@ -330,12 +769,9 @@ def machine_mappings(machine, branch, user_machine_mappings=None, return_raw_map
         user_machine_mappings = {}
 
     idm = (machine, branch)
+    key = _machine_mappings_key(machine, branch, user_machine_mappings)
 
-    if (
-        return_raw_mappings
-        or idm not in _machine_mappings
-        or list(_user_machine_mappings.keys()) + list(user_machine_mappings.keys()) != _machine_mappings[idm]['__user_machine_mappings__']
-    ):
+    if return_raw_mappings or key not in _machine_mappings:
 
         # figure out mapping file
         filename = machines(machine, branch)
@@ -390,22 +826,22 @@ def machine_mappings(machine, branch, user_machine_mappings=None, return_raw_map
         mappings['__filename__'] = filename
         mappings['__branch__'] = branch
 
-        # read the machine specific python mapping functions
-        _namespace_mappings[idm] = {}
-        if os.path.exists(os.path.splitext(filename)[0] + '.py'):
-            with open(os.path.splitext(filename)[0] + '.py', 'r') as f:
-                try:
-                    exec(f.read(), _namespace_mappings[idm])
-                except Exception as _excp:
-                    raise _excp.__class__(f"Error in {os.path.splitext(filename)[0] + '.py'}\n" + str(_excp))
+        # read the machine specific python mapping functions (these do not depend on the user mappings)
+        if idm not in _namespace_mappings:
+            _namespace_mappings[idm] = {}
+            if os.path.exists(os.path.splitext(filename)[0] + '.py'):
+                with open(os.path.splitext(filename)[0] + '.py', 'r') as f:
+                    try:
+                        exec(f.read(), _namespace_mappings[idm])
+                    except Exception as _excp:
+                        del _namespace_mappings[idm]
+                        raise _excp.__class__(f"Error in {os.path.splitext(filename)[0] + '.py'}\n" + str(_excp))
 
         # generate TDI for cocos_rules
         for item in mappings['__cocos_rules__']:
             if 'eval2TDI' in mappings['__cocos_rules__'][item]:
                 try:
-                    mappings['__cocos_rules__'][item]['TDI'] = eval(
-                        mappings['__cocos_rules__'][item]['eval2TDI'].replace('\\', '\\\\'), python_tdi_namespace(branch)
-                    )
+                    mappings['__cocos_rules__'][item]['TDI'] = _eval_TDI(mappings['__cocos_rules__'][item]['eval2TDI'], branch)
                 except Exception as _excp:
                     text = f"Error evaluating eval2TDI in ['__cocos_rules__'][{item!r}]: {mappings['__cocos_rules__'][item]['eval2TDI']}:\n{_excp!r}"
                     if raise_errors:
@@ -421,7 +857,7 @@ def machine_mappings(machine, branch, user_machine_mappings=None, return_raw_map
 
             # generate DTI functions based on eval2DTI
             if 'eval2TDI' in mappings[location]:
-                mappings[location]['TDI'] = eval(mappings[location]['eval2TDI'].replace('\\', '\\\\'), python_tdi_namespace(branch))
+                mappings[location]['TDI'] = _eval_TDI(mappings[location]['eval2TDI'], branch)
 
             # make sure required coordinates info are present in the mapping
             # this COORDINATES info is also used later to assing data in the ODS
@@ -463,9 +899,42 @@ def machine_mappings(machine, branch, user_machine_mappings=None, return_raw_map
                     printe(text)
 
         # cache
-        _machine_mappings[idm] = mappings
+        _machine_mappings[key] = mappings
+
+    return _machine_mappings[key]
 
-    return _machine_mappings[idm]
+
+def machine_mappings_index(machine, branch, user_machine_mappings=None):
+    """
+    Index of the mapped locations, to look up the locations and the children of a location without scanning all of the mappings
+
+    :param machine: machine name
+
+    :param branch: GitHub branch from which to load the machine mapping information
+
+    :param user_machine_mappings: allow specification of external mappings
+
+    :return: dictionary with
+             `locations`: locations under each prefix (in the order in which they are defined in the mappings)
+             `children`: children of each prefix
+    """
+    mappings = machine_mappings(machine, branch, user_machine_mappings)
+    key = _machine_mappings_key(machine, branch, user_machine_mappings)
+    index = _machine_mappings_index.get(key, None)
+    if index is None or index['mappings'] is not mappings:
+        locations = {}
+        children = {}
+        for location in mappings:
+            if location.startswith('_'):
+                continue
+            path = location.split('.')
+            for k in range(len(path) + 1):
+                prefix = '.'.join(path[:k])
+                locations.setdefault(prefix, []).append(location)
+                if k < len(path):
+                    children.setdefault(prefix, {})[path[k]] = None
+        index = _machine_mappings_index[key] = {'mappings': mappings, 'locations': locations, 'children': children}
+    return index
 
 
 def reload_machine_mappings(verbose=True):
@@ -476,7 +945,16 @@ def reload_machine_mappings(verbose=True):
     :param verbose: print to screen when mappings are reloaded
     """
     # reset machine mapping caches
-    for cache in [_machine_mappings, _namespace_mappings, _python_tdi_namespace, _machines_dict, _user_machine_mappings]:
+    for cache in [
+        _machine_mappings,
+        _machine_mappings_index,
+        _namespace_mappings,
+        _python_tdi_namespace,
+        _eval2TDI,
+        _compiled_expressions,
+        _machines_dict,
+        _user_machine_mappings,
+    ]:
         cache.clear()
 
     # in case users did a `from omas.machine_mappings import ...`
@@ -735,20 +1213,15 @@ class dynamic_omas_machine(dynamic_ODS):
 
     def keys(self, location):
         ulocation = (o2u(location) + ".").lstrip('.')
-        if ulocation + ':' in machine_mappings(self.kw['machine'], self.kw['branch'], self.kw['user_machine_mappings']):
+        index = machine_mappings_index(self.kw['machine'], self.kw['branch'], self.kw['user_machine_mappings'])
+        if ulocation + ':' in index['mappings']:
             try:
                 return list(range(self[ulocation + ':']))
             except Exception as _excp:
                 printe(f'{ulocation}: issue:' + repr(_excp))
                 return []
         else:
-            tmp = numpy.unique(
-                [
-                    convert_int(k[len(ulocation) :].lstrip('.').split('.')[0])
-                    for k in machine_mappings(self.kw['machine'], self.kw['branch'], self.kw['user_machine_mappings'])
-                    if not k.startswith('_') and k.startswith(ulocation) and len(k[len(ulocation) :].lstrip('.').split('.')[0])
-                ]
-            )
+            tmp = sorted(map(convert_int, index['children'].get(o2u(location), {})), key=lambda x: (isinstance(x, str), x))
             if ':' in tmp:
                 raise ValueError(f"Please specify number of structures for `{o2u(location)}.:` in {self.kw['machine']}.json")
             return tmp
@@ -763,15 +1236,65 @@ def load_omas_machine(
     cls=ODS,
     branch='',
     user_machine_mappings=None,
+    workers=None,
+    locations=None,
 ):
+    """
+    Load all the data that is mapped for a machine
+
+    :param machine: machine name
+
+    :param pulse: pulse number
+
+    :param options: dictionary with options to use when loading the data
+
+    :param consistency_check: verify that data is consistent with IMAS schema
+
+    :param imas_version: imas version to use for consistency check
+
+    :param cls: class to use for loading the data
+
+    :param branch: load machine mappings and mapping functions from a specific GitHub branch
+
+    :param user_machine_mappings: allow specification of external mappings
+
+    :param workers: number of threads used to resolve the locations concurrently
+                    (the number of concurrent requests to each MDS+ server is limited by omas_rcparams['mds_server_concurrency'])
+
+    :param locations: list of mapped locations to load (all of them by default)
+
+    :return: OMAS data set
+    """
     printd('Loading from %s' % machine, topic='machine')
     ods = cls(imas_version=imas_version, consistency_check=consistency_check)
-    for location in [location for location in machine_mappings(machine, branch, user_machine_mappings) if not location.startswith('__')]:
-        if location.endswith(':'):
-            continue
-        print(location)
-        machine_to_omas(ods, machine, pulse, location, options, branch)
+    if locations is None:
+        locations = machine_mappings(machine, branch, user_machine_mappings)
+    locations = [location for location in locations if not location.startswith('__') and not location.endswith(':')]
+    # fetch all MDS+ data with one request for each tree
+    cache = machine_prefetch(machine, pulse, locations, options, branch, user_machine_mappings)
+    if workers and workers > 1:
+        mappings = machine_mappings(machine, branch, user_machine_mappings)
+        options_with_defaults = copy.copy(mappings['__options__'])
+        options_with_defaults.update(options)
+        options_with_defaults.update({'machine': machine, 'pulse': int(pulse)})
+        merged = set()
+        for location, part in _resolve_concurrently(ods, machine, int(pulse), mappings, locations, (machine, branch), options_with_defaults, branch, cache, workers):
+            printd(location, topic='machine')
+            if isinstance(part, Exception):
+                raise part
+            elif isinstance(part, ODS) and id(part) not in merged:
+                merged.add(id(part))
+                _merge_resolved(ods, part)
+        return ods
+    for location in locations:
+        printd(location, topic='machine')
+        machine_to_omas(ods, machine, pulse, location, options, branch, user_machine_mappings, cache)
     return ods
 
+# mapping modules `from omas import *` so they must be imported after all of the omas_machine functions are defined
+from omas.machine_mappings import d3d, nstx, nstxu, east
+
 if __name__ == '__main__':
+    from omas.machine_mappings.d3d import __regression_arguments__
+
     test_machine_mapping_functions('d3d', ["core_profiles_profile_1d"], globals(), locals())
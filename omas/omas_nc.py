@@ -4,13 +4,20 @@
 '''
 
 from .omas_utils import *
-from .omas_core import ODS, ODC, dynamic_ODS
+from .omas_core import ODS, ODC, dynamic_ODS, merge_ods_parts
 
 
 # --------------------------------------------
 # save and load OMAS with NetCDF
 # --------------------------------------------
-def save_omas_nc(ods, filename, **kw):
+def _flat_ids_nc(ods, ids):
+    """
+    Flatten a single IDS (run by the worker processes of save_omas_nc)
+    """
+    return {ids + '.' + item: value for item, value in ods.getraw(ids).flat().items()}
+
+
+def save_omas_nc(ods, filename, workers=None, **kw):
     """
     Save an ODS to NetCDF file
 
@@ -18,14 +25,25 @@ def save_omas_nc(ods, filename, **kw):
 
     :param filename: filename to save to
 
+    :param workers: number of processes used to flatten the IDSs in parallel (writing to the NetCDF file is sequential)
+
     :param kw: arguments passed to the netCDF4 Dataset function
     """
     printd('Saving to %s' % filename, topic='nc')
 
     from netCDF4 import Dataset
 
-    odsf = ods.flat()
+    if workers and workers > 1 and not ods.location and not isinstance(ods, ODC):
+        odsf = {}
+        for part in omas_pool_map(_flat_ids_nc, sorted(ods.keys(dynamic=0)), workers, ods):
+            odsf.update(part)
+    else:
+        odsf = ods.flat()
+    stamp = ods.consistency_stamp() if not ods.location else None
     with Dataset(filename, 'w', **kw) as dataset:
+        # record that the data has been validated, so that it does not need to be validated again at load time
+        if stamp is not None:
+            dataset.setncattr('omas_consistency_check', stamp)
         for item in odsf:
             dims = []
             data = numpy.asarray(odsf[item])
@@ -75,7 +93,24 @@ def get_ds_item(dataset, item):
     return tmp
 
 
-def load_omas_nc(filename, consistency_check=True, imas_version=omas_rcparams['default_imas_version'], cls=ODS):
+def _load_ids_nc(shared, ids_list):
+    """
+    Load and check the consistency of some of the IDSs (run by the worker processes of load_omas_nc)
+    """
+    from netCDF4 import Dataset
+
+    filename, consistency_check, imas_version, cls, stamp = shared
+    ods = cls(imas_version=imas_version, consistency_check=False)
+    with Dataset(filename, 'r') as dataset:
+        for item in dataset.variables.keys():
+            if item.endswith('_error_upper') or item.split('.')[0] not in ids_list:
+                continue
+            ods.setraw(p2l(item), get_ds_item(dataset, item))
+    ods._set_consistency_check_trusted(consistency_check, stamp)
+    return ods.omas_data
+
+
+def load_omas_nc(filename, consistency_check=True, imas_version=omas_rcparams['default_imas_version'], cls=ODS, workers=None):
     """
     Load ODS or ODC from NetCDF file
 
@@ -87,6 +122,8 @@ def load_omas_nc(filename, consistency_check=True, imas_version=omas_rcparams['d
 
     :param cls: class to use for loading the data
 
+    :param workers: number of processes used to load the IDSs in parallel (only when loading an ODS)
+
     :return: OMAS data set
     """
     printd('Loading from %s' % filename, topic='nc')
@@ -95,12 +132,20 @@ def load_omas_nc(filename, consistency_check=True, imas_version=omas_rcparams['d
 
     ods = cls(imas_version=imas_version, consistency_check=False)
     with Dataset(filename, 'r') as dataset:
-        for item in dataset.variables.keys():
-            if item.endswith('_error_upper'):
-                continue
-            ods.setraw(p2l(item), get_ds_item(dataset, item))
-    ods.consistency_check = consistency_check
-    return ods
+        stamp = getattr(dataset, 'omas_consistency_check', None)
+        ids_list = list(dict.fromkeys(item.split('.')[0] for item in dataset.variables.keys()))
+        if not workers or workers <= 1 or issubclass(cls, ODC):
+            for item in dataset.variables.keys():
+                if item.endswith('_error_upper'):
+                    continue
+                ods.setraw(p2l(item), get_ds_item(dataset, item))
+            ods._set_consistency_check_trusted(consistency_check, stamp)
+            return ods
+    # the NetCDF file is closed before the worker processes are started
+    # NOTE: each worker loads a group of IDSs, since opening NetCDF files with many variables is slow
+    shared = (filename, consistency_check, imas_version, cls, stamp)
+    parts = omas_pool_map(_load_ids_nc, omas_pool_chunks(ids_list, workers), workers, shared)
+    return merge_ods_parts(ods, parts, consistency_check)
 
 
 class dynamic_omas_nc(dynamic_ODS):
@@ -109,16 +154,45 @@ class dynamic_omas_nc(dynamic_ODS):
     This class is not to be used by itself, but via the ODS.open() method.
     """
 
-    def __init__(self, filename):
-        self.kw = {'filename': filename}
+    def __init__(self, filename, cache_bytes=None):
+        """
+        :param filename: NC file to load data from
+
+        :param cache_bytes: budget of bytes of the cache of data read from file (omas_rcparams['dynamic_cache_bytes'] if None)
+        """
+        self.kw = {'filename': filename, 'cache_bytes': cache_bytes}
         self.dataset = None
         self.active = False
+        self.tree = None
+        self.cache = None
+        self.mtime = None
 
     def open(self):
         printd('Dynamic open  %s' % self.kw, topic='dynamic')
         from netCDF4 import Dataset
 
         self.dataset = Dataset(self.kw['filename'], 'r')
+
+        # data read from file is cached (also across close/open) unless the file has changed
+        mtime = os.path.getmtime(self.kw['filename'])
+        if self.cache is None or self.mtime != mtime:
+            cache_bytes = self.kw['cache_bytes']
+            if cache_bytes is None:
+                cache_bytes = omas_rcparams['dynamic_cache_bytes']
+            self.cache = LRUCache(cache_bytes)
+            self.tree = None
+        self.mtime = mtime
+
+        # the tree of the variables names is built once, so that keys() does not need to scan all the variables
+        if self.tree is None:
+            self.tree = {}
+            for item in self.dataset.variables.keys():
+                if item.endswith('_error_upper'):
+                    continue
+                h = self.tree
+                for k in p2l(item):
+                    h = h.setdefault(k, {})
+
         self.active = True
         return self
 
@@ -129,11 +203,22 @@ class dynamic_omas_nc(dynamic_ODS):
         self.active = False
         return self
 
+    def __setstate__(self, kw):
+        self.__init__(**kw)
+
     def __getitem__(self, key):
         if not self.active:
             raise RuntimeError('Dynamic link broken: %s' % self.kw)
-        printd('Dynamic read  %s: %s' % (self.kw['filename'], key), topic='dynamic')
-        return get_ds_item(self.dataset, key)
+        if key in self.cache:
+            value = self.cache[key]
+        else:
+            printd('Dynamic read  %s: %s' % (self.kw['filename'], key), topic='dynamic')
+            value = get_ds_item(self.dataset, key)
+            self.cache[key] = value
+        # the ODS owns the data that is returned
+        if isinstance(value, numpy.ndarray):
+            value = value.copy()
+        return value
 
     def __contains__(self, key):
         if not self.active:
@@ -141,9 +226,14 @@ class dynamic_omas_nc(dynamic_ODS):
         return key in self.dataset.variables
 
     def keys(self, location):
-        return numpy.unique(
-            [convert_int(k[len(location) :].lstrip('.').split('.')[0]) for k in self.dataset.variables.keys() if k.startswith(location)]
-        )
+        if not self.active:
+            raise RuntimeError('Dynamic link broken: %s' % self.kw)
+        h = self.tree
+        for k in p2l(location):
+            if k not in h:
+                return []
+            h = h[k]
+        return sorted(h.keys(), key=lambda x: (isinstance(x, str), x))
 
 
 def through_omas_nc(ods, method=['function', 'class_method'][1]):
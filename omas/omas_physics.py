@@ -3157,6 +3157,10 @@ Once done, you can reload the cocos definitions with:
             exec(f.read(), namespace)
         self.clear()
         self.update(namespace['_cocos_signals'])
+        # compiled node records carry the cocos transformations
+        from . import omas_utils
+
+        omas_utils._ods_node_cache.clear()
 
 
 # cocos_signals is the actual dictionary
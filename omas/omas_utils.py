@@ -6,6 +6,8 @@
 from .omas_setup import *
 from .omas_setup import __version__
 import sys
+import importlib.util
+import importlib.machinery
 
 # --------------------------------------------
 # ODS utilities
@@ -25,7 +27,18 @@ default_keys_to_ignore = [
 ]
 
 
-def different_ods(ods1, ods2, ignore_type=False, ignore_empty=False, ignore_keys=[], ignore_default_keys=True, rtol=1.0e-5, atol=1.0e-8):
+def different_ods(
+    ods1,
+    ods2,
+    ignore_type=False,
+    ignore_empty=False,
+    ignore_keys=[],
+    ignore_default_keys=True,
+    rtol=1.0e-5,
+    atol=1.0e-8,
+    max_differences=None,
+    workers=None,
+):
     """
     Checks if two ODSs have any difference and returns the string with the cause of the different
 
@@ -46,65 +59,142 @@ def different_ods(ods1, ods2, ignore_type=False, ignore_empty=False, ignore_keys
 
     atol : The absolute tolerance parameter
 
+    :param max_differences: stop the comparison after this number of differences is found
+
+    :param workers: number of threads used to compare the IDSs concurrently
+
     :return: string with reason for difference, or False otherwise
     """
     from omas import ODS, CodeParameters
 
-    ods1 = ods1.flat(return_empty_leaves=True, traverse_code_parameters=True)
-    ods2 = ods2.flat(return_empty_leaves=True, traverse_code_parameters=True)
-
     keys_to_ignore = []
     keys_to_ignore.extend(ignore_keys)
     if ignore_default_keys:
         keys_to_ignore.extend(default_keys_to_ignore)
-
-    def is_ignored(k):
-        return any(o2u(k).endswith(end) for end in keys_to_ignore)
-
-    k1 = set(ods1.keys())
-    k2 = set(ods2.keys())
-    differences = []
-    for k in k1.difference(k2):
-        if not k.startswith('info.') and not (ignore_empty and isinstance(ods1[k], ODS) and not len(ods1[k])) and not is_ignored(k):
-            differences.append(f'DIFF: key `{k}` missing in 2nd ods')
-    for k in k2.difference(k1):
-        if not k.startswith('info.') and not (ignore_empty and isinstance(ods2[k], ODS) and not len(ods2[k])) and not is_ignored(k):
-            differences.append(f'DIFF: key `{k}` missing in 1st ods')
-    for k in sorted(k1.intersection(k2)):
-        try:
-            if is_ignored(k):
-                pass
-            elif ods1[k] is None and ods2[k] is None:
-                pass
-            elif isinstance(ods1[k], str) and isinstance(ods2[k], str):
-                if ods1[k] != ods2[k]:
-                    differences.append(f'DIFF: `{k}` differ in value')
-            elif not ignore_type and type(ods1[k]) != type(ods2[k]):
-                differences.append(f'DIFF: `{k}` differ in type: {type(ods1[k])} vs type(ods2[k])')
-            elif is_uncertain(ods1[k]) or is_uncertain(ods2[k]):
-                v1 = nominal_values(ods1[k])
-                v2 = nominal_values(ods2[k])
-                d1 = std_devs(ods1[k])
-                d2 = std_devs(ods1[k])
-                s1 = v1.shape
-                s2 = v2.shape
-                if s1 != s2:
-                    differences.append(f'DIFF: `{k}` differ in shape: {s1} vs {s2}')
-                elif not numpy.allclose(v1, v2, equal_nan=True, atol=atol, rtol=rtol) or not numpy.allclose(
-                    d1, d2, equal_nan=True, atol=atol, rtol=rtol
-                ):
-                    differences.append(f'DIFF: `{k}` differ in value')
+    keys_to_ignore = tuple(keys_to_ignore)
+
+    def getter(ods):
+        # data that is not transformed on the way out is accessed raw
+        if isinstance(ods, ODS) and (
+            ods.active_dynamic or ods.cocosio != ods.cocos or ods.coordsio or ods.unitsio or ods.uncertainio
+        ):
+            return lambda node, key: node.__getitem__(key)
+        return lambda node, key: node.getraw(key)
+
+    get1 = getter(ods1)
+    get2 = getter(ods2)
+
+    def keys(node):
+        # structures that have data (as traversed by ODS.paths)
+        if isinstance(node, ODS):
+            if len(node.keys()):
+                return sorted(node.keys())
+        elif isinstance(node, CodeParameters):
+            return sorted(node.keys())
+        return None
+
+    def leaves(node, path, get):
+        # leaves of a structure as returned by ODS.flat(return_empty_leaves=True)
+        node_keys = keys(node)
+        if node_keys is None:
+            yield path, node
+        else:
+            for key in node_keys:
+                yield from leaves(get(node, key), path + [key], get)
+
+    def missing(node, path, get, which):
+        for path, value in leaves(node, path, get):
+            if path[:1] == ['info'] or (ignore_empty and isinstance(value, ODS)) or is_ignored(path):
+                continue
+            yield f'DIFF: key `{l2o(path)}` missing in {which} ods'
+
+    def is_ignored(path):
+        return o2u(l2o(path)).endswith(keys_to_ignore)
+
+    def compare(v1, v2, path):
+        k1 = keys(v1)
+        k2 = keys(v2)
+        if k1 is not None and k2 is not None:
+            s1 = set(k1)
+            s2 = set(k2)
+            for key in k1:
+                if key not in s2:
+                    yield from missing(get1(v1, key), path + [key], get1, '2nd')
+            for key in k2:
+                if key not in s1:
+                    yield from missing(get2(v2, key), path + [key], get2, '1st')
+            for key in k1:
+                if key in s2:
+                    yield from compare(get1(v1, key), get2(v2, key), path + [key])
+        elif k1 is not None or k2 is not None:
+            yield from missing(v1, path, get1, '2nd')
+            yield from missing(v2, path, get2, '1st')
+        elif not is_ignored(path):
+            try:
+                difference = compare_leaves(v1, v2)
+            except Exception as _excp:
+                raise Exception(f'Error comparing {l2o(path)}: ' + repr(_excp))
+            if difference:
+                yield f'DIFF: `{l2o(path)}` differ in {difference}'
+
+    def compare_leaves(v1, v2):
+        if v1 is v2 or (v1 is None and v2 is None):
+            return
+        elif isinstance(v1, str) and isinstance(v2, str):
+            if v1 != v2:
+                return 'value'
+        elif not ignore_type and type(v1) != type(v2):
+            return f'type: {type(v1)} vs {type(v2)}'
+        elif isinstance(v1, ODS) and isinstance(v2, ODS):
+            return
+        elif isinstance(v1, numpy.ndarray) and isinstance(v2, numpy.ndarray) and v1.shape != v2.shape:
+            return f'shape: {v1.shape} vs {v2.shape}'
+        # identical data does not need to go through the tolerances
+        elif isinstance(v1, numpy.ndarray) and isinstance(v2, numpy.ndarray) and v1.dtype.kind in 'biufc' and v1.dtype == v2.dtype:
+            if not numpy.array_equal(v1, v2) and not numpy.allclose(v1, v2, equal_nan=True, atol=atol, rtol=rtol):
+                return 'value'
+        elif isinstance(v1, (int, float)) and isinstance(v2, (int, float)):
+            if v1 != v2 and not numpy.allclose(v1, v2, equal_nan=True, atol=atol, rtol=rtol):
+                return 'value'
+        elif is_uncertain(v1) or is_uncertain(v2):
+            n1 = nominal_values(v1)
+            n2 = nominal_values(v2)
+            if n1.shape != n2.shape:
+                return f'shape: {n1.shape} vs {n2.shape}'
+            elif not numpy.allclose(n1, n2, equal_nan=True, atol=atol, rtol=rtol) or not numpy.allclose(
+                std_devs(v1), std_devs(v2), equal_nan=True, atol=atol, rtol=rtol
+            ):
+                return 'value'
+        else:
+            n1 = nominal_values(v1)
+            n2 = nominal_values(v2)
+            if n1.shape != n2.shape:
+                return f'shape: {n1.shape} vs {n2.shape}'
+            elif not numpy.allclose(v1, v2, equal_nan=True, atol=atol, rtol=rtol):
+                return 'value'
+
+    # the IDSs can be compared concurrently
+    if workers and workers > 1 and keys(ods1) is not None and keys(ods2) is not None and not ods1.location and not ods2.location:
+        from concurrent.futures import ThreadPoolExecutor
+
+        k1 = keys(ods1)
+        k2 = keys(ods2)
+
+        def compare_ids(key):
+            if key not in k2:
+                differences = missing(get1(ods1, key), [key], get1, '2nd')
+            elif key not in k1:
+                differences = missing(get2(ods2, key), [key], get2, '1st')
             else:
-                v1 = nominal_values(ods1[k])
-                v2 = nominal_values(ods2[k])
-                s1 = v1.shape
-                s2 = v2.shape
-                if v1.shape != v2.shape:
-                    differences.append(f'DIFF: `{k}` differ in shape: {s1} vs {s2}')
-                elif not numpy.allclose(ods1[k], ods2[k], equal_nan=True, atol=atol, rtol=rtol):
-                    differences.append(f'DIFF: `{k}` differ in value')
-        except Exception as _excp:
-            raise Exception(f'Error comparing {k}: ' + repr(_excp))
+                differences = compare(get1(ods1, key), get2(ods2, key), [key])
+            return list(itertools.islice(differences, max_differences))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            differences = list(itertools.chain(*executor.map(compare_ids, k1 + [key for key in k2 if key not in k1])))
+    else:
+        differences = compare(ods1, ods2, [])
+    differences = list(itertools.islice(differences, max_differences))
+
     if len(differences):
         return differences
     else:
@@ -290,6 +380,46 @@ def omas_interp1d(x, xp, yp, left=None, right=None, period=None, extrapolate=Tru
 omas_interp1d.__doc__ += numpy.interp.__doc__
 
 
+def omas_interp_weights(x, xp, method='linear'):
+    """
+    Indices and weights to interpolate data defined at xp onto x as `yp[i0] * (1 - w) + yp[i1] * w`
+    (the same indices and weights can be used for all the data that shares the same xp)
+
+    Data is not extrapolated beyond the bounds of xp
+
+    :param x: x-coordinates at which to interpolate
+
+    :param xp: x-coordinates of the data (does not need to be increasing)
+
+    :param method: 'linear', 'nearest', or 'previous'
+
+    :return: tuple with indices i0, i1 and weights w
+    """
+    if method not in ['linear', 'nearest', 'previous']:
+        raise ValueError("method must be one of 'linear', 'nearest', or 'previous' and not %s" % repr(method))
+    x = numpy.atleast_1d(x)
+    xp = numpy.atleast_1d(xp)
+    if not numpy.all(numpy.diff(xp) > 0):
+        index = numpy.argsort(xp, kind='stable')
+    else:
+        index = numpy.arange(len(xp)).astype(int)
+    xs = xp[index]
+    if len(xs) == 1:
+        i0 = i1 = numpy.zeros(len(x), dtype=int)
+        return index[i0], index[i1], numpy.zeros(len(x))
+    i1 = numpy.clip(numpy.searchsorted(xs, x), 1, len(xs) - 1)
+    i0 = i1 - 1
+    dx = xs[i1] - xs[i0]
+    w = numpy.clip((x - xs[i0]) / numpy.where(dx > 0, dx, 1.0), 0.0, 1.0)
+    if method == 'nearest':
+        i0 = numpy.where(w > 0.5, i1, i0)
+        w = numpy.zeros(len(x))
+    elif method == 'previous':
+        i0 = numpy.where(w >= 1.0, i1, i0)
+        w = numpy.zeros(len(x))
+    return index[i0], index[i1], w
+
+
 def json_dumper(obj, objects_encode=True):
     """
     Dump objects to json format
@@ -298,6 +428,7 @@ def json_dumper(obj, objects_encode=True):
 
     :param objects_encode: how to handle non-standard JSON objects
         * True: encode numpy arrays, complex, and uncertain
+        * 'base64': like True, but numeric numpy arrays are encoded as base64 strings of their binary data
         * None: numpy arrays as lists, encode complex, and uncertain
         * False: numpy arrays as lists, fail on complex, and uncertain
 
@@ -341,6 +472,11 @@ def json_dumper(obj, objects_encode=True):
             else:
                 if objects_encode is None:
                     return obj.tolist()
+                elif objects_encode == 'base64' and obj.dtype.kind in 'biuf':
+                    import base64
+
+                    data = base64.b64encode(numpy.ascontiguousarray(obj).tobytes()).decode('ascii')
+                    return dict(__ndarray__=data, dtype=obj.dtype.str, shape=obj.shape)
                 else:
                     return dict(__ndarray_tolist__=obj.tolist(), dtype=str(obj.dtype), shape=obj.shape)
         elif isinstance(obj, range):
@@ -445,7 +581,7 @@ def json_loader(object_pairs, cls=dict, null_to=None):
         import base64
 
         data = base64.b64decode(dct['__ndarray__'])
-        return numpy.frombuffer(data, dct['dtype']).reshape(dct['shape'])
+        return numpy.frombuffer(bytearray(data), dct['dtype']).reshape(dct['shape'])
     elif '__complex__' in dct:
         return complex(dct['real'], dct['imag'])
     return dct
@@ -647,6 +783,119 @@ def args_as_kw(f, args, kw):
     return args[n:], kw
 
 
+class LRUCache(object):
+    """
+    Cache that discards the least recently used items once the total size of its values exceeds a budget of bytes
+    """
+
+    def __init__(self, max_bytes):
+        """
+        :param max_bytes: budget of bytes (values larger than this are not cached)
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.data = OrderedDict()
+
+    @staticmethod
+    def sizeof(value):
+        """
+        :param value: value to estimate the size of
+
+        :return: size of value in bytes
+        """
+        if isinstance(value, numpy.ndarray):
+            return value.nbytes
+        return sys.getsizeof(value)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        value, size = self.data[key]
+        self.data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self.data:
+            self.nbytes -= self.data.pop(key)[1]
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        self.data[key] = (value, size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            self.nbytes -= self.data.popitem(last=False)[1][1]
+
+    def clear(self):
+        self.data.clear()
+        self.nbytes = 0
+
+
+_pool_shared = {}
+
+
+def _pool_initializer(shared):
+    _pool_shared['shared'] = shared
+
+
+def _pool_worker(function_item):
+    function, item = function_item
+    return function(_pool_shared['shared'], item)
+
+
+def omas_pool_chunks(items, workers):
+    """
+    Split items in contiguous groups, one for each worker
+
+    :param items: list of items
+
+    :param workers: number of workers
+
+    :return: list of non-empty lists of items
+    """
+    items = list(items)
+    workers = max(1, min(workers or 1, len(items)))
+    return [items[k * len(items) // workers : (k + 1) * len(items) // workers] for k in range(workers)]
+
+
+def omas_pool_map(function, items, workers=None, shared=None):
+    """
+    Evaluate `function(shared, item)` for each of the items using a pool of worker processes
+
+    The `shared` object is handed to each worker process only once when the pool starts
+    (and it is not pickled at all on platforms where worker processes are forked)
+
+    :param function: module-level function to evaluate
+
+    :param items: list of items
+
+    :param workers: number of worker processes (items are processed sequentially in this process if None or <=1, or with Python < 3.7)
+
+    :param shared: object passed as first argument to function
+
+    :return: list with the results, in the same order as the items
+    """
+    items = list(items)
+    # the initializer of ProcessPoolExecutor is only available in Python 3.7+
+    if not workers or workers <= 1 or len(items) <= 1 or sys.version_info < (3, 7):
+        return [function(shared, item) for item in items]
+
+    import multiprocessing
+    import concurrent.futures
+
+    mp_context = None
+    if 'fork' in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context('fork')
+    printd('Processing %d items with %d workers' % (len(items), min(workers, len(items))), topic='pool')
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(workers, len(items)), mp_context=mp_context, initializer=_pool_initializer, initargs=(shared,)
+    ) as pool:
+        return list(pool.map(_pool_worker, [(function, item) for item in items]))
+
+
 # ----------------------------------------------
 # handling of OMAS json structures
 # ----------------------------------------------
@@ -668,8 +917,14 @@ _info_structures = {}
 _coordinates = {}
 # dictionary that contains all the times defined within the data dictionary
 _times = {}
+# time nodes under a given location, organized by imas version and location
+_time_nodes = {}
+# time coordinate of the nodes, organized by imas version and universal ODS path
+_time_bases = {}
 # dictionary that contains all the _global_quantities defined within the data dictionary
 _global_quantities = {}
+# compiled schema records for each node, organized by imas version and universal ODS path
+_ods_node_cache = {}
 
 # extra structures that python modules using omas can define
 # by setting omas.omas_utils._extra_structures equal to a
@@ -691,6 +946,75 @@ _global_quantities = {}
 _extra_structures = {}
 
 
+def _private_directory(directory):
+    """
+    :param directory: directory path
+
+    :return: whether the directory is owned by the current user and cannot be accessed by other users
+    """
+    if not hasattr(os, 'getuid'):
+        return os.path.isdir(directory)
+    try:
+        stat = os.stat(directory)
+    except OSError:
+        return False
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o077
+
+
+def structures_bundle(name, sources, generate):
+    """
+    Returns data derived from the IMAS json structure files, caching it as a binary (pickle) bundle
+    under `omas_rcparams['tmp_omas_dir']` so that other Python sessions do not have to parse the json files again.
+    Bundles are regenerated whenever the OMAS version or the modification time or size of the source files change.
+    Since bundles are unpickled, this is opt-in (OMAS_IMAS_STRUCTURES_CACHE=1), and bundles are only read from a
+    directory that is owned by the current user and is not accessible by others.
+
+    :param name: name of the bundle (relative path within the cache directory, without extension)
+
+    :param sources: list of files/directories that the data is derived from
+
+    :param generate: function that generates the data when the bundle is missing or out-of-date
+
+    :return: data
+    """
+    if not omas_rcparams['imas_structures_cache']:
+        return generate()
+
+    signature = [__version__]
+    for source in sources:
+        stat = os.stat(source)
+        signature.append((os.path.abspath(source), stat.st_mtime_ns, stat.st_size))
+    filename = os.sep.join([omas_rcparams['tmp_omas_dir'], 'imas_structures_cache', name + '.pkl'])
+
+    # read bundle
+    try:
+        if not _private_directory(os.path.dirname(filename)):
+            raise PermissionError('%s is not a private directory of the current user' % os.path.dirname(filename))
+        with open(filename, 'rb') as f:
+            bundle = pickle.load(f)
+        if bundle['signature'] == signature:
+            return bundle['data']
+    except Exception as _excp:
+        if os.path.exists(filename):
+            printd('Failed to read %s: %s' % (filename, repr(_excp)), topic='structures')
+
+    # (re)generate bundle
+    data = generate()
+    try:
+        if not os.path.exists(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename), mode=0o700, exist_ok=True)
+        if not _private_directory(os.path.dirname(filename)):
+            raise PermissionError('%s is not a private directory of the current user' % os.path.dirname(filename))
+        # write to a temporary file first so that concurrent processes never read partial bundles
+        tmp = filename + '.%d' % os.getpid()
+        with open(tmp, 'wb') as f:
+            pickle.dump({'signature': signature, 'data': data}, f, protocol=omas_rcparams['pickle_protocol'])
+        os.replace(tmp, filename)
+    except OSError as _excp:
+        printd('Failed to write %s: %s' % (filename, repr(_excp)), topic='structures')
+    return data
+
+
 def list_structures(imas_version):
     """
     list names of structures in imas version
@@ -716,13 +1040,19 @@ def structures_filenames(imas_version):
     :return: dictionary maps structure names to json filenames
     """
     if imas_version not in _structures_filenames:
-        paths = glob.glob(imas_json_dir + os.sep + imas_versions.get(imas_version, imas_version) + os.sep + '*' + '.json')
-        if not len(paths):
+        version_dir = imas_json_dir + os.sep + imas_versions.get(imas_version, imas_version)
+        if not os.path.isdir(version_dir):
             raise ValueError("Unrecognized IMAS version `%s`. Possible options are:\n%s" % (imas_version, imas_versions.keys()))
-        structures = dict(zip(list(map(lambda x: os.path.splitext(os.path.split(x)[1])[0], paths)), paths))
-        _structures_filenames[imas_version] = {
-            structure: structures[structure] for structure in structures if not structure.startswith('_')
-        }
+
+        def generate():
+            paths = glob.glob(version_dir + os.sep + '*' + '.json')
+            structures = dict(zip(list(map(lambda x: os.path.splitext(os.path.split(x)[1])[0], paths)), paths))
+            return {structure: structures[structure] for structure in structures if not structure.startswith('_')}
+
+        structures = structures_bundle(os.path.basename(version_dir) + os.sep + '_filenames', [version_dir], generate)
+        if not len(structures):
+            raise ValueError("Unrecognized IMAS version `%s`. Possible options are:\n%s" % (imas_version, imas_versions.keys()))
+        _structures_filenames[imas_version] = structures
     return _structures_filenames[imas_version]
 
 
@@ -749,13 +1079,30 @@ def load_structure(filename, imas_version):
         return _structures[id], _structures_dict[id]
 
     else:
-        with open(filename, 'r') as f:
-            dump_string = f.read()
-        # load flat definitions from json file
-        _structures[id] = json.loads(dump_string)
 
-        # add _extra_structures definitions
+        def generate():
+            with open(filename, 'r') as f:
+                dump_string = f.read()
+            # load flat definitions from json file
+            flat = json.loads(dump_string)
+
+            # generate hierarchical structure
+            hierarchical = {}
+            for item in flat:
+                h = hierarchical
+                for step in i2o(item).split('.'):
+                    if step not in h:
+                        h[step] = {}
+                    h = h[step]
+
+            return flat, hierarchical
+
         structure_name = os.path.splitext(os.path.split(filename)[1])[0]
+        _structures[id], _structures_dict[id] = structures_bundle(
+            os.path.basename(os.path.dirname(filename)) + os.sep + structure_name, [filename], generate
+        )
+
+        # add _extra_structures definitions
         if structure_name in _extra_structures:
             for item in _extra_structures[structure_name]:
                 if item not in _structures[id]:
@@ -763,15 +1110,11 @@ def load_structure(filename, imas_version):
                     _structures[id][item] = _extra_structures[structure_name][item]
                     if cs is not None:
                         cocos_signals[i2o(item)] = cs
-
-        # generate hierarchical structure
-        _structures_dict[id] = {}
-        for item in _structures[id]:
-            h = _structures_dict[id]
-            for step in i2o(item).split('.'):
-                if step not in h:
-                    h[step] = {}
-                h = h[step]
+                    h = _structures_dict[id]
+                    for step in i2o(item).split('.'):
+                        if step not in h:
+                            h[step] = {}
+                        h = h[step]
 
     return _structures[id], _structures_dict[id]
 
@@ -801,6 +1144,140 @@ def imas_structure(imas_version, location):
     return _ods_structure_cache[imas_version][ulocation]
 
 
+class IMAS_node(object):
+    """
+    Read-only record with the data dictionary information of a node that is needed when setting/getting data in an ODS
+    """
+
+    __slots__ = [
+        'location',
+        'info',
+        'structure',
+        'data_type',
+        'ndim',
+        'coordinates',
+        'units',
+        'lifecycle_status',
+        'cocos_transform',
+        'cocos_abs',
+        'is_coordinate',
+        'is_extra',
+    ]
+
+    def __init__(self, location, info, structure, cocos_transform=None, cocos_abs=False, is_coordinate=False, is_extra=False):
+        """
+        :param location: universal ODS path of the node
+
+        :param info: node information as stored in the json structure file (this is not copied and should not be modified)
+
+        :param structure: hierarchical structure of the node, as returned by imas_structure()
+
+        :param cocos_transform: entry of `cocos_signals` that applies to this node (None if no COCOS transformation applies)
+
+        :param cocos_abs: apply the absolute value of the COCOS transformation (eg. for `_error_upper` nodes)
+
+        :param is_coordinate: node is a coordinate in the data dictionary
+
+        :param is_extra: node is defined via `_extra_structures`
+        """
+        setattr_ = super().__setattr__
+        setattr_('location', location)
+        setattr_('info', info)
+        setattr_('structure', structure)
+        setattr_('data_type', info.get('data_type', None))
+        setattr_('coordinates', tuple(info.get('coordinates', ())))
+        setattr_('ndim', len(info.get('coordinates', ())))
+        setattr_('units', info.get('units', None))
+        setattr_('lifecycle_status', info.get('lifecycle_status', None))
+        setattr_('cocos_transform', cocos_transform)
+        setattr_('cocos_abs', cocos_abs)
+        setattr_('is_coordinate', is_coordinate)
+        setattr_('is_extra', is_extra)
+
+    def __setattr__(self, attr, value):
+        raise AttributeError('IMAS_node records are read-only')
+
+    def __repr__(self):
+        return 'IMAS_node(%s)' % self.location
+
+
+def _compile_imas_nodes(ids, imas_version):
+    """
+    Generate the IMAS_node records for all the nodes of an IDS
+
+    :param ids: IDS name
+
+    :param imas_version: imas version
+
+    :return: dictionary with IMAS_node records indexed by universal ODS path
+    """
+    from .omas_physics import cocos_signals
+
+    flat, hierarchical = load_structure(ids, imas_version)
+    coordinates = set(omas_coordinates(imas_version))
+    extra = _extra_structures.get(ids, {})
+    error_pattern = re.compile(r'_error_(upper|lower)$')
+
+    nodes = {}
+    todo = [(ids, hierarchical[ids])]
+    while todo:
+        ulocation, structure = todo.pop()
+        for key in structure:
+            todo.append((ulocation + '.' + key, structure[key]))
+        ilocation = o2i(ulocation)
+        blocation = error_pattern.sub('', ulocation)
+        nodes[ulocation] = IMAS_node(
+            ulocation,
+            flat.get(ilocation, {}),
+            structure,
+            cocos_transform=dict.get(cocos_signals, blocation, None) if '.' in ulocation else None,
+            cocos_abs=blocation != ulocation,
+            is_coordinate=ulocation in coordinates,
+            is_extra=ilocation in extra,
+        )
+    return nodes
+
+
+# placeholder for the names of IDSs that are not in the data dictionary
+_ids_not_found = object()
+
+
+def imas_node(imas_version, ulocation, strict=True):
+    """
+    Returns the compiled schema record of a node given its universal location
+    NOTE: the records of all the nodes of an IDS are compiled at once, the first time that any node of that IDS is requested
+
+    :param imas_version: imas version
+
+    :param ulocation: path in universal ODS format
+
+    :param strict: raise a LookupError if ulocation is not in the data dictionary, otherwise return a record with no info
+
+    :return: IMAS_node record
+    """
+    try:
+        node = _ods_node_cache[imas_version][ulocation]
+        if node is not _ids_not_found:
+            return node
+    except KeyError:
+        pass
+    nodes = _ods_node_cache.setdefault(imas_version, {})
+    ids = ulocation.split('.')[0]
+    if ids not in nodes:
+        try:
+            nodes.update(_compile_imas_nodes(ids, imas_version))
+        except (LookupError, ValueError):
+            pass
+        # remember IDSs that are not valid IDSs
+        nodes.setdefault(ids, _ids_not_found)
+    node = nodes.get(ulocation, None)
+    if node is None or node is _ids_not_found:
+        if strict:
+            raise LookupError('Not a valid IMAS %s location: %s' % (imas_version, ulocation))
+        return IMAS_node(ulocation, {}, {})
+    return node
+
+
 def omas_coordinates(imas_version=omas_rcparams['default_imas_version']):
     """
     return list of coordinates
@@ -813,8 +1290,14 @@ def omas_coordinates(imas_version=omas_rcparams['default_imas_version']):
     if imas_version not in _coordinates:
         filename = imas_json_dir + os.sep + imas_versions.get(imas_version, imas_version) + os.sep + '_coordinates.json'
         if os.path.exists(filename):
-            with open(filename, 'r') as f:
-                _coordinates[imas_version] = json.load(f)
+
+            def generate():
+                with open(filename, 'r') as f:
+                    return json.load(f)
+
+            _coordinates[imas_version] = structures_bundle(
+                imas_versions.get(imas_version, imas_version) + os.sep + '_coordinates', [filename], generate
+            )
         else:
             from .omas_structure import extract_coordinates
 
@@ -834,8 +1317,14 @@ def omas_times(imas_version=omas_rcparams['default_imas_version']):
     if imas_version not in _times:
         filename = imas_json_dir + os.sep + imas_versions.get(imas_version, imas_version) + os.sep + '_times.json'
         if os.path.exists(filename):
-            with open(filename, 'r') as f:
-                _times[imas_version] = json.load(f)
+
+            def generate():
+                with open(filename, 'r') as f:
+                    return json.load(f)
+
+            _times[imas_version] = structures_bundle(
+                imas_versions.get(imas_version, imas_version) + os.sep + '_times', [filename], generate
+            )
         else:
             from .omas_structure import extract_times
 
@@ -843,6 +1332,44 @@ def omas_times(imas_version=omas_rcparams['default_imas_version']):
     return _times[imas_version]
 
 
+def omas_time_nodes(ulocation, imas_version=omas_rcparams['default_imas_version']):
+    """
+    return list of times under a given location (the list is built once for each location)
+
+    :param ulocation: universal ODS path (the times returned are those whose path starts with this string)
+
+    :param imas_version: IMAS version to look up
+
+    :return: list of strings with IMAS times in universal ODS path format
+    """
+    if (imas_version, ulocation) not in _time_nodes:
+        ids = ulocation.split('.')[0]
+        if ulocation == ids:
+            _time_nodes[imas_version, ulocation] = [i2o(k) for k in omas_times(imas_version) if k.startswith(ids + '.')]
+        else:
+            _time_nodes[imas_version, ulocation] = [k for k in omas_time_nodes(ids, imas_version) if k.startswith(ulocation)]
+    return _time_nodes[imas_version, ulocation]
+
+
+def omas_time_base(ulocation, imas_version=omas_rcparams['default_imas_version']):
+    """
+    return the time coordinate of a given node (the schema is looked up once for each node)
+
+    :param ulocation: universal ODS path
+
+    :param imas_version: IMAS version to look up
+
+    :return: time coordinate of the node in universal ODS path format, or None if the node does not depend on time
+    """
+    if (imas_version, ulocation) not in _time_bases:
+        _time_bases[imas_version, ulocation] = None
+        for coordinate in omas_info_node(ulocation, imas_version).get('coordinates', []):
+            if coordinate.endswith('.time'):
+                _time_bases[imas_version, ulocation] = i2o(coordinate)
+                break
+    return _time_bases[imas_version, ulocation]
+
+
 def omas_global_quantities(imas_version=omas_rcparams['default_imas_version']):
     """
     return list of times
@@ -855,8 +1382,14 @@ def omas_global_quantities(imas_version=omas_rcparams['default_imas_version']):
     if imas_version not in _global_quantities:
         filename = imas_json_dir + os.sep + imas_versions.get(imas_version, imas_version) + os.sep + '_global_quantities.json'
         if os.path.exists(filename):
-            with open(filename, 'r') as f:
-                _global_quantities[imas_version] = json.load(f)
+
+            def generate():
+                with open(filename, 'r') as f:
+                    return json.load(f)
+
+            _global_quantities[imas_version] = structures_bundle(
+                imas_versions.get(imas_version, imas_version) + os.sep + '_global_quantities', [filename], generate
+            )
         else:
             from .omas_structure import extract_global_quantities
 
@@ -871,9 +1404,21 @@ if os.name == 'nt' or os.geteuid() != os.stat(__file__).st_uid:
         exec(f.read(), globals())
 else:
     try:
-        import pyximport
+        # load the extension previously compiled by pyximport if it is up-to-date with the .pyx file
+        # since importing pyximport (and with it the Cython compiler) is a large fraction of the `import omas` time
+        _pyx_filename = os.path.split(__file__)[0] + os.sep + 'omas_cython.pyx'
+        for _ext_filename in glob.glob(
+            os.sep.join([os.path.expanduser('~'), '.pyxbld', 'lib.*', 'omas', 'omas_cython' + importlib.machinery.EXTENSION_SUFFIXES[0]])
+        ):
+            if os.stat(_ext_filename).st_mtime >= os.stat(_pyx_filename).st_mtime:
+                _spec = importlib.util.spec_from_file_location(__package__ + '.omas_cython', _ext_filename)
+                sys.modules[_spec.name] = importlib.util.module_from_spec(_spec)
+                _spec.loader.exec_module(sys.modules[_spec.name])
+                break
+        else:
+            import pyximport
 
-        pyximport.install(language_level=3)
+            pyximport.install(language_level=3)
         from .omas_cython import *
     except Exception as _excp:
         warnings.warn('omas cython failed: ' + str(_excp))
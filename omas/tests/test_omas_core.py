@@ -283,6 +283,12 @@ class TestOmasCore(UnittestCaseOmas):
         extra_info = {}
         assert ods['equilibrium.time_slice'][0].time() == 101
         assert ods['equilibrium'].time('time_slice.0') == 101
+        assert ods['equilibrium'].time('time_slice.2') == 302
+
+        # the time index of arrays of structures is looked up once for all their elements
+        from omas.omas_core import _time_array_index
+
+        assert not any(re.search(r'\.[0-9]+', key[1]) for key in _time_array_index)
         assert ods['equilibrium.time_slice'][0].homogeneous_time() is True
 
         # sample pf_active data has non-homogeneous times
@@ -298,6 +304,58 @@ class TestOmasCore(UnittestCaseOmas):
         ods['dataset_description'].satisfy_imas_requirements()
         assert ods['dataset_description.ids_properties.homogeneous_time'] is not None
 
+    def test_slice_at_time(self):
+        ods = ODS()
+        ods.sample_equilibrium()
+        ods.sample_equilibrium(time_index=1)
+        ods['equilibrium.time'] = [0.0, 1.0]
+        ods.sample_pf_active()
+
+        # slices can be views of the original data
+        ods1 = ods.copy()
+        ods1.slice_at_time(time_index=1)
+        ods2 = ods.slice_at_time(time_index=1, in_place=False)
+        assert not different_ods(ods1, ods2)
+        assert len(ods['equilibrium.time_slice']) == 2
+        assert numpy.shares_memory(ods2['pf_active.coil.0.current.data'], ods['pf_active.coil.0.current.data'])
+        assert not ods2['pf_active.coil.0.current.data'].flags.writeable
+
+        # slicing a sub-tree returns a new ODS with the slice at the same location
+        ods3 = ods['equilibrium'].slice_at_time(time_index=1, in_place=False)
+        assert list(ods3.keys()) == ['equilibrium']
+        assert not different_ods(ods1['equilibrium'], ods3['equilibrium'])
+
+    def test_resample_time(self):
+        ods = ODS()
+        ods.sample_equilibrium()
+        ods.sample_equilibrium(time_index=1)
+        ods['equilibrium.time'] = [0.0, 1.0]
+        ods['equilibrium.time_slice.0.global_quantities.ip'] = 1.0
+        ods['equilibrium.time_slice.1.global_quantities.ip'] = 2.0
+        ods.sample_pf_active()
+
+        time = numpy.linspace(-0.5, 1.5, 9)
+        ods1 = ods.resample_time(time)
+        assert numpy.allclose(ods1['equilibrium.time'], time)
+        assert numpy.allclose(ods1['equilibrium.time_slice.:.time'], time)
+        assert numpy.allclose(ods1['equilibrium.time_slice.:.global_quantities.ip'], [1.0, 1.0, 1.0, 1.25, 1.5, 1.75, 2.0, 2.0, 2.0])
+        for coil in ods['pf_active.coil']:
+            data = numpy.interp(time, ods['pf_active.coil'][coil]['current.time'], ods['pf_active.coil'][coil]['current.data'])
+            assert numpy.allclose(ods1['pf_active.coil'][coil]['current.data'], data)
+
+        ods2 = ods['equilibrium'].resample_time(time, method='previous')
+        assert numpy.allclose(ods2['equilibrium.time_slice.:.global_quantities.ip'], [1.0] * 6 + [2.0] * 3)
+        assert len(ods['equilibrium.time_slice']) == 2
+
+        # homogeneous_time IDSs use the IDS time as time base
+        ods = ODS()
+        ods['magnetics.ids_properties.homogeneous_time'] = 1
+        ods['magnetics.time'] = numpy.linspace(0, 1, 11)
+        ods['magnetics.flux_loop.0.flux.data'] = numpy.linspace(0, 10, 11)
+        ods1 = ods.resample_time([0.25, 0.5])
+        assert numpy.allclose(ods1['magnetics.time'], [0.25, 0.5])
+        assert numpy.allclose(ods1['magnetics.flux_loop.0.flux.data'], [2.5, 5.0])
+
     def test_dynamic_set_existing_list_nonzero_array_index(self):
         ods = ODS()
         ods.consistency_check = False
@@ -344,6 +402,72 @@ class TestOmasCore(UnittestCaseOmas):
         # access by pattern
         assert ods['@eq.*1.*.ip'] == 1
 
+    def test_search_paths(self):
+        ods = ODS()
+        for k in range(12):
+            ods[f'equilibrium.time_slice.{k}.global_quantities.ip'] = k
+        ods['core_profiles.profiles_1d.0.grid.rho_tor_norm'] = [0.0, 1.0]
+        ods['core_profiles.profiles_1d.0.electrons.density_thermal'] = [1.0, 0.0]
+
+        # matches are returned in the same order as full_paths
+        assert ods.search_paths('eq.*ip') == [l2o(path) for path in ods.full_paths() if path[0] == 'equilibrium']
+        assert ods.search_paths('equilibrium.time_slice.1.*') == [
+            'equilibrium.time_slice.1.global_quantities.ip',
+            'equilibrium.time_slice.10.global_quantities.ip',
+            'equilibrium.time_slice.11.global_quantities.ip',
+        ]
+
+        # the catalogue of paths follows changes to the ODS
+        assert len(ods.search_paths('@core.*elec.*dens', None, '@')) == 1
+        ods['core_profiles.profiles_1d.0.electrons.density_fast'] = [0.0, 0.0]
+        assert len(ods.search_paths('@core.*elec.*dens', None, '@')) == 2
+        del ods['core_profiles.profiles_1d.0.electrons.density_fast']
+        ods['core_profiles.profiles_1d.0.electrons.density_thermal'] = [2.0, 0.0]
+        assert ods['@core.*elec.*dens'][0] == 2.0
+        ods['core_profiles'].clear()
+        assert not len(ods.search_paths('@core.*', None, '@'))
+
+        # writing to another ODS does not invalidate the catalogue of paths
+        ods._paths_catalogue()
+        catalogue = ods._catalogue
+        ods1 = ODS()
+        ods1['equilibrium.time_slice.0.global_quantities.ip'] = 1.0
+        del ods1['equilibrium.time_slice.0']
+        assert ods._paths_catalogue()[0] is catalogue[2]
+        ods['equilibrium.time_slice.0.global_quantities.ip'] = 1.0
+        assert ods._paths_catalogue()[0] is catalogue[2]
+        ods['equilibrium.time_slice.0.global_quantities.psi_axis'] = 1.0
+        assert ods._paths_catalogue()[0] is not catalogue[2]
+
+    def test_fingerprint(self):
+        ods = ODS()
+        ods.sample_equilibrium()
+        ods.sample_equilibrium(time_index=1)
+        ods1 = ods.copy()
+        assert ods.fingerprint() == ods1.fingerprint()
+        assert ods.fingerprint('equilibrium.time_slice.0') == ods1['equilibrium.time_slice.0'].fingerprint()
+
+        # fingerprints follow changes to the data
+        fingerprint = ods1.fingerprint()
+        ods1['equilibrium.time_slice.1.global_quantities.ip'] *= 2
+        assert ods1.fingerprint() != fingerprint
+        assert ods1.fingerprint('equilibrium.time_slice.0') == ods.fingerprint('equilibrium.time_slice.0')
+        assert ods1.fingerprint('equilibrium.time_slice.1') != ods.fingerprint('equilibrium.time_slice.1')
+        del ods1['equilibrium.time_slice.1']
+        del ods['equilibrium.time_slice.1']
+        assert ods1.fingerprint() == ods.fingerprint()
+
+        # fingerprints follow changes to the code parameters
+        ods['equilibrium.code.parameters'] = CodeParameters()
+        ods['equilibrium.code.parameters']['a.b'] = 1
+        fingerprint = ods.fingerprint()
+        ods['equilibrium.code.parameters']['a.b'] = 2
+        assert ods.fingerprint() != fingerprint
+        ods['equilibrium.code.parameters.a.b'] = 3
+        ods1['equilibrium.code.parameters'] = CodeParameters()
+        ods1['equilibrium.code.parameters']['a.b'] = 3
+        assert ods.fingerprint() == ods1.fingerprint()
+
     def test_version(self):
         ods = ODS(imas_version='3.20.0')
         ods['ec_antennas.antenna.0.power.data'] = [1.0]
@@ -416,6 +540,36 @@ class TestOmasCore(UnittestCaseOmas):
         ods.sample_equilibrium()
         ods.save('test.pkl')
 
+    def test_saveload_workers(self):
+        ods = ODS()
+        ods.sample_equilibrium()
+        ods.sample_core_profiles()
+        ods.sample_wall()
+        for ext in ['json', 'h5']:
+            filename = omas_testdir(__file__) + '/test_workers.' + ext
+            ods.save(filename, workers=2)
+            ods1 = ODS().load(filename, workers=2)
+            assert not different_ods(ods, ods1)
+            assert list(ods1.keys()) == list(ODS().load(filename).keys())
+            assert ods1['equilibrium.time_slice.0'].location == 'equilibrium.time_slice.0'
+            assert ods1['equilibrium.time_slice.0'].consistency_check
+
+    def test_json_base64_ndjson(self):
+        ods = ODS().sample_equilibrium()
+        ods.sample_equilibrium(time_index=1)
+        filename = omas_testdir(__file__) + '/test_base64.json'
+        ods.save(filename, objects_encode='base64')
+        assert not different_ods(ods, ODS().load(filename))
+
+        filename = omas_testdir(__file__) + '/test_paths.ndjson'
+        ods.save(filename)
+        ods1 = ODS().load(filename, paths=['equilibrium.time_slice.:.global_quantities'])
+        assert numpy.allclose(ods1['equilibrium.time_slice.:.global_quantities.ip'], ods['equilibrium.time_slice.:.global_quantities.ip'])
+        assert 'equilibrium.time_slice.0.profiles_1d' not in ods1
+        for location, value in iter_omas_ndjson(filename, paths=['equilibrium.time_slice.1.profiles_1d.psi']):
+            assert location == 'equilibrium.time_slice.1.profiles_1d.psi'
+            assert numpy.allclose(value, ods[location])
+
     def test_load_error_upper(self):
         ods = load_omas_h5(f'{imas_json_dir}/../samples/ods_with_error_upper.h5')
 
@@ -522,6 +676,99 @@ class TestOmasCore(UnittestCaseOmas):
         ods1 = odx.to_ods()
         assert not ods.diff(ods)
 
+    def test_odx_dynamic(self):
+        ods = ODS().sample_equilibrium()
+        for k in range(1, 5):
+            ods.sample_equilibrium(time_index=k)
+        odx = ods.to_odx()
+        ods1 = odx.to_ods(dynamic=True)
+
+        # slices across arrays of structures are views of the tensors
+        psi = ods1['equilibrium.time_slice.:.profiles_1d.psi']
+        assert psi.shape == (5, len(ods['equilibrium.time_slice.0.profiles_1d.psi']))
+        assert numpy.shares_memory(psi, odx['equilibrium.time_slice.:.profiles_1d.psi'])
+
+        # data is otherwise accessed as usual
+        assert len(ods1['equilibrium.time_slice']) == 5
+        assert ods1['equilibrium.time_slice.3.global_quantities.ip'] == ods['equilibrium.time_slice.3.global_quantities.ip']
+        assert numpy.allclose(ods1['equilibrium.time_slice.2.profiles_1d.psi'], ods['equilibrium.time_slice.2.profiles_1d.psi'])
+
+        # data modified in memory takes precedence over the tensors
+        ods1['equilibrium.time_slice.2.global_quantities.ip'] = 1.0
+        assert ods1['equilibrium.time_slice.:.global_quantities.ip'][2] == 1.0
+        assert odx['equilibrium.time_slice.:.global_quantities.ip'][2] != 1.0
+
+    def test_h5_dynamic(self):
+        ods = ODS().sample_equilibrium()
+        for k in range(1, 5):
+            ods.sample_equilibrium(time_index=k)
+        for layout in ['tree', 'tensor']:
+            filename = omas_testdir(__file__) + f'/test_{layout}.h5'
+            ods.save(filename, layout=layout, compression='gzip')
+            assert not different_ods(ods, ODS().load(filename))
+
+            ods1 = ODS()
+            with ods1.open(filename):
+                assert len(ods1['equilibrium.time_slice']) == 5
+                assert ods1['equilibrium.time_slice.3.global_quantities.ip'] == ods['equilibrium.time_slice.3.global_quantities.ip']
+                assert numpy.allclose(ods1['equilibrium.time_slice.:.profiles_1d.psi'], ods['equilibrium.time_slice.:.profiles_1d.psi'])
+                assert 'equilibrium.time_slice.4.profiles_1d.psi' in ods1
+                assert 'equilibrium.time_slice.5.profiles_1d.psi' not in ods1
+            # with the tensor layout, slices across arrays of structures are read directly from the file
+            assert ('equilibrium.time_slice.2.profiles_1d.psi' in ods1) == (layout == 'tree')
+
+        # arrays of objects are saved with the tensor layout
+        ods['equilibrium.ids_properties.provenance.node.0'].setraw('sources', numpy.array(['a', 'bb'], dtype=object))
+        ods['equilibrium.time_slice.0.profiles_1d'].setraw('psi', numpy.array([0.0, 1, 2.0], dtype=object))
+        ods.save(filename, layout='tensor')
+        ods1 = ODS().load(filename)
+        assert list(ods1['equilibrium.ids_properties.provenance.node.0.sources']) == ['a', 'bb']
+        assert numpy.all(ods1['equilibrium.time_slice.0.profiles_1d.psi'] == [0.0, 1.0, 2.0])
+
+    def test_dynamic_nc(self):
+        ods = ODS().sample_equilibrium()
+        for k in range(1, 5):
+            ods.sample_equilibrium(time_index=k)
+        filename = omas_testdir(__file__) + '/test_dynamic.nc'
+        ods.save(filename)
+
+        ods1 = ODS()
+        with ods1.open(filename):
+            assert set(ods1['equilibrium'].keys()) == set(ods['equilibrium'].keys())
+            assert len(ods1['equilibrium.time_slice']) == 5
+            assert numpy.allclose(ods1['equilibrium.time_slice.:.global_quantities.ip'], ods['equilibrium.time_slice.:.global_quantities.ip'])
+            assert 'equilibrium.time_slice.5.profiles_1d.psi' not in ods1
+        # data read from file is cached across close/open
+        assert len(ods1.dynamic.cache) == 5
+
+        # cache is bounded by its budget of bytes
+        cache = LRUCache(150)
+        cache['a'] = numpy.zeros(8)
+        cache['b'] = numpy.zeros(8)
+        cache['c'] = numpy.zeros(100)
+        assert 'c' not in cache
+        cache['a']
+        cache['d'] = numpy.zeros(8)
+        assert 'a' in cache and 'b' not in cache and cache.nbytes == 128
+
+    def test_bin_memmap(self):
+        ods = ODS().sample_equilibrium()
+        ods.sample_equilibrium(time_index=1)
+        filename = omas_testdir(__file__) + '/test_memmap.bin'
+        ods.save(filename)
+
+        # arrays are copy-on-write views of the file
+        ods1 = ODS().load(filename)
+        assert isinstance(ods1['equilibrium.time_slice.0.profiles_1d.psi'].base, numpy.memmap)
+        ods1['equilibrium.time_slice.0.profiles_1d.psi'][0] = 0.0
+        assert ODS().load(filename)['equilibrium.time_slice.0.profiles_1d.psi'][0] == ods['equilibrium.time_slice.0.profiles_1d.psi'][0]
+
+        ods2 = ODS()
+        with ods2.open(filename):
+            assert set(ods2['equilibrium'].keys()) == set(ods['equilibrium'].keys())
+            assert numpy.allclose(ods2['equilibrium.time_slice.:.global_quantities.ip'], ods['equilibrium.time_slice.:.global_quantities.ip'])
+            assert 'equilibrium.time_slice.2.profiles_1d.psi' not in ods2
+
     def test_odc(self):
         odc = ODC()
         for k in range(5):
@@ -551,6 +798,132 @@ class TestOmasCore(UnittestCaseOmas):
         assert ods['equilibrium.time_slice.0.global_quantities'].top is ods
         assert ods['equilibrium.time_slice.0.global_quantities'].top is not ods['equilibrium']
 
+    def test_location(self):
+        ods = ODS()
+        for k in range(4):
+            ods[f'bolometer.channel.{k}.identifier'] = f'ch{k}'
+        channels = [ods['bolometer.channel'][k] for k in range(4)]
+        assert [channel.location for channel in channels] == [f'bolometer.channel.{k}' for k in range(4)]
+
+        # location after deleting elements of an array of structures
+        del ods['bolometer.channel'][1]
+        assert channels[2].location == 'bolometer.channel.1'
+        assert channels[3].location == 'bolometer.channel.2'
+
+        # location after reordering elements of an array of structures
+        ods['bolometer.channel'].omas_data.reverse()
+        assert channels[3].location == 'bolometer.channel.0'
+        assert channels[0].location == 'bolometer.channel.2'
+
+        # location of copies
+        ods1 = ods.copy()
+        assert ods1['bolometer.channel.2'].location == 'bolometer.channel.2'
+        assert ods1['bolometer.channel.2.identifier'] == 'ch0'
+
+    def test_copy(self):
+        ods = ODS().sample_equilibrium()
+        for shallow_leaves in [False, True]:
+            ods1 = ods.copy(shallow_leaves=shallow_leaves)
+            assert not ods.diff(ods1)
+            assert ods1['equilibrium.time_slice.0.profiles_1d'].location == 'equilibrium.time_slice.0.profiles_1d'
+            assert ods1['equilibrium.time_slice.0'].parent is ods1['equilibrium.time_slice']
+            assert numpy.shares_memory(ods1['equilibrium.time_slice.0.profiles_1d.psi'], ods['equilibrium.time_slice.0.profiles_1d.psi']) == shallow_leaves
+
+        # leaves shared with the original ODS can be replaced but not modified in place
+        ods1['equilibrium.time_slice.0.profiles_1d.psi'] = ods1['equilibrium.time_slice.0.profiles_1d.psi'] * 2
+        assert not numpy.allclose(ods1['equilibrium.time_slice.0.profiles_1d.psi'], ods['equilibrium.time_slice.0.profiles_1d.psi'])
+        try:
+            ods1['equilibrium.time_slice.0.profiles_1d.q'][0] = 0.0
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('leaves shared with the original ODS should be read-only')
+        # the copy aliases the data of the original ODS
+        ods['equilibrium.time_slice.0.profiles_1d.q'][0] = 0.0
+        assert ods1['equilibrium.time_slice.0.profiles_1d.q'][0] == 0.0
+
+    def test_consistency_stamp(self):
+        ods = ODS().sample_equilibrium()
+        assert ods.consistency_stamp() == ods.imas_version
+        ods['equilibrium.time_slice.0'].consistency_check = False
+        assert ods.consistency_stamp() is None
+        ods['equilibrium.time_slice.0'].consistency_check = True
+        assert ods['equilibrium.time_slice.0'].consistency_check is True
+
+        # data from a file with a consistency stamp is converted to the IMAS types without being validated again
+        ods1 = ODS(consistency_check=False)
+        ods1.setraw('equilibrium', ODS(consistency_check=False))
+        ods1['equilibrium'].setraw('time', numpy.array([0.0, 1.0]))
+        ods1['equilibrium'].setraw('ids_properties', ODS(consistency_check=False))
+        ods1['equilibrium.ids_properties'].setraw('homogeneous_time', numpy.int32(1))
+        ods1['equilibrium.ids_properties'].setraw('comment', b'test')
+        ods1._set_consistency_check_trusted(True, ods1.imas_version)
+        assert ods1['equilibrium.ids_properties'].consistency_check is True
+        assert isinstance(ods1['equilibrium.ids_properties.homogeneous_time'], int)
+        assert ods1['equilibrium.ids_properties.comment'] == 'test'
+
+        # without a matching stamp the data is validated
+        ods1['equilibrium'].setraw('not_valid', 1.0)
+        for stamp in [None, 'not_the_same_version']:
+            try:
+                ods1._set_consistency_check_trusted(True, stamp)
+            except LookupError:
+                pass
+            else:
+                raise AssertionError('data without a matching consistency stamp should be validated')
+
+    def test_set_many(self):
+        data = numpy.random.rand(5, 10)
+        ods = ODS()
+        ods.set_many('magnetics.b_field_pol_probe.:.field.data', data)
+        ods.set_many('magnetics.b_field_pol_probe.:.identifier', [f'probe{k}' for k in range(5)])
+        ods1 = ODS()
+        for k in range(5):
+            ods1[f'magnetics.b_field_pol_probe.{k}.field.data'] = data[k]
+            ods1[f'magnetics.b_field_pol_probe.{k}.identifier'] = f'probe{k}'
+        assert not ods.diff(ods1)
+        assert ods['magnetics.b_field_pol_probe.3'].location == 'magnetics.b_field_pol_probe.3'
+
+        # cocos transformations
+        with omas_environment(ods, cocosio=2):
+            ods.set_many('equilibrium.time_slice.:.global_quantities.ip', [1.0, 2.0])
+            assert all(ods['equilibrium.time_slice.:.global_quantities.ip'] == [1.0, 2.0])
+        assert all(ods['equilibrium.time_slice.:.global_quantities.ip'] == [-1.0, -2.0])
+
+        # invalid locations and data
+        try:
+            ods.set_many('magnetics.b_field_pol_probe.:.bad', data)
+        except LookupError:
+            pass
+        else:
+            raise AssertionError('invalid IMAS locations should raise a LookupError')
+        try:
+            ods.set_many('magnetics.b_field_pol_probe.:.field.data', numpy.zeros((5, 2, 2)))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('data with wrong number of dimensions should raise a ValueError')
+
+    def test_set_many_units(self):
+        try:
+            import pint
+        except ImportError as _excp:
+            self.skipTest(str(_excp))
+        ureg = pint.UnitRegistry()
+
+        # quantities with units are converted like they are with element by element assignment
+        data = numpy.random.rand(3, 4)
+        ods = ODS()
+        ods.set_many('magnetics.b_field_pol_probe.:.field.time', data * ureg.milliseconds)
+        ods.set_many('magnetics.b_field_pol_probe.:.position.r', [k * ureg.centimeter for k in range(3)])
+        ods1 = ODS()
+        for k in range(3):
+            ods1[f'magnetics.b_field_pol_probe.{k}.field.time'] = data[k] * ureg.milliseconds
+            ods1[f'magnetics.b_field_pol_probe.{k}.position.r'] = k * ureg.centimeter
+        assert not ods.diff(ods1)
+        assert numpy.allclose(ods['magnetics.b_field_pol_probe.2.field.time'], data[2] * 1e-3)
+        assert ods['magnetics.b_field_pol_probe.2.position.r'] == 0.02
+
     def test_imas_version(self):
         ods = ODS()
         assert ods.imas_version == omas_rcparams['default_imas_version']
@@ -597,6 +970,42 @@ class TestOmasCore(UnittestCaseOmas):
         assert 'test_field' not in original
         assert 'test_field' in extended
 
+    def test_lazy_import(self):
+        import sys
+        import subprocess
+
+        # `import omas` should not import the omas backends, and should do so within a time budget
+        script = '''
+import sys, time
+t0 = time.time()
+import omas
+print(time.time() - t0)
+print(sorted(item for item in ['omas.omas_json', 'omas.omas_nc', 'omas.omas_h5', 'omas.omas_imas', 'omas.omas_machine'] if item in sys.modules))
+'''
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join([omas_install_dir] + sys.path)
+        out = subprocess.check_output([sys.executable, '-W', 'ignore', '-c', script], env=env).decode('utf-8').strip().split('\n')
+        import_time, imported = float(out[-2]), out[-1]
+        assert imported == '[]', 'backends imported with `import omas`: ' + imported
+        assert import_time < 10.0, '`import omas` took %3.3f seconds' % import_time
+
+        # backends are imported on first access
+        import omas
+
+        assert load_omas_json is omas.load_omas_json
+        assert 'load_omas_json' in dir(omas)
+        try:
+            omas.load_omas_bad
+        except AttributeError:
+            pass
+        else:
+            raise AssertionError('accessing undefined attributes of omas should raise an AttributeError')
+
+        # submodules and the names exported by the backends are reachable as before
+        for item in ['omas_h5', 'omas_machine', 'omas_nc', 'omas_json', 'utilities']:
+            assert getattr(omas, item).__name__ == 'omas.' + item
+        assert omas.omas_core.imas_nan == omas.omas_ascii.imas_nan
+        assert omas.omas_core.iter_scenario_requirements is omas.omas_imas.iter_scenario_requirements
 
     # End of TestOmasCore class
 
@@ -154,6 +154,15 @@ class TestOmasExamples(UnittestCaseOmas):
     def test_extra_structures(self):
         from omas.examples import extra_structures
 
+    def test_omas_structures_cache(self):
+        from omas.examples import omas_structures_cache
+
+    def test_omas_copy_benchmark(self):
+        from omas.examples import omas_copy_benchmark
+
+    def test_machine_mapping_benchmark(self):
+        from omas.examples import machine_mapping_benchmark
+
     @unittest.skipIf(failed_IMAS, str(failed_IMAS))
     @unittest.skipIf(not_running_on_cea_cluster, str(not_running_on_cea_cluster))
     def test_west_geqdsk(self):
@@ -17,7 +17,8 @@ from omas.omas_utils import *
 from omas.tests import warning_setup
 from omas.tests.failed_imports import *
 from omas.omas_machine import *
-from omas.omas_machine import machine_to_omas
+from omas.omas_machine import machine_to_omas, machine_mds_requests, machine_cache_get, machine_cache_set, machine_mappings_index
+from omas.omas_machine import _machine_cache_filename
 
 
 class TestOmasMachine(UnittestCaseOmas):
@@ -89,6 +90,139 @@ class TestOmasMachine(UnittestCaseOmas):
         location = 'interferometer.channel.:.identifier'
         ods, info = machine_to_omas(ODS(), self.machine, self.pulse, location)
 
+    def test_mappings_index(self):
+        mappings = machine_mappings(self.machine, '')
+        index = machine_mappings_index(self.machine, '')
+        assert index['locations']['gas_injection'] == [location for location in mappings if location.startswith('gas_injection.')]
+        assert 'time_slice' in index['children']['equilibrium']
+        assert 'equilibrium.time_slice.:.boundary_separatrix.closest_wall_point.distance' not in index['locations']['wall']
+
+        # alternating between different user mappings does not process the mappings again
+        user_machine_mappings = {"dataset_description.data_entry.machine": {"EVAL": "{machine!r}+'123'"}}
+        user_mappings = machine_mappings(self.machine, '', user_machine_mappings)
+        assert machine_mappings(self.machine, '') is mappings
+        assert machine_mappings(self.machine, '', user_machine_mappings) is user_mappings
+
+    def test_mds_requests(self):
+        # TDI expressions needed by many locations are collected once, so that they can be fetched with one request per tree
+        locations = [location for location in machine_mappings(self.machine, '') if location.startswith('equilibrium.')]
+        requests = machine_mds_requests(self.machine, self.pulse, locations)
+        assert len(requests) and len(requests) == len(set(requests))
+        assert len(requests) < len(locations)
+        assert all(request[0] == self.machine and request[2] == self.pulse for request in requests)
+
+    def test_mds_replay(self):
+        import shutil
+
+        locations = ['equilibrium.time', 'equilibrium.time_slice.:', 'equilibrium.time_slice.:.time']
+        tmp_omas_dir = tempfile.mkdtemp()
+        try:
+            recording = tmp_omas_dir + os.sep + 'recording.pkl'
+            records = {}
+            for request in machine_mds_requests(self.machine, self.pulse, locations):
+                records[request] = 3 if request[3].startswith('size(') else numpy.array([1.0, 2.0, 3.0])
+            mds_record(records, recording)
+            with rcparams_environment(mds_replay=recording):
+                mds_stats(reset=True)
+                ods = load_omas_machine(self.machine, self.pulse, locations=locations)
+                assert mds_stats()['round_trips'] == 1
+                assert numpy.all(ods['equilibrium.time_slice.:.time'] == [1.0, 2.0, 3.0])
+        finally:
+            shutil.rmtree(tmp_omas_dir)
+
+    def test_nanfilter(self):
+        import shutil
+
+        location = 'equilibrium.time_slice.:.boundary.outline.r'
+        tmp_omas_dir = tempfile.mkdtemp()
+        try:
+            recording = tmp_omas_dir + os.sep + 'recording.pkl'
+            data = numpy.arange(12.0).reshape(3, 4)
+            data[1, 2:] = numpy.nan
+            mds_record({request: data for request in machine_mds_requests(self.machine, self.pulse, [location])}, recording)
+            with rcparams_environment(mds_replay=recording):
+                ods, info = machine_to_omas(ODS(), self.machine, self.pulse, location)
+            assert numpy.all(ods['equilibrium.time_slice.0.boundary.outline.r'] == [0.0, 1.0, 2.0, 3.0])
+            assert numpy.all(ods['equilibrium.time_slice.1.boundary.outline.r'] == [4.0, 5.0])
+        finally:
+            shutil.rmtree(tmp_omas_dir)
+
+    def test_concurrent_locations(self):
+        ods = ODS()
+        machine_to_omas(ods, self.machine, self.pulse, 'gas_injection.*')
+        ods1 = ODS()
+        machine_to_omas(ods1, self.machine, self.pulse, 'gas_injection.*', workers=4)
+        assert not different_ods(ods, ods1)
+
+    def test_persistent_cache(self):
+        import shutil
+
+        tmp_omas_dir = tempfile.mkdtemp()
+        try:
+            with rcparams_environment(machine_cache=True, tmp_omas_dir=tmp_omas_dir):
+                ods = ODS()
+                machine_to_omas(ods, self.machine, self.pulse, 'gas_injection.*')
+                assert len(glob.glob(tmp_omas_dir + '/machine_cache/*.pkl'))
+                ods1 = ODS()
+                machine_to_omas(ods1, self.machine, self.pulse, 'gas_injection.*')
+                assert not different_ods(ods, ods1)
+
+                # least recently used entries are evicted to stay within budget
+                with rcparams_environment(machine_cache_bytes=1000):
+                    machine_cache_set(('test', 1), numpy.zeros(10))
+                    machine_cache_set(('test', 2), numpy.zeros(100))
+                    assert not machine_cache_get(('test', 1))[0]
+                    assert machine_cache_get(('test', 2))[0]
+
+                # the cache is ignored if other users can write to it
+                os.chmod(tmp_omas_dir + os.sep + 'machine_cache', 0o777)
+                assert not machine_cache_get(('test', 2))[0]
+                machine_cache_set(('test', 3), numpy.zeros(10))
+                assert not os.path.exists(_machine_cache_filename(('test', 3)))
+        finally:
+            shutil.rmtree(tmp_omas_dir)
+
+    def test_mds_connection_pool(self):
+        import time
+        from omas.utilities.omas_mds import mds_connection_pool
+
+        class connection(object):
+            def __init__(self):
+                self.trees = []
+                self.closed = False
+
+            def openTree(self, treename, pulse):
+                self.trees.append((treename, pulse))
+
+            def disconnect(self):
+                self.closed = True
+
+        pool = mds_connection_pool()
+        conn = connection()
+        pool.idle.append(['server', 'tree', 1, conn, time.time()])
+
+        # the same connection is reused across pulses
+        with pool.connection('server', 'tree', 2) as conn1:
+            assert conn1 is conn and conn.trees == [('tree', 2)]
+        with pool.connection('server', 'tree', 2) as conn1:
+            assert conn1 is conn and conn.trees == [('tree', 2)]
+        assert len(pool.idle) == 1
+
+        # errors in the TDI expressions do not discard the connection
+        try:
+            with pool.connection('server', 'tree', 2):
+                raise ValueError('TDI error')
+        except ValueError:
+            pass
+        assert len(pool.idle) == 1 and not conn.closed
+
+        # connections beyond the size of the pool are closed
+        pool.idle.append(['server', 'tree', 3, connection(), time.time()])
+        with rcparams_environment(mds_connection_pool_size=1):
+            with pool.connection('server', 'tree', 3):
+                pass
+        assert len(pool.idle) == 1 and conn.closed
+
     def test_tdi(self):
         # make sure all machines have a MDS+ server assigned
         for machine in machines():
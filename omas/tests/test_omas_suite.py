@@ -30,6 +30,14 @@ class TestOmasSuite(UnittestCaseOmas):
             print('\n'.join(diff))
             raise AssertionError('pkl through difference')
 
+    def test_omas_bin(self):
+        ods = ODS().sample()
+        ods1 = through_omas_bin(ods)
+        diff = ods.diff(ods1)
+        if diff:
+            print('\n'.join(diff))
+            raise AssertionError('bin through difference')
+
     def test_omas_json(self):
         ods = ODS().sample()
         ods1 = through_omas_json(ods)
@@ -38,6 +46,14 @@ class TestOmasSuite(UnittestCaseOmas):
             print('\n'.join(diff))
             raise AssertionError('json through difference')
 
+    def test_omas_ndjson(self):
+        ods = ODS().sample()
+        ods1 = through_omas_ndjson(ods)
+        diff = ods.diff(ods1)
+        if diff:
+            print('\n'.join(diff))
+            raise AssertionError('ndjson through difference')
+
     def test_omas_nc(self):
         ods = ODS().sample()
         ods1 = through_omas_nc(ods)
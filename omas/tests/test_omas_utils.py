@@ -64,6 +64,13 @@ class TestOmasUtils(UnittestCaseOmas):
         assert isinstance(diff_prof5, list)
         assert 'name' in ' '.join(diff_prof5)
 
+        # early exit and concurrent comparison of the IDSs
+        ods3['core_profiles.profiles_1d.0.electrons.temperature'] = ods3['core_profiles.profiles_1d.0.electrons.temperature'] * 2
+        diff_prof6 = different_ods(ods2, ods3)
+        assert len(diff_prof6) == 2
+        assert different_ods(ods2, ods3, max_differences=1) == diff_prof6[:1]
+        assert sorted(ods2.diff(ods3, workers=2)) == sorted(diff_prof6)
+
     def test_printe(self):
         printe('printe_test,', end='')
 
@@ -191,6 +198,84 @@ class TestOmasUtils(UnittestCaseOmas):
             assert isinstance(ods['equilibrium.time_slice[0].global_quantities.ip'], uncertainties.core.AffineScalarFunc)
             assert isinstance(ods['equilibrium.time_slice[1].global_quantities.ip'], uncertainties.core.AffineScalarFunc)
 
+    def test_imas_node(self):
+        node = imas_node(omas_rcparams['default_imas_version'], 'equilibrium.time_slice.:.profiles_1d.psi')
+        info = omas_info_node('equilibrium.time_slice.:.profiles_1d.psi')
+        assert node.data_type == info['data_type']
+        assert node.ndim == len(info['coordinates'])
+        assert node.cocos_transform == 'PSI'
+        assert not node.cocos_abs
+        assert imas_node(omas_rcparams['default_imas_version'], 'equilibrium.time_slice.:.profiles_1d.psi_error_upper').cocos_abs
+        assert imas_node(omas_rcparams['default_imas_version'], 'equilibrium.time').is_coordinate
+        assert 'profiles_1d' in imas_node(omas_rcparams['default_imas_version'], 'equilibrium.time_slice.:').structure
+
+        # records are read-only
+        try:
+            node.data_type = 'INT_0D'
+        except AttributeError:
+            pass
+        else:
+            raise AssertionError('IMAS_node records should be read-only')
+
+        # invalid locations
+        try:
+            imas_node(omas_rcparams['default_imas_version'], 'equilibrium.time_slice.:.bad')
+        except LookupError:
+            pass
+        else:
+            raise AssertionError('invalid IMAS locations should raise a LookupError')
+        assert imas_node(omas_rcparams['default_imas_version'], 'equilibrium.time_slice.:.bad', strict=False).data_type is None
+
+        # invalid IDSs
+        for k in range(2):
+            try:
+                imas_node(omas_rcparams['default_imas_version'], 'not_an_ids')
+            except LookupError:
+                pass
+            else:
+                raise AssertionError('invalid IDSs should raise a LookupError')
+            assert imas_node(omas_rcparams['default_imas_version'], 'not_an_ids', strict=False).data_type is None
+            self.assertRaises(LookupError, ODS().__setitem__, 'not_an_ids', 1.0)
+
+    def test_structures_bundle(self):
+        import tempfile
+        import shutil
+
+        tmp_omas_dir = tempfile.mkdtemp()
+        source = tmp_omas_dir + os.sep + 'source.json'
+        calls = []
+
+        def generate():
+            calls.append(1)
+            with open(source, 'r') as f:
+                return f.read()
+
+        try:
+            with rcparams_environment(tmp_omas_dir=tmp_omas_dir, imas_structures_cache=True):
+                with open(source, 'w') as f:
+                    f.write('one')
+                assert structures_bundle('test', [source], generate) == 'one'
+                assert structures_bundle('test', [source], generate) == 'one'
+                assert len(calls) == 1
+
+                # bundles are regenerated when the sources change
+                with open(source, 'w') as f:
+                    f.write('three')
+                assert structures_bundle('test', [source], generate) == 'three'
+                assert len(calls) == 2
+
+                # bundles can be disabled
+                with rcparams_environment(imas_structures_cache=False):
+                    assert structures_bundle('test', [source], generate) == 'three'
+                assert len(calls) == 3
+
+                # bundles are not read from directories that other users can write to
+                os.chmod(tmp_omas_dir + os.sep + 'imas_structures_cache', 0o777)
+                assert structures_bundle('test', [source], generate) == 'three'
+                assert len(calls) == 4
+        finally:
+            shutil.rmtree(tmp_omas_dir)
+
     # End of TestOmasUtils class
 
 
@@ -1,13 +1,29 @@
 import json
 import os
-from omas.omas_utils import printd
+import copy
+import time
+import pickle
+import threading
+import contextlib
+from omas.omas_utils import printd, omas_rcparams
 
 __all__ = [
     'mdstree',
-    'mdsvalue'
+    'mdsvalue',
+    'mdsbatch',
+    'mds_stats',
+    'mds_record',
+    'mds_recording',
 ]
 
-_mds_connection_cache = {}
+_mds_server_names = {}
+_mds_server_semaphores = {}
+_mds_server_lock = threading.Lock()
+_mds_server_held = threading.local()
+_mds_stats = {'round_trips': 0, 'expressions': 0}
+_mds_stats_lock = threading.Lock()
+_mds_recordings = {}
+_mds_record_lock = threading.Lock()
 
 # ===================
 # MDS+ functions
@@ -35,7 +51,257 @@ def tunnel_mds(server, treename):
     return server.format(**os.environ)
 
 
+def mds_server_name(server):
+    """
+    Resolve the MDS+ server of a machine (memoized, so that the machine mappings file is read only once)
+
+    :param server: machine name or MDS+ server address:port
+
+    :return: MDS+ server address:port
+    """
+    if server not in _mds_server_names:
+        try:
+            # handle the case that server is just the machine name
+            machine_mappings_path = os.path.join(os.path.dirname(__file__), "../", "machine_mappings")
+            machine_mappings_path = os.path.join(machine_mappings_path, server + ".json")
+            with open(machine_mappings_path, "r") as machine_file:
+                _mds_server_names[server] = json.load(machine_file)["__mdsserver__"]
+        except Exception:
+            # hanlde case where server is actually a URL
+            if '.' not in server:
+                raise
+            _mds_server_names[server] = server
+    return _mds_server_names[server]
+
+
+class mds_connection_pool(object):
+    """
+    Pool of MDS+ connections
+
+    MDS+ connections can not be shared across threads, so a connection is checked out by one thread at the time.
+    Connections are reused across trees and pulses (by opening the tree on the existing connection),
+    connections that are idle for more than omas_rcparams['mds_connection_idle_timeout'] seconds are closed,
+    and at most omas_rcparams['mds_connection_pool_size'] idle connections are kept.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # list of [server, treename, pulse, connection, time of last use], most recently used last
+        self.idle = []
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.disconnect()
+        except Exception:
+            pass
+
+    def _evict(self):
+        """
+        Close idle connections that expired or that exceed the size of the pool (must be called with lock held)
+
+        :return: list of connections to be closed
+        """
+        now = time.time()
+        expired = [item for item in self.idle if now - item[4] > omas_rcparams['mds_connection_idle_timeout']]
+        self.idle = [item for item in self.idle if now - item[4] <= omas_rcparams['mds_connection_idle_timeout']]
+        n = max(0, len(self.idle) - max(0, omas_rcparams['mds_connection_pool_size']))
+        expired.extend(self.idle[:n])
+        self.idle = self.idle[n:]
+        return [item[3] for item in expired]
+
+    @contextlib.contextmanager
+    def connection(self, server, treename, pulse):
+        """
+        Check out a connection to a MDS+ server with a tree open
+
+        :param server: MDS+ server
 
+        :param treename: MDS+ tree (None for no tree)
+
+        :param pulse: pulse number
+
+        :return: MDSplus.Connection
+        """
+        # prefer a connection that has the same tree open, then any connection to the same server
+        with self.lock:
+            expired = self._evict()
+            candidates = [k for k, item in enumerate(self.idle) if item[0] == server]
+            candidates.sort(key=lambda k: self.idle[k][1:3] == [treename, pulse])
+            item = self.idle.pop(candidates[-1]) if candidates else None
+        for connection in expired:
+            self._close(connection)
+
+        if item is not None and item[1:3] != [treename, pulse]:
+            try:
+                if treename is not None:
+                    item[3].openTree(treename, pulse)
+                item[1:3] = [treename, pulse]
+            except Exception:
+                # the connection may have gone stale
+                self._close(item[3])
+                item = None
+        if item is None:
+            import MDSplus
+
+            printd(f'New MDS+ connection to {server}', topic='machine')
+            connection = MDSplus.Connection(server)
+            if treename is not None:
+                try:
+                    connection.openTree(treename, pulse)
+                except Exception:
+                    self._close(connection)
+                    raise
+            item = [server, treename, pulse, connection, None]
+
+        broken = False
+        try:
+            yield item[3]
+        except Exception as _excp:
+            # errors in the evaluation of TDI expressions leave the connection usable,
+            # but connections that failed at the network level are not returned to the pool
+            broken = isinstance(_excp, OSError) or any('MdsIp' in cls.__name__ for cls in type(_excp).__mro__)
+            raise
+        finally:
+            if broken:
+                self._close(item[3])
+            else:
+                item[4] = time.time()
+                with self.lock:
+                    self.idle.append(item)
+                    expired = self._evict()
+                for connection in expired:
+                    self._close(connection)
+
+    def clear(self):
+        """
+        Close all idle connections
+        """
+        with self.lock:
+            expired = [item[3] for item in self.idle]
+            self.idle = []
+        for connection in expired:
+            self._close(connection)
+
+
+_mds_connection_pool = mds_connection_pool()
+
+
+@contextlib.contextmanager
+def mds_server_slot(server):
+    """
+    Limit the number of threads that concurrently send requests to a MDS+ server to omas_rcparams['mds_server_concurrency']
+    A thread that already holds a slot for the server (eg. nested requests) does not wait for another one
+
+    :param server: MDS+ server
+    """
+    held = _mds_server_held.__dict__.setdefault('servers', set())
+    if server in held:
+        yield
+        return
+    with _mds_server_lock:
+        if server not in _mds_server_semaphores:
+            _mds_server_semaphores[server] = threading.BoundedSemaphore(max(1, omas_rcparams['mds_server_concurrency']))
+    with _mds_server_semaphores[server]:
+        held.add(server)
+        try:
+            yield
+        finally:
+            held.discard(server)
+
+
+# ===================
+# MDS+ record and replay
+# ===================
+def mds_stats(reset=False):
+    """
+    Counters of the requests sent to MDS+ servers (or to the replay stand-in)
+
+    :param reset: reset the counters
+
+    :return: dictionary with number of `round_trips` and of TDI `expressions` that were evaluated (before reset)
+    """
+    with _mds_stats_lock:
+        stats = dict(_mds_stats)
+        if reset:
+            for item in _mds_stats:
+                _mds_stats[item] = 0
+    return stats
+
+
+def _mds_count(expressions):
+    with _mds_stats_lock:
+        _mds_stats['round_trips'] += 1
+        _mds_stats['expressions'] += expressions
+
+
+def mds_record(records, filename):
+    """
+    Append the results of TDI expressions to a recording file, that can later be served with omas_rcparams['mds_replay']
+    NOTE: Exceptions are recorded as plain Exceptions, so that recordings can be replayed without MDSplus
+
+    :param records: dictionary with (server, treename, pulse, TDI) keys, where server can also be the machine name
+
+    :param filename: recording file
+    """
+    with _mds_record_lock:
+        with open(filename, 'ab') as f:
+            for (server, treename, pulse, TDI), value in records.items():
+                if isinstance(value, Exception):
+                    value = Exception(f'{value.__class__.__name__}: {value}')
+                pickle.dump(((mds_server_name(server), treename, pulse, TDI), value), f, protocol=omas_rcparams['pickle_protocol'])
+
+
+def mds_recording(filename):
+    """
+    Load a recording file (memoized until the file changes)
+
+    :param filename: recording file
+
+    :return: dictionary with the results of the (server, treename, pulse, TDI) that were recorded
+    """
+    stat = os.stat(filename)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if filename not in _mds_recordings or _mds_recordings[filename][0] != signature:
+        records = {}
+        with open(filename, 'rb') as f:
+            while True:
+                try:
+                    key, value = pickle.load(f)
+                except EOFError:
+                    break
+                records[key] = value
+        _mds_recordings[filename] = (signature, records)
+    return _mds_recordings[filename][1]
+
+
+def _mds_replay(server, treename, pulse, TDI):
+    """
+    Serve the results of TDI expressions from the omas_rcparams['mds_replay'] recording,
+    with a latency of omas_rcparams['mds_replay_latency'] seconds for each round trip
+
+    :return: result of TDI expression, or dictionary with results of TDI expressions
+    """
+    recording = mds_recording(omas_rcparams['mds_replay'])
+
+    def replay(expr):
+        if (server, treename, pulse, expr) not in recording:
+            return KeyError(f'{expr} was not recorded for {server} {treename} {pulse}')
+        return copy.deepcopy(recording[server, treename, pulse, expr])
+
+    with mds_server_slot(server):
+        _mds_count(len(TDI) if isinstance(TDI, (list, tuple, dict)) else 1)
+        if omas_rcparams['mds_replay_latency'] > 0:
+            time.sleep(omas_rcparams['mds_replay_latency'])
+
+    if isinstance(TDI, (list, tuple)):
+        TDI = {expr: expr for expr in TDI}
+    if isinstance(TDI, dict):
+        return {name: replay(expr) for name, expr in TDI.items()}
+    result = replay(TDI)
+    if isinstance(result, Exception):
+        raise result
+    return result
 
 
 class mdsvalue(dict):
@@ -49,17 +315,12 @@ class mdsvalue(dict):
         self.TDI = TDI
         if 'nstx' in server:
             old_MDS_server = True
-        try:
-            # handle the case that server is just the machine name
-            machine_mappings_path = os.path.join(os.path.dirname(__file__), "../", "machine_mappings")
-            machine_mappings_path = os.path.join(machine_mappings_path, server + ".json")
-            with open(machine_mappings_path, "r") as machine_file:
-                    server = json.load(machine_file)["__mdsserver__"]
-        except Exception:
-            # hanlde case where server is actually a URL
-            if '.' not in server:
-                raise
-        self.server = tunnel_mds(server, self.treename)
+        server = mds_server_name(server)
+        self.server_name = server
+        if omas_rcparams['mds_replay']:
+            self.server = server
+        else:
+            self.server = tunnel_mds(server, self.treename)
         old_servers = ['skylark.pppl.gov:8500', 'skylark.pppl.gov:8501', 'skylark.pppl.gov:8000']
         if server in old_servers or self.server in old_servers:
             old_MDS_server = True
@@ -88,17 +349,25 @@ class mdsvalue(dict):
 
     def raw(self, TDI=None):
         """
-        Fetch data from MDS+ with connection caching
+        Fetch data from MDS+ with connection pooling
 
         :param TDI: string, list or dict of strings
             MDS+ TDI expression(s) (overrides the one passed when the object was instantiated)
 
         :return: result of TDI expression, or dictionary with results of TDI expressions
         """
+        out_results = None
         try:
-            import time
-
             t0 = time.time()
+
+            if TDI is None:
+                TDI = self.TDI
+
+            # serve data from a recording instead of the MDS+ server
+            if omas_rcparams['mds_replay']:
+                out_results = _mds_replay(self.server_name, self.treename, self.pulse, TDI)
+                return out_results
+
             import MDSplus
 
             def mdsk(value):
@@ -107,67 +376,57 @@ class mdsvalue(dict):
                 """
                 return str(str(value).encode('utf8'))
 
-            if TDI is None:
-                TDI = self.TDI
-
             try:
-                out_results = None
-
-                # try connecting and re-try on fail
-                for fallback in [0, 1]:
-                    if (self.server, self.treename, self.pulse) not in _mds_connection_cache:
-                        conn = MDSplus.Connection(self.server)
-                        if self.treename is not None:
-                            conn.openTree(self.treename, self.pulse)
-                        _mds_connection_cache[(self.server, self.treename, self.pulse)] = conn
-                    try:
-                        conn = _mds_connection_cache[(self.server, self.treename, self.pulse)]
-                        break
-                    except Exception as _excp:
-                        if (self.server, self.treename, self.pulse) in _mds_connection_cache:
-                            del _mds_connection_cache[(self.server, self.treename, self.pulse)]
-                        if fallback:
-                            raise
-
-                # list of TDI expressions
-                if isinstance(TDI, (list, tuple)):
-                    TDI = {expr: expr for expr in TDI}
-
-                # dictionary of TDI expressions
-                if isinstance(TDI, dict):
-                    # old versions of MDS+ server do not support getMany
-                    if self.old_MDS_server:
-                        results = {}
-                        for tdi in TDI:
-                            try:
-                                results[tdi] = mdsvalue(self.server, self.treename, self.pulse, TDI[tdi]).raw()
-                            except Exception as _excp:
-                                results[tdi] = Exception(str(_excp))
-                        out_results = results
-
-                    # more recent MDS+ server
-                    else:
-                        conns = conn.getMany()
-                        for name, expr in TDI.items():
-                            conns.append(name, expr)
-                        res = conns.execute()
-                        results = {}
-                        for name, expr in TDI.items():
-                            try:
-                                results[name] = MDSplus.Data.data(res[mdsk(name)][mdsk('value')])
-                            except KeyError:
+                with mds_server_slot(self.server), _mds_connection_pool.connection(self.server, self.treename, self.pulse) as conn:
+                    # list of TDI expressions
+                    if isinstance(TDI, (list, tuple)):
+                        TDI = {expr: expr for expr in TDI}
+
+                    # dictionary of TDI expressions
+                    if isinstance(TDI, dict):
+                        # old versions of MDS+ server do not support getMany
+                        if self.old_MDS_server:
+                            results = {}
+                            for tdi in TDI:
                                 try:
-                                    results[name] = MDSplus.Data.data(res[str(name)][str('value')])
+                                    results[tdi] = mdsvalue(self.server, self.treename, self.pulse, TDI[tdi]).raw()
+                                except Exception as _excp:
+                                    results[tdi] = Exception(str(_excp))
+                            out_results = results
+
+                        # more recent MDS+ server
+                        else:
+                            _mds_count(len(TDI))
+                            conns = conn.getMany()
+                            for name, expr in TDI.items():
+                                conns.append(name, expr)
+                            res = conns.execute()
+                            results = {}
+                            for name, expr in TDI.items():
+                                try:
+                                    results[name] = MDSplus.Data.data(res[mdsk(name)][mdsk('value')])
                                 except KeyError:
                                     try:
-                                        results[name] = Exception(MDSplus.Data.data(res[mdsk(name)][mdsk('error')]))
+                                        results[name] = MDSplus.Data.data(res[str(name)][str('value')])
                                     except KeyError:
-                                        results[name] = Exception(MDSplus.Data.data(res[str(name)][str('error')]))
-                        out_results = results
+                                        try:
+                                            results[name] = Exception(MDSplus.Data.data(res[mdsk(name)][mdsk('error')]))
+                                        except KeyError:
+                                            results[name] = Exception(MDSplus.Data.data(res[str(name)][str('error')]))
+                            out_results = results
 
-                # single TDI expression
-                else:
-                    out_results = MDSplus.Data.data(conn.get(TDI))
+                    # single TDI expression
+                    else:
+                        _mds_count(1)
+                        out_results = MDSplus.Data.data(conn.get(TDI))
+
+                # record the results, so that they can be replayed without the MDS+ server
+                if omas_rcparams['mds_record']:
+                    if isinstance(TDI, dict):
+                        records = {(self.server_name, self.treename, self.pulse, expr): out_results[name] for name, expr in TDI.items()}
+                    else:
+                        records = {(self.server_name, self.treename, self.pulse, TDI): out_results}
+                    mds_record(records, omas_rcparams['mds_record'])
 
                 # return values
                 return out_results
@@ -193,6 +452,29 @@ class mdsvalue(dict):
             else:
                 printd(f'{TDI} \tNO\t {time.time() - t0:3.3f} secs', topic='machine')
 
+def mdsbatch(requests):
+    """
+    Execute many TDI expressions with a single round trip (getMany) for each MDS+ server, tree, and pulse
+
+    :param requests: iterable of (server, treename, pulse, TDI) tuples (duplicate requests are executed only once)
+
+    :return: dictionary with the result of each request, or the Exception that the request raised
+    """
+    groups = {}
+    for server, treename, pulse, TDI in dict.fromkeys(requests):
+        groups.setdefault((server, treename, pulse), []).append(TDI)
+
+    results = {}
+    for (server, treename, pulse), TDIs in groups.items():
+        try:
+            group_results = mdsvalue(server, treename, pulse, TDIs).raw()
+        except Exception as _excp:
+            group_results = {TDI: _excp for TDI in TDIs}
+        for TDI in TDIs:
+            results[server, treename, pulse, TDI] = group_results.get(TDI, KeyError(TDI))
+    return results
+
+
 class mdstree(dict):
     """
     Class to handle the structure of an MDS+ tree.